@@ -0,0 +1,76 @@
+"""
+Benchmarks reading pages through WikiPage.find against WikiPageView.find on the same query, reporting pages/s
+when touching only title and language, when also decoding the text and when also loading an annotation:
+
+    MONGO_URI="<mongo-uri>" python benchmarks/page_views.py --num-pages 5000 --annotation wsd
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+from mosaico.schema import WikiPage, WikiPageView, init
+
+
+async def read(
+    find, query: dict, num_pages: int, access: str, annotation: str
+) -> float:
+    start = time.perf_counter()
+    num_read = 0
+    async for page in find(query, limit=num_pages):
+        page.title, page.language
+        if access in ("text", "annotation"):
+            page.text
+        if access == "annotation":
+            await page.get_annotation(annotation)
+        num_read += 1
+    return num_read / (time.perf_counter() - start)
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--db", default="mosaico")
+    parser.add_argument("--num-pages", type=int, default=5_000)
+    parser.add_argument("--annotation", default="wsd")
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    await init(mongo_uri=os.environ["MONGO_URI"], db=args.db)
+
+    # pages having the annotation, so that all the variants read the same documents
+    query = {
+        "$or": [
+            {"materialized_annotations.name": args.annotation},
+            {"linked_annotation_names": args.annotation},
+        ]
+    }
+
+    print(
+        f"{'access':<12} {'WikiPage (pages/s)':>20} {'WikiPageView (pages/s)':>24} {'speedup':>8}"
+    )
+    for access in ("fields", "text", "annotation"):
+        # best of repeats, the first run also warms up the server cache
+        page_rate = max(
+            [
+                await read(
+                    WikiPage.find, query, args.num_pages, access, args.annotation
+                )
+                for _ in range(args.repeats)
+            ]
+        )
+        view_rate = max(
+            [
+                await read(
+                    WikiPageView.find, query, args.num_pages, access, args.annotation
+                )
+                for _ in range(args.repeats)
+            ]
+        )
+        print(
+            f"{access:<12} {page_rate:>20.0f} {view_rate:>24.0f} {view_rate / page_rate:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
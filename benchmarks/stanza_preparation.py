@@ -0,0 +1,166 @@
+"""
+Benchmarks the preparation of a large synthetic StanzaAnnotation, comparing the current synchronous (and lazy)
+preparation against the previous one, which awaited a coroutine for every sentence, token and word. As fields are
+now decoded on access, timings are also reported for preparation followed by reading the text / pos / morph of
+every token.
+
+    python benchmarks/stanza_preparation.py --num-sentences 2000 --sentence-length 25
+"""
+
+import argparse
+import asyncio
+import random
+import time
+import zlib
+
+from mosaico.schema import Language, StanzaAnnotation, WikiPage
+from mosaico.schema.annotations.stanza import (
+    _morph_classes,
+    _morph_decompression,
+    _pos_classes,
+    _idx2pos,
+)
+
+
+def build_page(
+    num_sentences: int, sentence_length: int, seed: int = 42
+) -> tuple[WikiPage, dict]:
+    rng = random.Random(seed)
+    vocabulary = [f"word{i}" for i in range(5_000)]
+
+    text, sentences = "", []
+    for _ in range(num_sentences):
+        tokens = []
+        for _ in range(sentence_length):
+            form = rng.choice(vocabulary)
+            char_start = len(text)
+            text += form + " "
+            token = dict(
+                char_start=char_start,
+                char_end=char_start + len(form),
+                text=form,
+                lemma=form if rng.random() < 0.7 else form[:-1],
+                pos=rng.choice(_pos_classes),
+                morph="|".join(rng.sample(_morph_classes[1:40], rng.randint(1, 4))),
+                ner="O" if rng.random() < 0.9 else "B-PER",
+            )
+            if rng.random() < 0.05:
+                token["morph"] += "___" + rng.choice(_morph_classes[1:40])
+                token["words"] = [
+                    dict(text=form[:2], lemma=form[:2], pos="ADP", morph="Case=Nom"),
+                    dict(text=form[2:], lemma=form[2:], pos="DET", morph="Number=Sing"),
+                ]
+            tokens.append(token)
+        sentences.append(dict(tokens=tokens))
+
+    # model_construct skips beanie initialization, so that no database is needed
+    page = WikiPage.model_construct(
+        document_id="0",
+        title="Synthetic",
+        language=Language.EN,
+        compressed_text=zlib.compress(text.strip().encode()),
+    )
+    stored_annotation = StanzaAnnotation(
+        document=dict(sentences=sentences)
+    ).model_dump()
+    return page, stored_annotation
+
+
+async def legacy_prepare(annotation: StanzaAnnotation, page: WikiPage):
+    # faithful copy of the coroutine-per-element preparation this benchmark compares against
+    async def prepare_word(word):
+        word._text = word.d[0]
+        word._pos = _idx2pos[word.d[1]]
+        word._morph = "|".join(
+            [
+                _morph_decompression[feat] if isinstance(feat, int) else feat
+                for feat in word.d[2]
+            ]
+        )
+        word._lemma = word.l
+
+    async def prepare_token(token):
+        token._pos = _idx2pos[token.d[1]]
+        token._morph = "___".join(
+            [
+                "|".join(
+                    [
+                        _morph_decompression[feat] if isinstance(feat, int) else feat
+                        for feat in word_morphological_features
+                    ]
+                )
+                for word_morphological_features in token.d[2]
+            ]
+        )
+        token._text = page.text[token.char_start : token.char_end]
+        token._lemma = (
+            token.e.get("l", token.text) if token.e is not None else token.text
+        )
+        token._ner = token.e.get("n", "O") if token.e is not None else "O"
+        if token.w is not None:
+            for word in token.w:
+                await prepare_word(word)
+
+    async def prepare_sentence(sentence):
+        for token in sentence.tokens:
+            await prepare_token(token)
+        sentence._text = page.text[sentence.char_start : sentence.char_end]
+
+    for sentence in annotation.document.sentences:
+        await prepare_sentence(sentence)
+    annotation.document._text = page.text[
+        annotation.document.char_start : annotation.document.char_end
+    ]
+
+
+def read_fields(annotation: StanzaAnnotation):
+    for sentence in annotation.document.sentences:
+        for token in sentence.tokens:
+            token.text, token.pos, token.morph
+
+
+async def time_preparation(
+    prepare, page, stored_annotation, repetitions, read: bool = False
+):
+    timings = []
+    for _ in range(repetitions):
+        annotation = StanzaAnnotation.model_validate(stored_annotation)
+        start = time.perf_counter()
+        await prepare(annotation, page)
+        if read:
+            read_fields(annotation)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--num-sentences", type=int, default=2_000)
+    parser.add_argument("--sentence-length", type=int, default=25)
+    parser.add_argument("--repetitions", type=int, default=5)
+    args = parser.parse_args()
+
+    page, stored_annotation = build_page(args.num_sentences, args.sentence_length)
+    num_tokens = args.num_sentences * args.sentence_length
+
+    print(f"# tokens: {num_tokens}")
+    for read in [False, True]:
+        legacy = await time_preparation(
+            legacy_prepare, page, stored_annotation, args.repetitions, read=read
+        )
+        current = await time_preparation(
+            lambda annotation, page: annotation.prepare_with_page(page),
+            page,
+            stored_annotation,
+            args.repetitions,
+            read=read,
+        )
+
+        print("# prepare + read text/pos/morph" if read else "# prepare")
+        print(f"  * per-element coroutines: {legacy * 1000:.1f}ms")
+        print(f"  * sync, lazy:             {current * 1000:.1f}ms")
+        print(f"  * speedup:                {legacy / current:.2f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,126 @@
+"""
+Benchmarks the text codecs on a sample of pages: compression ratio (w.r.t. the raw utf-8 text) and decoding
+throughput (MB/s of decoded text) of legacy zlib against zstd, with and without per-language dictionaries.
+Dictionaries are trained on the first --train-fraction of the pages of each language and evaluated on the rest.
+
+Pages are read either from a local corpus file (see mosaico.corpus) or from MongoDB (MONGO_URI):
+
+    python benchmarks/text_codecs.py --corpus mosaico-core.corpus --num-pages 5000
+    MONGO_URI="<mongo-uri>" python benchmarks/text_codecs.py --num-pages 5000
+"""
+
+import argparse
+import asyncio
+import os
+import time
+import zlib
+from collections import defaultdict
+
+from mosaico.corpus import Corpus
+from mosaico.schema import Language, TextCodec, WikiPage, ZlibCodec, ZstdCodec, init
+
+
+async def load_texts(
+    corpus_path: str | None, num_pages: int
+) -> dict[Language, list[str]]:
+    language2texts = defaultdict(list)
+    if corpus_path is not None:
+        corpus = Corpus(corpus_path)
+        for idx in range(min(num_pages, len(corpus))):
+            page = corpus[idx]
+            language2texts[page.language].append(page.text)
+    else:
+        await init(mongo_uri=os.environ["MONGO_URI"], db="mosaico")
+        async for page in WikiPage.find(limit=num_pages):
+            language2texts[page.language].append(page.text)
+    return language2texts
+
+
+def measure(
+    name: str, encode, texts: list[str], repeats: int
+) -> tuple[str, float, float]:
+    raw_size = sum(len(text.encode()) for text in texts)
+    encoded = [encode(text) for text in texts]
+    encoded_size = sum(len(data) for data in encoded)
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for data in encoded:
+            TextCodec.decode(data)
+    elapsed = time.perf_counter() - start
+
+    return name, raw_size / encoded_size, raw_size * repeats / elapsed / 1024**2
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--corpus", default=None)
+    parser.add_argument("--num-pages", type=int, default=5_000)
+    parser.add_argument("--train-fraction", type=float, default=0.5)
+    parser.add_argument("--dict-size", type=int, default=112 * 1024)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    language2texts = asyncio.run(load_texts(args.corpus, args.num_pages))
+
+    for language, texts in sorted(language2texts.items()):
+        num_train = int(len(texts) * args.train_fraction)
+        train_texts, test_texts = texts[:num_train], texts[num_train:]
+        if len(test_texts) == 0:
+            continue
+
+        zstd_codecs = {level: ZstdCodec(level=level) for level in (3, 19)}
+        dictionaries = ZstdCodec.train_dictionaries(
+            {language: train_texts}, dict_size=args.dict_size
+        )
+        zstd_dict_codecs = {
+            level: ZstdCodec(level=level, dictionaries=dictionaries)
+            for level in (3, 19)
+        }
+
+        rows = [
+            measure(
+                "zlib (legacy)",
+                lambda text: zlib.compress(text.encode()),
+                test_texts,
+                args.repeats,
+            ),
+            measure(
+                "zlib-9",
+                lambda text: ZlibCodec(level=9).encode(text, language),
+                test_texts,
+                args.repeats,
+            ),
+        ]
+        for level, codec in zstd_codecs.items():
+            TextCodec.register(codec)
+            rows.append(
+                measure(
+                    f"zstd-{level}",
+                    lambda text: codec.encode(text, language),
+                    test_texts,
+                    args.repeats,
+                )
+            )
+        for level, codec in zstd_dict_codecs.items():
+            TextCodec.register(codec)
+            rows.append(
+                measure(
+                    f"zstd-{level} + dict",
+                    lambda text: codec.encode(text, language),
+                    test_texts,
+                    args.repeats,
+                )
+            )
+
+        print(
+            f"# {language.value}: {len(test_texts)} test pages (dictionary trained on {len(train_texts)})"
+        )
+        print(f"{'codec':<18} {'ratio':>7} {'decode MB/s':>12}")
+        for name, ratio, throughput in rows:
+            print(f"{name:<18} {ratio:>7.2f} {throughput:>12.1f}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
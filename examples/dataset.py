@@ -0,0 +1,40 @@
+import asyncio
+import os
+
+from mosaico.dataset import MosaicoDataset, build_dataset
+from mosaico.schema import Language, WikiPage, init
+
+
+async def dump(path: str):
+    await init(
+        mongo_uri=os.environ["MONGO_URI"],
+        db="mosaico",
+    )
+
+    num_pages = await build_dataset(
+        path,
+        WikiPage.language == Language.EN,
+        {"is_mosaico_core": True},
+        annotations=["stanza", "wsd"],
+    )
+    print(f"# dumped {num_pages} pages to {path}")
+
+
+def main():
+    path = "data/mosaico-core-en.corpus"
+
+    # step 1: dump the pages locally (this is the only step that needs the DB)
+    asyncio.run(dump(path))
+
+    # step 2: random access, no DB, no event loop (e.g., wrap it into a torch DataLoader with num_workers > 0)
+    dataset = MosaicoDataset(path, annotations=["stanza", "wsd"])
+    print(f"# dataset size: {len(dataset)}")
+
+    page = dataset[len(dataset) // 2]
+    stanza_document = page._annotations["stanza"].document
+    print(f"# {page.title}: {len(stanza_document.sentences)} sentences")
+    print(f"  * first sentence: {stanza_document.sentences[0].text}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 import asyncio
 import os
 
+from mosaico import iter_pages
 from mosaico.schema import Language, WikiPage, init
 
 
@@ -53,6 +54,31 @@ async def main():
     ):
         print(f"  * {page.title}")
 
+    print(
+        "# iterate on all pages in mosaico core, prefetching their stanza annotation in batches (one query per batch rather than one per page):"
+    )
+    async for page in WikiPage.find_and_prefetch(
+        {"is_mosaico_core": True}, annotations=["stanza"], batch_size=100, limit=5
+    ):
+        stanza_document = (await page.get_annotation("stanza")).document
+        print(f"  * {page.title} ({len(stanza_document.sentences)} sentences)")
+    print()
+
+    print(
+        "# same, but reading the cursor, fetching annotations and preparing them concurrently, in a bounded pipeline:"
+    )
+    async for page in iter_pages(
+        {"is_mosaico_core": True},
+        annotations=["stanza"],
+        concurrency=4,
+        prefetch=2,
+        batch_size=100,
+        limit=5,
+    ):
+        # already prepared, no await on the DB
+        stanza_document = (await page.get_annotation("stanza")).document
+        print(f"  * {page.title} ({len(stanza_document.sentences)} sentences)")
+
 
 if __name__ == "__main__":
     asyncio.run(main())
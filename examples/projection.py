@@ -30,6 +30,16 @@ async def main():
     )
     print(f"# language: {page.language.value}")
 
+    # annotations can be projected too: only the requested ones are sent over by the server
+    page = await WikiPage.find_one(
+        WikiPage.language == Language.EN,
+        WikiPage.title == "Velites",
+        annotations=["wsd"],
+    )
+    print("# available annotations (projected):")
+    async for annotation in page.list_annotations():
+        print(f"  * {annotation.name}")
+
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -1,7 +1,13 @@
 import asyncio
 import os
 
-from mosaico.schema import Language, WikiPage, init
+from mosaico.schema import (
+    ColumnarStanzaDocument,
+    Language,
+    StanzaAnnotation,
+    WikiPage,
+    init,
+)
 
 
 async def main():
@@ -18,6 +24,18 @@ async def main():
     for token in stanza_document.sentences[0].tokens:
         print(f"* {token.text} -- ({token.pos}, {token.lemma}, {token.morph})")
 
+    # same data, stored as flat numpy arrays rather than one object per token
+    columnar_document = ColumnarStanzaDocument.from_document(stanza_document, page.text)
+    print(f"# columnar document size: {columnar_document.nbytes} bytes")
+    for token in columnar_document.sentences[0].tokens:
+        print(f"* {token.text} -- ({token.pos}, {token.lemma}, {token.morph})")
+
+    # or load it in columnar form in the first place, skipping pydantic validation altogether
+    StanzaAnnotation.columnar = True
+    page = await WikiPage.get(page.id)
+    columnar_document = (await page.get_annotation("stanza")).document
+    print(f"# loaded a {type(columnar_document).__name__}")
+
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -0,0 +1 @@
+from .pipeline import iter_aligned_pages, iter_pages  # noqa
@@ -0,0 +1,60 @@
+import argparse
+import asyncio
+import os
+
+
+def _add_export_parser(subparsers):
+    parser = subparsers.add_parser(
+        "export",
+        help="export collections into sharded zstd-compressed files (resumable)",
+    )
+    parser.add_argument(
+        "--mongo-uri",
+        default=os.environ.get("MONGO_URI", None),
+        help="defaults to the MONGO_URI env variable",
+    )
+    parser.add_argument("--db", default="mosaico")
+    parser.add_argument("--output-dir", required=True)
+    parser.add_argument("--collections", nargs="+", default=["pages", "annotations"])
+    parser.add_argument("--num-shards", type=int, default=32)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--format", choices=["jsonl", "bson"], default="jsonl")
+    parser.add_argument("--compression-level", type=int, default=3)
+    parser.add_argument("--batch-size", type=int, default=1_000)
+
+
+def _export(args):
+    from .export import export
+
+    if args.mongo_uri is None:
+        raise ValueError(
+            "no mongo uri provided, either set MONGO_URI or pass --mongo-uri"
+        )
+
+    asyncio.run(
+        export(
+            args.mongo_uri,
+            args.db,
+            args.output_dir,
+            collections=tuple(args.collections),
+            num_shards=args.num_shards,
+            concurrency=args.concurrency,
+            format=args.format,
+            compression_level=args.compression_level,
+            batch_size=args.batch_size,
+        )
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="mosaico")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    _add_export_parser(subparsers)
+
+    args = parser.parse_args()
+    if args.command == "export":
+        _export(args)
+
+
+if __name__ == "__main__":
+    main()
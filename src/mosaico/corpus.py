@@ -0,0 +1,334 @@
+import hashlib
+import mmap
+import os
+import struct
+import zlib
+from pathlib import Path
+from typing import Optional
+
+import bson
+import numpy as np
+from tqdm import tqdm
+
+from .schema import (
+    CODEC_OPTIONS,
+    Annotation,
+    Language,
+    MaterializedAnnotationContainer,
+    WikiPage,
+)
+
+_MAGIC = b"MOSAICO\x00"
+_VERSION = 1
+# magic, version, reserved, index offset, index length
+_HEADER = struct.Struct("<8sIIQQ")
+
+_DIRECTORY_DTYPE = np.dtype([("offset", "<i8"), ("length", "<i8")])
+_HASH_TABLE_DTYPE = np.dtype([("hash", "<u8"), ("page_idx", "<i8")])
+_KEYS = ("document_id", "title", "wikidata_id")
+_SECTION_DTYPES = dict(
+    directory=_DIRECTORY_DTYPE, **{key: _HASH_TABLE_DTYPE for key in _KEYS}
+)
+
+
+def _key_hash(*parts: str) -> int:
+    return int.from_bytes(
+        hashlib.blake2b("\x00".join(parts).encode(), digest_size=8).digest(), "little"
+    )
+
+
+def _page_keys(meta: dict) -> dict[str, Optional[int]]:
+    return dict(
+        document_id=_key_hash(meta["document_id"], meta["language"]),
+        title=_key_hash(meta["title"], meta["language"]),
+        wikidata_id=_key_hash(meta["wikidata_id"])
+        if meta.get("wikidata_id") is not None
+        else None,
+    )
+
+
+def _build_hash_table(hashes: list[tuple[int, int]]) -> np.ndarray:
+    # open addressing with linear probing, at most half full
+    size = 1
+    while size < 2 * len(hashes):
+        size *= 2
+    table = np.zeros(size, dtype=_HASH_TABLE_DTYPE)
+    table["page_idx"] = -1
+    mask = size - 1
+    for key_hash, page_idx in hashes:
+        slot = key_hash & mask
+        while table[slot]["page_idx"] != -1:
+            slot = (slot + 1) & mask
+        table[slot] = (key_hash, page_idx)
+    return table
+
+
+class CorpusWriter:
+    """
+    Writes a corpus file (see Corpus), one page at a time. The index is written when the writer is closed.
+    """
+
+    def __init__(self, path: str | Path, compression_level: int = 6):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.compression_level = compression_level
+        self._part_path = self.path.with_name(self.path.name + ".part")
+        self._f = open(self._part_path, "wb")
+        self._f.write(_HEADER.pack(_MAGIC, _VERSION, 0, 0, 0))
+        self._directory: list[tuple[int, int]] = []
+        self._hashes: dict[str, list[tuple[int, int]]] = {key: [] for key in _KEYS}
+
+    def __enter__(self) -> "CorpusWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self._f.close()
+            os.remove(self._part_path)
+
+    def _write(self, data: bytes) -> tuple[int, int]:
+        offset = self._f.tell()
+        self._f.write(data)
+        return offset, len(data)
+
+    def add(self, page: WikiPage):
+        self.add_document(page.to_local_document())
+
+    def add_document(self, document: dict):
+        """
+        Adds a page, given as returned by WikiPage.to_local_document. Its text and each of its annotations are
+        written as separate segments, followed by a small uncompressed BSON header pointing to them.
+        """
+        meta = dict(document)
+        meta["language"] = Language(meta["language"]).value
+        meta["segments"] = dict(text=self._write(bytes(meta.pop("compressed_text"))))
+        meta["annotations"] = {}
+        for materialized_annotation in meta.pop("materialized_annotations", []):
+            meta["annotations"][materialized_annotation["name"]] = self._write(
+                zlib.compress(
+                    bson.encode(
+                        materialized_annotation["annotation"],
+                        codec_options=CODEC_OPTIONS,
+                    ),
+                    self.compression_level,
+                )
+            )
+
+        page_idx = len(self._directory)
+        self._directory.append(
+            self._write(bson.encode(meta, codec_options=CODEC_OPTIONS))
+        )
+        for key, key_hash in _page_keys(meta).items():
+            if key_hash is not None:
+                self._hashes[key].append((key_hash, page_idx))
+
+    def _write_array(self, array: np.ndarray) -> tuple[int, int]:
+        # align arrays, so that they can be mapped as numpy arrays in place
+        self._f.write(b"\x00" * (-self._f.tell() % 8))
+        return self._write(array.tobytes())
+
+    def close(self):
+        sections = dict(
+            directory=self._write_array(
+                np.asarray(self._directory, dtype=np.int64)
+                .reshape(-1, 2)
+                .view(_DIRECTORY_DTYPE)
+                .reshape(-1)
+            )
+        )
+        for key in _KEYS:
+            sections[key] = self._write_array(_build_hash_table(self._hashes[key]))
+
+        index_offset, index_length = self._write(
+            bson.encode(dict(num_pages=len(self._directory), sections=sections))
+        )
+        self._f.seek(0)
+        self._f.write(_HEADER.pack(_MAGIC, _VERSION, 0, index_offset, index_length))
+        self._f.close()
+        os.replace(self._part_path, self.path)
+
+
+async def build_corpus(
+    path: str | Path,
+    *args,
+    annotations: Optional[list[str]] = None,
+    batch_size: int = 100,
+    **kwargs,
+) -> int:
+    """
+    Dumps the pages matching the given query (same arguments as WikiPage.find, restricted to annotations if
+    provided) into a corpus file. Returns the number of pages written.
+    """
+    path = Path(path)
+    num_pages = 0
+    with CorpusWriter(path) as writer, tqdm(
+        desc=f"building {path.name}", unit="pages"
+    ) as progress_bar:
+        async for page in WikiPage.find_and_prefetch(
+            *args, annotations=annotations, batch_size=batch_size, **kwargs
+        ):
+            writer.add(page)
+            num_pages += 1
+            progress_bar.update()
+    return num_pages
+
+
+class _Segment:
+    def __init__(self, corpus: "Corpus", offset: int, length: int):
+        self.corpus = corpus
+        self.offset = offset
+        self.length = length
+
+    def decode(self) -> dict:
+        return bson.decode(
+            zlib.decompress(self.corpus._mmap[self.offset : self.offset + self.length]),
+            CODEC_OPTIONS,
+        )
+
+
+class _SegmentAnnotationContainer(MaterializedAnnotationContainer):
+    """
+    Materialized annotation whose raw dict is still a segment of the corpus file: it is sliced and decompressed
+    only when the annotation is first accessed.
+    """
+
+    @property
+    def annotation(self) -> Annotation:
+        if isinstance(self.raw_annotation, _Segment):
+            self.raw_annotation = self.raw_annotation.decode()
+        return super().annotation
+
+
+class Corpus:
+    """
+    Read-only, single-file corpus of pages, memory-mapped. The file holds:
+        * a fixed-size header, with the position of the index
+        * per page, its compressed text and each of its annotations as separate (zlib-compressed BSON) segments,
+          followed by a small uncompressed BSON header with the page fields and the segment positions
+        * the index: a page directory (position of each page header) and three open-addressing hash tables over
+          (document_id, language), (title, language) and wikidata_id
+    Lookups by key cost one hash table probe plus one page header decode, i.e. O(1), and loading an annotation
+    of a page one mmap slice and one decompression. Pages are regular WikiPage objects (not requiring init), with
+    the same get_annotation API.
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self._pid: Optional[int] = None
+
+    def _open(self):
+        # (re)open lazily in each process, as memory maps are not picklable
+        if self._pid == os.getpid():
+            return
+
+        with open(self.path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, _, index_offset, index_length = _HEADER.unpack_from(self._mmap)
+        if magic != _MAGIC:
+            raise ValueError(f"{self.path} is not a mosaico corpus file")
+        if version != _VERSION:
+            raise ValueError(f"unsupported corpus version {version}")
+
+        index = bson.decode(self._mmap[index_offset : index_offset + index_length])
+        self._num_pages = index["num_pages"]
+        self._arrays = {
+            name: np.frombuffer(
+                self._mmap,
+                dtype=_SECTION_DTYPES[name],
+                count=length // _SECTION_DTYPES[name].itemsize,
+                offset=offset,
+            )
+            for name, (offset, length) in index["sections"].items()
+        }
+        self._pid = os.getpid()
+
+    def __getstate__(self) -> dict:
+        return dict(path=self.path)
+
+    def __setstate__(self, state: dict):
+        self.__init__(**state)
+
+    def __len__(self) -> int:
+        self._open()
+        return self._num_pages
+
+    def __getitem__(self, idx: int) -> WikiPage:
+        self._open()
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError(idx)
+        return self._build_page(self._read_meta(idx))
+
+    def _read_meta(self, page_idx: int) -> dict:
+        offset, length = self._arrays["directory"][page_idx].tolist()
+        return bson.decode(self._mmap[offset : offset + length], CODEC_OPTIONS)
+
+    def _build_page(self, meta: dict) -> WikiPage:
+        text_offset, text_length = meta.pop("segments")["text"]
+        document = dict(
+            meta,
+            compressed_text=self._mmap[text_offset : text_offset + text_length],
+            materialized_annotations=[
+                _SegmentAnnotationContainer(
+                    name=name, annotation=_Segment(self, offset, length)
+                )
+                for name, (offset, length) in meta.pop("annotations").items()
+            ],
+        )
+        page = WikiPage.from_local_document(document)
+        page._file_backed = True
+        return page
+
+    def _lookup(self, key: str, key_hash: int, matches) -> list[WikiPage]:
+        self._open()
+        table = self._arrays[key]
+        if len(table) == 0:
+            return []
+
+        pages = []
+        mask = len(table) - 1
+        slot = key_hash & mask
+        while True:
+            entry_hash, page_idx = table[slot].tolist()
+            if page_idx == -1:
+                break
+            if entry_hash == key_hash:
+                # hashes can collide, check the actual key
+                meta = self._read_meta(page_idx)
+                if matches(meta):
+                    pages.append(self._build_page(meta))
+            slot = (slot + 1) & mask
+        return pages
+
+    def get(self, document_id: str, language: Language) -> Optional[WikiPage]:
+        language = Language(language).value
+        pages = self._lookup(
+            "document_id",
+            _key_hash(document_id, language),
+            lambda meta: meta["document_id"] == document_id
+            and meta["language"] == language,
+        )
+        return pages[0] if len(pages) > 0 else None
+
+    def get_by_title(self, language: Language, title: str) -> Optional[WikiPage]:
+        language = Language(language).value
+        pages = self._lookup(
+            "title",
+            _key_hash(title, language),
+            lambda meta: meta["title"] == title and meta["language"] == language,
+        )
+        return pages[0] if len(pages) > 0 else None
+
+    def find_by_wikidata_id(self, wikidata_id: str) -> list[WikiPage]:
+        """
+        Returns all the language versions of wikidata_id in the corpus.
+        """
+        return self._lookup(
+            "wikidata_id",
+            _key_hash(wikidata_id),
+            lambda meta: meta.get("wikidata_id") == wikidata_id,
+        )
@@ -0,0 +1,44 @@
+from pathlib import Path
+from typing import Coroutine, Optional
+
+from .corpus import Corpus, build_corpus
+from .schema import WikiPage
+
+# datasets are corpus files
+build_dataset = build_corpus
+
+
+def _run_sync(coroutine: Coroutine):
+    # corpus pages hold all their annotations and are prepared bypassing caches and executors, so preparing them
+    # never actually suspends and can be driven without an event loop
+    try:
+        coroutine.send(None)
+    except StopIteration as e:
+        return e.value
+    coroutine.close()
+    raise RuntimeError("coroutine suspended, page is not fully local")
+
+
+class MosaicoDataset(Corpus):
+    """
+    Map-style dataset (e.g., to be wrapped by a torch DataLoader) over a corpus file written by build_dataset (i.e.,
+    build_corpus). The file is memory-mapped, so __len__ and __getitem__ are O(1), need neither a DB nor init, and
+    DataLoader workers share the OS page cache rather than holding copies of the corpus.
+
+    Items are WikiPage objects; annotations (if provided) are prepared before being returned, so that they can be
+    read synchronously, e.g. page._annotations["stanza"] or, equivalently, awaiting page.get_annotation("stanza").
+    """
+
+    def __init__(self, path: str | Path, annotations: Optional[list[str]] = None):
+        super().__init__(path)
+        self.annotations = annotations
+
+    def __getstate__(self) -> dict:
+        return dict(path=self.path, annotations=self.annotations)
+
+    def __getitem__(self, idx: int) -> WikiPage:
+        page = super().__getitem__(idx)
+        for name in self.annotations or []:
+            if name in page._annotations:
+                _run_sync(page.get_annotation(name))
+        return page
@@ -0,0 +1,510 @@
+import re
+from pathlib import Path
+from typing import Any, Iterable, Iterator, Optional
+
+from beanie import Link, PydanticObjectId
+from bson import DBRef
+from tqdm import tqdm
+
+from .postings import PostingsIndex, PostingsWriter
+from .schema import (
+    Annotation,
+    Language,
+    LinkedAnnotationContainer,
+    MaterializedAnnotationContainer,
+    REAnnotation,
+    RETriple,
+    WikiPage,
+    WikilinksAnnotation,
+)
+
+# how an entity is mentioned, stored as its index
+MENTION_KINDS = ("wikilink", "projected_wikilink", "propagated", "re_head", "re_tail")
+
+_ENTITIES_KIND, _RELATIONS_KIND = "entities", "relations"
+# page idx, mention kind, sentence idx, token start, token span length
+_ENTITIES_NUM_COLUMNS = 5
+# page idx, triple idx, head entity, tail entity
+_RELATIONS_NUM_COLUMNS = 4
+
+_WIKIDATA_ID = re.compile(r"([QP])([1-9]\d*)")
+# the lowest bit of encoded ids tells items from properties
+_WIKIDATA_PREFIXES = ("Q", "P")
+
+
+def _wikidata_id_to_int(wikidata_id: Optional[str]) -> int:
+    # "Q76" -> 152, "P26" -> 53, 0 for missing (or neither item nor property) ids, as Wikidata numbers start at 1
+    match = _WIKIDATA_ID.fullmatch(wikidata_id or "")
+    if match is None:
+        return 0
+    prefix, number = match.groups()
+    return 2 * int(number) + _WIKIDATA_PREFIXES.index(prefix)
+
+
+def _int_to_wikidata_id(value: int) -> Optional[str]:
+    return f"{_WIKIDATA_PREFIXES[value & 1]}{value >> 1}" if value != 0 else None
+
+
+def _entity_mentions(
+    wikilinks: Optional[WikilinksAnnotation], re_annotation: Optional[REAnnotation]
+) -> Iterator[tuple[str, int, int, int, int]]:
+    """
+    Yields (wikidata id, mention kind idx, sentence idx, token start, token end) of the mentions of the entities in
+    wikilinks (propagated spans included) and in the arguments of the re triples.
+    """
+    if wikilinks is not None:
+        for kind, links in [
+            ("wikilink", wikilinks.wikilinks),
+            ("projected_wikilink", wikilinks.projected_wikilinks),
+        ]:
+            for link in links or []:
+                if link.wikidata_id is None:
+                    continue
+                kind_idx = MENTION_KINDS.index(kind)
+                yield (link.wikidata_id, kind_idx, link.sentence_idx, *link.token_span)
+                kind_idx = MENTION_KINDS.index("propagated")
+                for sentence_idx, token_span, _ in link.propagated_spans or []:
+                    yield (link.wikidata_id, kind_idx, sentence_idx, *token_span)
+
+    if re_annotation is not None:
+        for triple in re_annotation.triples:
+            for kind, argument in [("re_head", triple.head), ("re_tail", triple.tail)]:
+                if argument.wikidata_id is None:
+                    continue
+                kind_idx = MENTION_KINDS.index(kind)
+                yield (
+                    argument.wikidata_id,
+                    kind_idx,
+                    argument.sentence_idx,
+                    *argument.token_span,
+                )
+
+
+def _relation_triples(
+    indexed_triples: Iterable[tuple[int, RETriple]],
+) -> Iterator[tuple[str, int, int, int]]:
+    """
+    Yields (relation wikidata id, triple idx, head entity, tail entity) of the triples having a relation id.
+    """
+    for triple_idx, triple in indexed_triples:
+        if triple.relation.wikidata_id is not None:
+            yield (
+                triple.relation.wikidata_id,
+                triple_idx,
+                _wikidata_id_to_int(triple.head.wikidata_id),
+                _wikidata_id_to_int(triple.tail.wikidata_id),
+            )
+
+
+async def _unprepared_annotation(page: WikiPage, name: str) -> Optional[Annotation]:
+    # indexed fields are all stored ones, so annotations are only validated, not prepared: preparing re would
+    # load stanza and decode the text
+    if name not in page.annotation_names:
+        return None
+    annotation = page._annotations[name]
+    if isinstance(annotation, Link):
+        await WikiPage.prefetch_annotations([page], names=[name])
+        annotation = page._annotations[name]
+    if isinstance(annotation, MaterializedAnnotationContainer):
+        annotation = annotation.annotation
+    return annotation
+
+
+class EntityIndexWriter:
+    """
+    Adds pages to an entity index (see EntityIndex), writing them as new segments on flush. Adding a page
+    supersedes the postings it had in older segments.
+    """
+
+    def __init__(self, folder: str | Path, buffer_size: int = 10_000_000):
+        folder = Path(folder)
+        self._entities_writer = PostingsWriter(
+            folder / _ENTITIES_KIND,
+            _ENTITIES_KIND,
+            _ENTITIES_NUM_COLUMNS,
+            buffer_size=buffer_size,
+        )
+        self._relations_writer = PostingsWriter(
+            folder / _RELATIONS_KIND,
+            _RELATIONS_KIND,
+            _RELATIONS_NUM_COLUMNS,
+            buffer_size=buffer_size,
+        )
+
+    def __enter__(self) -> "EntityIndexWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.flush()
+
+    def add_annotations(
+        self,
+        page_id: PydanticObjectId,
+        language: Language,
+        wikilinks: Optional[WikilinksAnnotation] = None,
+        re_annotation: Optional[REAnnotation] = None,
+    ):
+        page_idx = self._entities_writer.add_page(page_id)
+        for wikidata_id, kind_idx, sentence_idx, start, end in _entity_mentions(
+            wikilinks, re_annotation
+        ):
+            self._entities_writer.add(
+                wikidata_id,
+                language,
+                page_idx,
+                kind_idx,
+                sentence_idx,
+                start,
+                end - start,
+            )
+
+        page_idx = self._relations_writer.add_page(page_id)
+        if re_annotation is not None:
+            for relation_id, *values in _relation_triples(
+                enumerate(re_annotation.triples)
+            ):
+                self._relations_writer.add(relation_id, language, page_idx, *values)
+
+    async def add(self, page: WikiPage):
+        """
+        Adds the wikilinks and re annotations of page (or removes it from the index, if it has neither).
+        """
+        annotations = {
+            name: await _unprepared_annotation(page, name)
+            for name in ["wikilinks", "re"]
+        }
+        self.add_annotations(
+            page.id, page.language, annotations["wikilinks"], annotations["re"]
+        )
+
+    def remove(self, page_id: PydanticObjectId):
+        self.add_annotations(page_id, Language.EN)
+
+    def flush(self):
+        self._entities_writer.flush()
+        self._relations_writer.flush()
+
+
+class EntityIndex:
+    """
+    Inverted index from Wikidata ids to where they occur: entities (e.g. "Q76") to their mentions, from wikilinks
+    (with their propagated spans), projected wikilinks and re arguments, and relations (e.g. "P26") to the re
+    triples expressing them. Built offline with build_entity_index and kept up to date with an EntityIndexWriter,
+    as SenseIndex (see PostingsIndex for the format); entity ids in postings are stored as integers.
+
+        index = EntityIndex("entity-index")
+        for page_id, language, kind, sentence_idx, token_span in index.mentions("Q76", languages=[Language.IT]):
+            ...
+
+    Without an index, aggregate_entity_mentions and aggregate_relation_triples answer the same queries on the live
+    DB.
+    """
+
+    def __init__(self, folder: str | Path):
+        folder = Path(folder)
+        self._entities = PostingsIndex(
+            folder / _ENTITIES_KIND, _ENTITIES_KIND, _ENTITIES_NUM_COLUMNS
+        )
+        self._relations = PostingsIndex(
+            folder / _RELATIONS_KIND, _RELATIONS_KIND, _RELATIONS_NUM_COLUMNS
+        )
+
+    def count_mentions(
+        self, wikidata_id: str, languages: Optional[Iterable[Language]] = None
+    ) -> int:
+        return self._entities.count(wikidata_id, languages)
+
+    def mentions(
+        self,
+        wikidata_id: str,
+        languages: Optional[Iterable[Language]] = None,
+        limit: Optional[int] = None,
+    ) -> list[tuple[PydanticObjectId, Language, str, int, tuple[int, int]]]:
+        """
+        Returns the mentions of entity wikidata_id, restricted to the given languages if provided, as (page id,
+        language, mention kind, sentence_idx, token_span) tuples, mention kind being one of MENTION_KINDS.
+        """
+        return [
+            (
+                page_id,
+                language,
+                MENTION_KINDS[kind_idx],
+                sentence_idx,
+                (start, start + length),
+            )
+            for page_id, language, (
+                kind_idx,
+                sentence_idx,
+                start,
+                length,
+            ) in self._entities.find(wikidata_id, languages, limit)
+        ]
+
+    def count_triples(
+        self, relation_id: str, languages: Optional[Iterable[Language]] = None
+    ) -> int:
+        return self._relations.count(relation_id, languages)
+
+    def triples(
+        self,
+        relation_id: str,
+        languages: Optional[Iterable[Language]] = None,
+        limit: Optional[int] = None,
+    ) -> list[tuple[PydanticObjectId, Language, int, Optional[str], Optional[str]]]:
+        """
+        Returns the re triples of relation relation_id, restricted to the given languages if provided, as (page id,
+        language, triple_idx, head wikidata id, tail wikidata id) tuples, triple_idx indexing REAnnotation.triples.
+        """
+        return [
+            (
+                page_id,
+                language,
+                triple_idx,
+                _int_to_wikidata_id(head),
+                _int_to_wikidata_id(tail),
+            )
+            for page_id, language, (triple_idx, head, tail) in self._relations.find(
+                relation_id, languages, limit
+            )
+        ]
+
+    def compact(self):
+        self._entities.compact()
+        self._relations.compact()
+
+
+async def build_entity_index(
+    folder: str | Path, *args, batch_size: int = 100, **kwargs
+) -> int:
+    """
+    Indexes the wikilinks and re annotations of the pages matching the given query (same arguments as
+    WikiPage.find) into new segments of the entity index in folder. Returns the number of pages indexed.
+    """
+    names = ["wikilinks", "re"]
+    num_pages = 0
+    with (
+        EntityIndexWriter(folder) as writer,
+        tqdm(desc="indexing entities", unit="pages") as progress_bar,
+    ):
+        async for page in WikiPage.find_and_prefetch(
+            {
+                "$or": [
+                    {"materialized_annotations.name": {"$in": names}},
+                    {"linked_annotation_names": {"$in": names}},
+                ]
+            },
+            *args,
+            annotations=names,
+            batch_size=batch_size,
+            **kwargs,
+        ):
+            await writer.add(page)
+            num_pages += 1
+            progress_bar.update()
+    return num_pages
+
+
+def _indexed_triples(triples: str, cond: dict) -> dict:
+    # the triples matching cond (on $$item.triple), each as {"idx": <triple idx>, "triple": <triple>}
+    return {
+        "$filter": {
+            "input": {
+                "$map": {
+                    "input": {"$range": [0, {"$size": {"$ifNull": [triples, []]}}]},
+                    "as": "idx",
+                    "in": {
+                        "idx": "$$idx",
+                        "triple": {"$arrayElemAt": [triples, "$$idx"]},
+                    },
+                }
+            },
+            "as": "item",
+            "cond": cond,
+        }
+    }
+
+
+async def _aggregate(
+    match: dict, project: dict, languages: Optional[Iterable[Language]]
+) -> list[tuple[Any, Language, str, dict]]:
+    """
+    Runs the same aggregation over the materialized annotations of the pages and over the linked ones, returning
+    (page id, language, annotation name, projected annotation) tuples. match and project apply to an annotation
+    container, i.e. to "name" and "annotation" fields.
+    """
+    page_match = (
+        {}
+        if languages is None
+        else {"language": {"$in": [Language(language).value for language in languages]}}
+    )
+    pages = WikiPage.get_motor_collection()
+    linked_collection = LinkedAnnotationContainer.get_motor_collection()
+
+    results = []
+    async for document in pages.aggregate(
+        [
+            {
+                "$match": {
+                    **page_match,
+                    "materialized_annotations": {"$elemMatch": match},
+                }
+            },
+            {"$unwind": "$materialized_annotations"},
+            # same shape as a LinkedAnnotationContainer, plus the page language
+            {
+                "$project": {
+                    "language": 1,
+                    "name": "$materialized_annotations.name",
+                    "annotation": "$materialized_annotations.annotation",
+                }
+            },
+            {"$match": match},
+            {"$project": {"language": 1, "name": 1, **project}},
+        ],
+        allowDiskUse=True,
+    ):
+        results.append(
+            (
+                document["_id"],
+                Language(document["language"]),
+                document["name"],
+                document,
+            )
+        )
+
+    # linked annotations do not point back to their page: find the pages linking the matching ones
+    linked_documents = [
+        document
+        async for document in linked_collection.aggregate(
+            [{"$match": match}, {"$project": {"name": 1, **project}}], allowDiskUse=True
+        )
+    ]
+    if len(linked_documents) > 0:
+        linked_id2page = {}
+        async for page in pages.find(
+            {
+                **page_match,
+                "linked_annotations": {
+                    "$in": [
+                        DBRef(linked_collection.name, document["_id"])
+                        for document in linked_documents
+                    ]
+                },
+            },
+            {"language": 1, "linked_annotations": 1},
+        ):
+            for link in page["linked_annotations"]:
+                linked_id2page[link.id] = (page["_id"], Language(page["language"]))
+        for document in linked_documents:
+            if document["_id"] in linked_id2page:
+                results.append(
+                    (*linked_id2page[document["_id"]], document["name"], document)
+                )
+    return results
+
+
+async def aggregate_entity_mentions(
+    wikidata_id: str,
+    languages: Optional[Iterable[Language]] = None,
+    limit: Optional[int] = None,
+) -> list[tuple[Any, Language, str, int, tuple[int, int]]]:
+    """
+    Same as EntityIndex.mentions, but computed on the live DB with aggregation pipelines: the server only sends
+    the wikilinks and triples mentioning wikidata_id. Slower than an index, and unable to look into packed
+    annotations (see AnnotationPacker), but always up to date.
+    """
+    match = {
+        "$or": [
+            {"name": "wikilinks", "annotation.wikilinks.wikidata_id": wikidata_id},
+            {
+                "name": "wikilinks",
+                "annotation.projected_wikilinks.wikidata_id": wikidata_id,
+            },
+            {"name": "re", "annotation.triples.head.wikidata_id": wikidata_id},
+            {"name": "re", "annotation.triples.tail.wikidata_id": wikidata_id},
+        ]
+    }
+    project = {
+        field: {
+            "$filter": {
+                "input": {"$ifNull": [f"$annotation.{field}", []]},
+                "as": "link",
+                "cond": {"$eq": ["$$link.wikidata_id", wikidata_id]},
+            }
+        }
+        for field in ["wikilinks", "projected_wikilinks"]
+    }
+    project["triples"] = _indexed_triples(
+        "$annotation.triples",
+        {
+            "$or": [
+                {"$eq": ["$$item.triple.head.wikidata_id", wikidata_id]},
+                {"$eq": ["$$item.triple.tail.wikidata_id", wikidata_id]},
+            ]
+        },
+    )
+
+    mentions = []
+    for page_id, language, name, document in await _aggregate(
+        match, project, languages
+    ):
+        wikilinks, re_annotation = None, None
+        if name == "wikilinks":
+            wikilinks = WikilinksAnnotation(
+                wikilinks=document["wikilinks"],
+                projected_wikilinks=document["projected_wikilinks"],
+            )
+        else:
+            re_annotation = REAnnotation(
+                triples=[item["triple"] for item in document["triples"]]
+            )
+        for mention_id, kind_idx, sentence_idx, start, end in _entity_mentions(
+            wikilinks, re_annotation
+        ):
+            if mention_id != wikidata_id:
+                continue
+            if limit is not None and len(mentions) >= limit:
+                return mentions
+            mentions.append(
+                (page_id, language, MENTION_KINDS[kind_idx], sentence_idx, (start, end))
+            )
+    return mentions
+
+
+async def aggregate_relation_triples(
+    relation_id: str,
+    languages: Optional[Iterable[Language]] = None,
+    limit: Optional[int] = None,
+) -> list[tuple[Any, Language, int, Optional[str], Optional[str]]]:
+    """
+    Same as EntityIndex.triples, but computed on the live DB with aggregation pipelines (see
+    aggregate_entity_mentions).
+    """
+    match = {"name": "re", "annotation.triples.relation.wikidata_id": relation_id}
+    project = dict(
+        triples=_indexed_triples(
+            "$annotation.triples",
+            {"$eq": ["$$item.triple.relation.wikidata_id", relation_id]},
+        )
+    )
+
+    triples = []
+    for page_id, language, _, document in await _aggregate(match, project, languages):
+        indexed_triples = [
+            (item["idx"], RETriple.model_validate(item["triple"]))
+            for item in document["triples"]
+        ]
+        for _, triple_idx, head, tail in _relation_triples(indexed_triples):
+            if limit is not None and len(triples) >= limit:
+                return triples
+            triples.append(
+                (
+                    page_id,
+                    language,
+                    triple_idx,
+                    _int_to_wikidata_id(head),
+                    _int_to_wikidata_id(tail),
+                )
+            )
+    return triples
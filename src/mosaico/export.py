@@ -0,0 +1,253 @@
+import asyncio
+import logging
+import os
+from pathlib import Path
+from typing import Literal, Optional
+
+from bson import CodecOptions, json_util
+from bson.raw_bson import RawBSONDocument
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorCollection
+from tqdm import tqdm
+
+try:
+    import zstandard
+except ModuleNotFoundError:
+    zstandard = None
+
+
+ExportFormat = Literal["jsonl", "bson"]
+
+
+def _shard_path(
+    output_dir: Path, collection: str, shard_idx: int, num_shards: int, format: str
+) -> Path:
+    return output_dir / f"{collection}-{shard_idx:05d}-of-{num_shards:05d}.{format}.zst"
+
+
+class _Checkpoint:
+    """
+    Per-collection checkpoint, stored as <collection>.checkpoint.json in the output folder. It keeps the format and
+    the _id boundaries of the shards (so that a restarted export writes the collection exactly as the original one)
+    and the indices of the shards that have been fully written.
+    """
+
+    def __init__(
+        self, path: Path, format: ExportFormat, boundaries: list, completed: set[int]
+    ):
+        self.path = path
+        self.format = format
+        self.boundaries = boundaries
+        self.completed = completed
+
+    @property
+    def num_shards(self) -> int:
+        return len(self.boundaries) + 1
+
+    @classmethod
+    def load(cls, path: Path) -> Optional["_Checkpoint"]:
+        if not path.exists():
+            return None
+        with open(path) as f:
+            data = json_util.loads(f.read())
+        return cls(path, data["format"], data["boundaries"], set(data["completed"]))
+
+    def save(self):
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            f.write(
+                json_util.dumps(
+                    dict(
+                        format=self.format,
+                        boundaries=self.boundaries,
+                        completed=sorted(self.completed),
+                    )
+                )
+            )
+        os.replace(tmp_path, self.path)
+
+
+async def _compute_boundaries(
+    collection: AsyncIOMotorCollection, num_shards: int, samples_per_shard: int = 100
+) -> list:
+    """
+    Computes num_shards - 1 _id split points from a random sample of the collection, so that shards are
+    roughly equally sized without scanning (or sorting) the whole collection.
+    """
+    if num_shards <= 1:
+        return []
+
+    sampled_ids = sorted(
+        [
+            doc["_id"]
+            async for doc in collection.aggregate(
+                [
+                    {"$sample": {"size": num_shards * samples_per_shard}},
+                    {"$project": {"_id": 1}},
+                ]
+            )
+        ]
+    )
+    if len(sampled_ids) == 0:
+        return []
+
+    boundaries = []
+    for i in range(1, num_shards):
+        boundary = sampled_ids[i * len(sampled_ids) // num_shards]
+        if len(boundaries) == 0 or boundaries[-1] != boundary:
+            boundaries.append(boundary)
+    return boundaries
+
+
+def _shard_filter(boundaries: list, shard_idx: int) -> dict:
+    id_filter = {}
+    if shard_idx > 0:
+        id_filter["$gte"] = boundaries[shard_idx - 1]
+    if shard_idx < len(boundaries):
+        id_filter["$lt"] = boundaries[shard_idx]
+    return {"_id": id_filter} if len(id_filter) > 0 else {}
+
+
+def _encode_batch(docs: list, format: ExportFormat) -> bytes:
+    if format == "bson":
+        return b"".join(doc.raw for doc in docs)
+    else:
+        return "".join(
+            json_util.dumps(doc, json_options=json_util.RELAXED_JSON_OPTIONS) + "\n"
+            for doc in docs
+        ).encode()
+
+
+async def _export_shard(
+    collection: AsyncIOMotorCollection,
+    checkpoint: _Checkpoint,
+    shard_idx: int,
+    output_dir: Path,
+    format: ExportFormat,
+    compression_level: int,
+    batch_size: int,
+    progress_bar: tqdm,
+):
+    path = _shard_path(
+        output_dir, collection.name, shard_idx, checkpoint.num_shards, format
+    )
+    part_path = path.with_name(path.name + ".part")
+
+    cursor = collection.find(
+        _shard_filter(checkpoint.boundaries, shard_idx), batch_size=batch_size
+    )
+
+    with open(part_path, "wb") as f:
+        writer = zstandard.ZstdCompressor(
+            level=compression_level, threads=-1
+        ).stream_writer(f)
+        batch = []
+        async for doc in cursor:
+            batch.append(doc)
+            if len(batch) == batch_size:
+                # encoding and compression are cpu bound, keep them off the event loop
+                await asyncio.to_thread(
+                    lambda batch=batch: writer.write(_encode_batch(batch, format))
+                )
+                progress_bar.update(len(batch))
+                batch = []
+        if len(batch) > 0:
+            await asyncio.to_thread(
+                lambda batch=batch: writer.write(_encode_batch(batch, format))
+            )
+            progress_bar.update(len(batch))
+        writer.close()
+
+    os.replace(part_path, path)
+    checkpoint.completed.add(shard_idx)
+    checkpoint.save()
+
+
+async def export_collection(
+    collection: AsyncIOMotorCollection,
+    output_dir: str | Path,
+    num_shards: int = 32,
+    concurrency: int = 8,
+    format: ExportFormat = "jsonl",
+    compression_level: int = 3,
+    batch_size: int = 1_000,
+):
+    """
+    Exports a collection into num_shards zstd-compressed files, each covering a contiguous _id range, using up to
+    concurrency cursors in parallel. jsonl shards contain (relaxed) extended JSON, i.e. the same format as
+    mongoexport, while bson shards contain concatenated BSON documents, i.e. the same format as mongodump.
+
+    After each shard, a checkpoint is written: if the export is interrupted, calling this function again with the
+    same output_dir only exports the shards that were not completed (num_shards is then read from the checkpoint,
+    while a different format is refused).
+    """
+    if zstandard is None:
+        raise ModuleNotFoundError(
+            "Package zstandard not installed. Please install it: 'pdm install -G export'"
+        )
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    checkpoint_path = output_dir / f"{collection.name}.checkpoint.json"
+    checkpoint = _Checkpoint.load(checkpoint_path)
+    if checkpoint is None:
+        checkpoint = _Checkpoint(
+            checkpoint_path,
+            format,
+            await _compute_boundaries(collection, num_shards),
+            completed=set(),
+        )
+        checkpoint.save()
+    elif checkpoint.format != format:
+        raise ValueError(
+            f"found checkpoint for {collection.name} with format {checkpoint.format}, cannot resume it with format {format}: pass the same format, or use another output_dir"
+        )
+    elif checkpoint.num_shards != num_shards:
+        logging.warning(
+            f"found checkpoint for {collection.name} with {checkpoint.num_shards} shards, resuming it and ignoring num_shards={num_shards}"
+        )
+
+    if format == "bson":
+        collection = collection.with_options(
+            codec_options=CodecOptions(document_class=RawBSONDocument)
+        )
+
+    pending_shards = [
+        shard_idx
+        for shard_idx in range(checkpoint.num_shards)
+        if shard_idx not in checkpoint.completed
+    ]
+    if len(pending_shards) < checkpoint.num_shards:
+        logging.info(
+            f"resuming export of {collection.name}: {len(pending_shards)} / {checkpoint.num_shards} shards left"
+        )
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def export_shard(shard_idx: int):
+        async with semaphore:
+            await _export_shard(
+                collection,
+                checkpoint,
+                shard_idx,
+                output_dir,
+                format,
+                compression_level,
+                batch_size,
+                progress_bar,
+            )
+
+    with tqdm(desc=f"exporting {collection.name}", unit="docs") as progress_bar:
+        await asyncio.gather(*[export_shard(shard_idx) for shard_idx in pending_shards])
+
+
+async def export(
+    mongo_uri: str,
+    db: str,
+    output_dir: str | Path,
+    collections: tuple[str, ...] = ("pages", "annotations"),
+    **kwargs,
+):
+    client = AsyncIOMotorClient(mongo_uri)
+    for collection in collections:
+        await export_collection(client[db][collection], output_dir, **kwargs)
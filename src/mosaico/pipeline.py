@@ -0,0 +1,275 @@
+import asyncio
+from contextlib import aclosing
+from typing import AsyncIterator, Awaitable, Callable, Iterable, Optional
+
+from beanie.odm.utils.parsing import parse_obj
+from beanie.odm.utils.projection import get_projection
+
+from .schema import InterlanguageLink, Language, WikiPage
+from .schema.wikipage import _AnnotationsProjection
+
+# end of stream marker, flowing through the queues after the last batch
+_DONE = object()
+
+
+async def _read_batches(output: asyncio.Queue, batch_size: int, items: AsyncIterator):
+    batch = []
+    async for item in items:
+        batch.append(item)
+        if len(batch) == batch_size:
+            await output.put(batch)
+            batch = []
+    if len(batch) > 0:
+        await output.put(batch)
+    await output.put(_DONE)
+
+
+async def _run_stage(
+    input: asyncio.Queue,
+    output: asyncio.Queue,
+    process: Callable[[list[WikiPage]], Awaitable[list[WikiPage]]],
+    concurrency: int,
+):
+    async def worker():
+        while (batch := await input.get()) is not _DONE:
+            await output.put(await process(batch))
+        # put it back for the other workers
+        await input.put(_DONE)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    await output.put(_DONE)
+
+
+async def _iter_stages(
+    stages: list[Awaitable], output: asyncio.Queue
+) -> AsyncIterator[list]:
+    """
+    Runs stages concurrently, yielding the batches they put in output until _DONE.
+    """
+    stages = [asyncio.ensure_future(stage) for stage in stages]
+
+    try:
+        while True:
+            get = asyncio.ensure_future(output.get())
+            # wait on the stages too, so that their errors are raised here rather than stalling the queues
+            while not get.done():
+                running_stages = [stage for stage in stages if not stage.done()]
+                await asyncio.wait(
+                    [get, *running_stages], return_when=asyncio.FIRST_COMPLETED
+                )
+                for stage in stages:
+                    if stage.done() and stage.exception() is not None:
+                        get.cancel()
+                        raise stage.exception()
+
+            batch = get.result()
+            if batch is _DONE:
+                break
+            yield batch
+    finally:
+        for stage in stages:
+            stage.cancel()
+        await asyncio.gather(*stages, return_exceptions=True)
+
+
+async def _prepare_pages(pages: list[WikiPage], annotations: Optional[list[str]]):
+    for page in pages:
+        names = annotations if annotations is not None else list(page._annotations)
+        for name in names:
+            if name in page._annotations:
+                await page.get_annotation(name)
+
+
+async def iter_pages(
+    *args,
+    annotations: Optional[list[str]] = None,
+    concurrency: int = 4,
+    prefetch: int = 2,
+    batch_size: int = 100,
+    prepare: bool = True,
+    **kwargs,
+) -> AsyncIterator[WikiPage]:
+    """
+    Same as WikiPage.find_and_prefetch (same arguments), but the work is split into three stages running
+    concurrently, so that the network is not idle while pages are parsed and prepared:
+        * reading the cursor (with the given batch_size) into batches of batch_size pages
+        * fetching the linked annotations of each batch (see WikiPage.prefetch_annotations)
+        * preparing the annotations of each page (restricted to annotations, if provided), if prepare is set
+    The last two stages process up to concurrency batches at the same time, and stages are connected by queues
+    holding at most prefetch batches, so that memory stays bounded by roughly
+    (3 * prefetch + 2 * concurrency) * batch_size pages whatever the speed of the consumer.
+
+    With concurrency > 1, batches may be yielded in a different order than the cursor's one. As in
+    find_and_prefetch, pages are read through the disk cache, if enabled (see init).
+    """
+    batches = asyncio.Queue(maxsize=prefetch)
+    prefetched_batches = asyncio.Queue(maxsize=prefetch)
+    prepared_batches = asyncio.Queue(maxsize=prefetch)
+
+    async def prefetch_batch(batch: list[WikiPage]) -> list[WikiPage]:
+        return await WikiPage.prefetch_annotations(batch, names=annotations)
+
+    async def prepare_batch(batch: list[WikiPage]) -> list[WikiPage]:
+        await _prepare_pages(batch, annotations)
+        return batch
+
+    stages = [
+        _read_batches(
+            batches,
+            batch_size,
+            WikiPage._scan(
+                *args, annotations=annotations, batch_size=batch_size, **kwargs
+            ),
+        ),
+        _run_stage(batches, prefetched_batches, prefetch_batch, concurrency),
+    ]
+    if prepare:
+        stages.append(
+            _run_stage(prefetched_batches, prepared_batches, prepare_batch, concurrency)
+        )
+    else:
+        prepared_batches = prefetched_batches
+    # closed as soon as the consumer stops, cancelling the stages
+    async with aclosing(_iter_stages(stages, prepared_batches)) as output_batches:
+        async for batch in output_batches:
+            for page in batch:
+                yield page
+
+
+async def _read_aligned_groups(
+    languages: list[Language],
+    annotations: Optional[list[str]],
+    query: Optional[dict],
+    require_all: bool,
+    batch_size: int,
+) -> AsyncIterator[dict[Language, WikiPage]]:
+    language_values = [language.value for language in languages]
+    projection_model = (
+        _AnnotationsProjection.build(WikiPage, annotations)
+        if annotations is not None
+        else WikiPage
+    )
+    page_pipeline = [{"$project": get_projection(projection_model)}]
+    if query is not None:
+        page_pipeline.insert(0, {"$match": query})
+
+    pipeline = [
+        {
+            "$match": {
+                "page_links.language": {
+                    "$all" if require_all else "$in": language_values
+                }
+            }
+        },
+        {
+            "$project": {
+                "page_ids": {
+                    "$map": {
+                        "input": {
+                            "$filter": {
+                                "input": "$page_links",
+                                "as": "page_link",
+                                "cond": {
+                                    "$in": ["$$page_link.language", language_values]
+                                },
+                            }
+                        },
+                        "as": "page_link",
+                        "in": "$$page_link.page_id",
+                    }
+                }
+            }
+        },
+        # a single join for all the language versions, through the _id index of pages
+        {
+            "$lookup": {
+                "from": WikiPage.get_motor_collection().name,
+                "localField": "page_ids",
+                "foreignField": "_id",
+                "pipeline": page_pipeline,
+                "as": "pages",
+            }
+        },
+    ]
+    if require_all:
+        # some pages may not match query
+        pipeline.append({"$match": {"pages": {"$size": len(languages)}}})
+
+    async for document in InterlanguageLink.get_motor_collection().aggregate(
+        pipeline, allowDiskUse=True, batchSize=batch_size
+    ):
+        pages = [parse_obj(projection_model, page) for page in document["pages"]]
+        language2page = {page.language: page for page in pages}
+        if len(language2page) == 0 or (
+            require_all and len(language2page) < len(languages)
+        ):
+            continue
+        yield {
+            language: language2page[language]
+            for language in languages
+            if language in language2page
+        }
+
+
+async def iter_aligned_pages(
+    languages: Iterable[Language],
+    annotations: Optional[list[str]] = None,
+    query: Optional[dict] = None,
+    require_all: bool = True,
+    concurrency: int = 4,
+    prefetch: int = 2,
+    batch_size: int = 100,
+    prepare: bool = True,
+) -> AsyncIterator[dict[Language, WikiPage]]:
+    """
+    Iterates on the concepts having a page in languages (in all of them if require_all is set, in at least one
+    otherwise), yielding, for each of them, its pages as a {language: page} dict. Only pages matching query (a
+    dict), if provided, are considered.
+
+    Starting from the interlanguage links, the pages of all the language versions are joined with $lookup in a
+    single aggregation (which needs MongoDB 5.0+), restricted to annotations (as in WikiPage.find) if provided, so
+    that there is no round trip per concept or per language. As in iter_pages, groups are then read in batches of
+    batch_size, whose linked annotations are prefetched and prepared in concurrent stages.
+    """
+    languages = [Language(language) for language in languages]
+    batches = asyncio.Queue(maxsize=prefetch)
+    prefetched_batches = asyncio.Queue(maxsize=prefetch)
+    prepared_batches = asyncio.Queue(maxsize=prefetch)
+
+    async def prefetch_batch(
+        batch: list[dict[Language, WikiPage]],
+    ) -> list[dict[Language, WikiPage]]:
+        await WikiPage.prefetch_annotations(
+            [page for group in batch for page in group.values()], names=annotations
+        )
+        return batch
+
+    async def prepare_batch(
+        batch: list[dict[Language, WikiPage]],
+    ) -> list[dict[Language, WikiPage]]:
+        await _prepare_pages(
+            [page for group in batch for page in group.values()], annotations
+        )
+        return batch
+
+    stages = [
+        _read_batches(
+            batches,
+            batch_size,
+            _read_aligned_groups(
+                languages, annotations, query, require_all, batch_size
+            ),
+        ),
+        _run_stage(batches, prefetched_batches, prefetch_batch, concurrency),
+    ]
+    if prepare:
+        stages.append(
+            _run_stage(prefetched_batches, prepared_batches, prepare_batch, concurrency)
+        )
+    else:
+        prepared_batches = prefetched_batches
+    # closed as soon as the consumer stops, cancelling the stages
+    async with aclosing(_iter_stages(stages, prepared_batches)) as output_batches:
+        async for batch in output_batches:
+            for group in batch:
+                yield group
@@ -0,0 +1,401 @@
+import mmap
+import os
+import re
+from collections import defaultdict
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+import bson
+import numpy as np
+from beanie import PydanticObjectId
+
+from .corpus import _HASH_TABLE_DTYPE, _HEADER, _build_hash_table, _key_hash
+from .schema import Language
+
+_MAGIC = b"MOSPSTNG"
+_VERSION = 1
+
+_PAGE_ID_DTYPE = np.dtype("S12")
+_ENTRY_DTYPE = np.dtype(
+    [
+        ("label_offset", "<i8"),
+        ("label_length", "<i8"),
+        ("language", "<i8"),
+        ("count", "<i8"),
+        ("postings_offset", "<i8"),
+        ("postings_length", "<i8"),
+    ]
+)
+_SECTION_DTYPES = dict(
+    page_ids=_PAGE_ID_DTYPE,
+    keys=_HASH_TABLE_DTYPE,
+    entries=_ENTRY_DTYPE,
+    labels=np.dtype("u1"),
+    postings=np.dtype("u1"),
+)
+_LANGUAGES = list(Language)
+_SEGMENT_NAME = re.compile(r"segment-(\d+)\.postings")
+
+
+def _encode_varints(values: np.ndarray) -> bytes:
+    # LEB128, vectorized: 7 bits per byte, high bit set on all bytes but the last one of each value
+    values = np.asarray(values, dtype=np.uint64)
+    num_bytes = np.ones(len(values), dtype=np.int64)
+    for shift in range(7, 64, 7):
+        num_bytes += values >= (np.uint64(1) << np.uint64(shift))
+    positions = np.cumsum(num_bytes) - num_bytes
+    encoded = np.empty(int(num_bytes.sum()), dtype=np.uint8)
+    for k in range(int(num_bytes.max(initial=0))):
+        mask = num_bytes > k
+        byte = (values[mask] >> np.uint64(7 * k)) & np.uint64(0x7F)
+        byte |= np.where(num_bytes[mask] > k + 1, 0x80, 0).astype(np.uint64)
+        encoded[positions[mask] + k] = byte
+    return encoded.tobytes()
+
+
+def _decode_varints(data: np.ndarray) -> np.ndarray:
+    ends = np.flatnonzero(data < 0x80)
+    starts = np.concatenate([[0], ends[:-1] + 1])
+    lengths = ends - starts + 1
+    values = np.zeros(len(ends), dtype=np.uint64)
+    for k in range(int(lengths.max(initial=0))):
+        mask = lengths > k
+        values[mask] |= (
+            data[starts[mask] + k].astype(np.uint64) & np.uint64(0x7F)
+        ) << np.uint64(7 * k)
+    return values.astype(np.int64)
+
+
+def _segment_paths(folder: Path) -> list[Path]:
+    return sorted(
+        (
+            path
+            for path in folder.iterdir()
+            if _SEGMENT_NAME.fullmatch(path.name) is not None
+        ),
+        key=lambda path: int(_SEGMENT_NAME.fullmatch(path.name).group(1)),
+    )
+
+
+def _next_segment_path(folder: Path) -> Path:
+    paths = _segment_paths(folder)
+    last_segment_id = (
+        int(_SEGMENT_NAME.fullmatch(paths[-1].name).group(1)) if len(paths) > 0 else 0
+    )
+    return folder / f"segment-{last_segment_id + 1:06d}.postings"
+
+
+def _write_segment(
+    path: Path,
+    kind: str,
+    num_columns: int,
+    page_ids: list[bytes],
+    postings: dict[tuple[str, int], list[list[int]]],
+):
+    part_path = path.with_name(path.name + ".part")
+    keys = sorted(postings)
+
+    labels = bytearray()
+    entries = np.zeros(len(keys), dtype=_ENTRY_DTYPE)
+    posting_lists = bytearray()
+    hashes = []
+    for entry_idx, (label, language_idx) in enumerate(keys):
+        columns = [
+            np.asarray(column, dtype=np.int64)
+            for column in postings[label, language_idx]
+        ]
+        # pages are added in order, so page idxs are non-decreasing and delta-encoded. The columns are written
+        # one after the other, each as varints
+        encoded = _encode_varints(
+            np.concatenate([np.diff(columns[0], prepend=0), *columns[1:]])
+        )
+        label_bytes = label.encode()
+        entries[entry_idx] = (
+            len(labels),
+            len(label_bytes),
+            language_idx,
+            len(columns[0]),
+            len(posting_lists),
+            len(encoded),
+        )
+        labels += label_bytes
+        posting_lists += encoded
+        hashes.append((_key_hash(label, _LANGUAGES[language_idx].value), entry_idx))
+
+    with open(part_path, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, _VERSION, 0, 0, 0))
+        sections = {}
+        for name, data in [
+            ("page_ids", np.asarray(page_ids, dtype=_PAGE_ID_DTYPE).tobytes()),
+            ("keys", _build_hash_table(hashes).tobytes()),
+            ("entries", entries.tobytes()),
+            ("labels", bytes(labels)),
+            ("postings", bytes(posting_lists)),
+        ]:
+            # align sections, so that they can be mapped as numpy arrays in place
+            f.write(b"\x00" * (-f.tell() % 8))
+            sections[name] = (f.tell(), len(data))
+            f.write(data)
+        index_offset = f.tell()
+        index = bson.encode(
+            dict(
+                kind=kind,
+                num_columns=num_columns,
+                num_pages=len(page_ids),
+                sections=sections,
+            )
+        )
+        f.write(index)
+        f.seek(0)
+        f.write(_HEADER.pack(_MAGIC, _VERSION, 0, index_offset, len(index)))
+    os.replace(part_path, path)
+
+
+class PostingsWriter:
+    """
+    Adds postings to a postings index (see PostingsIndex), buffering them in memory and writing them as a new
+    segment on flush (or, between pages, once buffer_size postings are buffered). Adding a page supersedes the
+    postings it had in older segments, so that pages can be re-added after their annotations change.
+    """
+
+    def __init__(
+        self,
+        folder: str | Path,
+        kind: str,
+        num_columns: int,
+        buffer_size: int = 10_000_000,
+    ):
+        self.folder = Path(folder)
+        self.folder.mkdir(parents=True, exist_ok=True)
+        self.kind = kind
+        self.num_columns = num_columns
+        self.buffer_size = buffer_size
+        self._page_ids: list[bytes] = []
+        self._page_id2idx: dict[bytes, int] = {}
+        # (label, language index) -> columns, the first one being page idxs
+        self._postings: dict[tuple[str, int], list[list[int]]] = defaultdict(
+            lambda: [[] for _ in range(self.num_columns)]
+        )
+        self._num_postings = 0
+
+    def __enter__(self) -> "PostingsWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.flush()
+
+    def add_page(self, page_id: PydanticObjectId) -> int:
+        """
+        Starts a page (with no postings, it removes the page from the index) and returns its idx, to be passed to
+        add.
+        """
+        page_id = PydanticObjectId(page_id).binary
+        # postings of the same page must all come from the same segment
+        if page_id in self._page_id2idx or self._num_postings >= self.buffer_size:
+            self.flush()
+        page_idx = len(self._page_ids)
+        self._page_ids.append(page_id)
+        self._page_id2idx[page_id] = page_idx
+        return page_idx
+
+    def add(self, label: str, language: Language, page_idx: int, *values: int):
+        """
+        Adds a posting of page_idx to label, language. values are non-negative integers, one per column after the
+        page idx.
+        """
+        columns = self._postings[label, _LANGUAGES.index(Language(language))]
+        columns[0].append(page_idx)
+        for column, value in zip(columns[1:], values):
+            column.append(value)
+        self._num_postings += 1
+
+    def flush(self):
+        if len(self._page_ids) == 0:
+            return
+        _write_segment(
+            _next_segment_path(self.folder),
+            self.kind,
+            self.num_columns,
+            self._page_ids,
+            self._postings,
+        )
+        self._page_ids = []
+        self._page_id2idx = {}
+        self._postings.clear()
+        self._num_postings = 0
+
+
+class _Segment:
+    def __init__(self, path: Path, kind: str, num_columns: int):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, _, index_offset, index_length = _HEADER.unpack_from(self._mmap)
+        if magic != _MAGIC:
+            raise ValueError(f"{path} is not a mosaico postings segment")
+        if version != _VERSION:
+            raise ValueError(f"unsupported postings version {version}")
+
+        index = bson.decode(self._mmap[index_offset : index_offset + index_length])
+        if index["kind"] != kind or index["num_columns"] != num_columns:
+            raise ValueError(f"{path} is a {index['kind']} segment, not a {kind} one")
+        self.num_columns = num_columns
+        self.arrays = {
+            name: np.frombuffer(
+                self._mmap,
+                dtype=_SECTION_DTYPES[name],
+                count=length // _SECTION_DTYPES[name].itemsize,
+                offset=offset,
+            )
+            for name, (offset, length) in index["sections"].items()
+        }
+        # set by PostingsIndex, pages re-added (or removed) in newer segments
+        self.superseded = np.zeros(len(self.arrays["page_ids"]), dtype=bool)
+
+    def page_id(self, page_idx: int) -> bytes:
+        # numpy strips trailing null bytes
+        return self.arrays["page_ids"][page_idx].ljust(12, b"\x00")
+
+    def label(self, entry: np.void) -> str:
+        offset, length = int(entry["label_offset"]), int(entry["label_length"])
+        return bytes(self.arrays["labels"][offset : offset + length]).decode()
+
+    def lookup(self, label: str, language_idx: int) -> Optional[np.void]:
+        table = self.arrays["keys"]
+        if len(table) == 0:
+            return None
+        key_hash = _key_hash(label, _LANGUAGES[language_idx].value)
+        mask = len(table) - 1
+        slot = key_hash & mask
+        while True:
+            entry_hash, entry_idx = table[slot].tolist()
+            if entry_idx == -1:
+                return None
+            if entry_hash == key_hash:
+                # hashes can collide, check the actual key
+                entry = self.arrays["entries"][entry_idx]
+                if entry["language"] == language_idx and self.label(entry) == label:
+                    return entry
+            slot = (slot + 1) & mask
+
+    def postings(self, entry: np.void) -> np.ndarray:
+        """
+        Returns the (count, num_columns) array of postings of entry, skipping superseded pages.
+        """
+        offset, length = int(entry["postings_offset"]), int(entry["postings_length"])
+        values = _decode_varints(self.arrays["postings"][offset : offset + length])
+        postings = values.reshape(self.num_columns, int(entry["count"])).T.copy()
+        postings[:, 0] = np.cumsum(postings[:, 0])
+        return postings[~self.superseded[postings[:, 0]]]
+
+
+class PostingsIndex:
+    """
+    Inverted index from (label, language) keys to postings, i.e. rows of num_columns non-negative integers, the
+    first one identifying a page. Used by SenseIndex and EntityIndex.
+
+    The index is a folder of immutable, memory-mapped segment files, written by PostingsWriter. Each segment holds
+    the ids of its pages, a hash table over (label, language) and, per key, its posting list, column by column as
+    varints (page idxs delta-encoded). A query costs one hash table probe plus the decoding of the matching
+    posting lists, per segment; postings of pages re-added in newer segments are skipped. compact merges all the
+    segments into one.
+    """
+
+    def __init__(self, folder: str | Path, kind: str, num_columns: int):
+        self.folder = Path(folder)
+        self.kind = kind
+        self.num_columns = num_columns
+        self._segments = (
+            [_Segment(path, kind, num_columns) for path in _segment_paths(self.folder)]
+            if self.folder.exists()
+            else []
+        )
+
+        # newest segment first, mark pages appearing again in a newer one
+        newer_page_ids = np.zeros(0, dtype=_PAGE_ID_DTYPE)
+        for segment in reversed(self._segments):
+            page_ids = segment.arrays["page_ids"]
+            segment.superseded = np.isin(page_ids, newer_page_ids)
+            newer_page_ids = np.union1d(newer_page_ids, page_ids)
+
+    def _postings(
+        self, label: str, languages: Optional[Iterable[Language]]
+    ) -> Iterator[tuple[_Segment, Language, np.ndarray]]:
+        language_idxs = (
+            range(len(_LANGUAGES))
+            if languages is None
+            else [_LANGUAGES.index(Language(language)) for language in languages]
+        )
+        for segment in self._segments:
+            for language_idx in language_idxs:
+                entry = segment.lookup(label, language_idx)
+                if entry is not None:
+                    yield segment, _LANGUAGES[language_idx], segment.postings(entry)
+
+    def count(self, label: str, languages: Optional[Iterable[Language]] = None) -> int:
+        return sum(len(postings) for _, _, postings in self._postings(label, languages))
+
+    def find(
+        self,
+        label: str,
+        languages: Optional[Iterable[Language]] = None,
+        limit: Optional[int] = None,
+    ) -> list[tuple[PydanticObjectId, Language, tuple[int, ...]]]:
+        """
+        Returns the postings of label, restricted to the given languages if provided, as (page id, language,
+        values) tuples, values being the columns after the page idx.
+        """
+        postings = []
+        for segment, language, segment_postings in self._postings(label, languages):
+            for page_idx, *values in segment_postings.tolist():
+                if limit is not None and len(postings) >= limit:
+                    return postings
+                postings.append(
+                    (
+                        PydanticObjectId(segment.page_id(page_idx)),
+                        language,
+                        tuple(values),
+                    )
+                )
+        return postings
+
+    def compact(self):
+        """
+        Rewrites all the segments as a single one, dropping superseded postings.
+        """
+        if len(self._segments) <= 1:
+            return
+
+        page_ids = []
+        postings = defaultdict(lambda: [[] for _ in range(self.num_columns)])
+        for segment in self._segments:
+            page_idx_map = np.full(len(segment.arrays["page_ids"]), -1, dtype=np.int64)
+            # live pages appear in exactly one segment
+            for page_idx in np.flatnonzero(~segment.superseded):
+                page_idx_map[page_idx] = len(page_ids)
+                page_ids.append(segment.page_id(page_idx))
+            for entry in segment.arrays["entries"]:
+                entry_postings = segment.postings(entry)
+                entry_postings[:, 0] = page_idx_map[entry_postings[:, 0]]
+                columns = postings[segment.label(entry), int(entry["language"])]
+                for column, values in zip(columns, entry_postings.T):
+                    column.extend(values.tolist())
+
+        # page idxs must be non-decreasing within each posting list
+        for columns in postings.values():
+            order = np.argsort(columns[0], kind="stable")
+            columns[:] = [np.asarray(column)[order] for column in columns]
+
+        old_paths = [segment.path for segment in self._segments]
+        _write_segment(
+            _next_segment_path(self.folder),
+            self.kind,
+            self.num_columns,
+            page_ids,
+            postings,
+        )
+        for old_path in old_paths:
+            os.remove(old_path)
+        self.__init__(self.folder, self.kind, self.num_columns)
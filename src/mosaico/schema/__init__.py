@@ -1,11 +1,15 @@
-from beanie import init_beanie as _init_beanie
-from motor.motor_asyncio import AsyncIOMotorClient as _AsyncIOMotorClient
+from concurrent.futures import Executor
 
 from .annotations import (
     AMRAnnotation,  # noqa
     AMRGraph,  # noqa
     Annotation,  # noqa
+    AnnotationPacker,  # noqa
     CirrusAnnotation,  # noqa
+    ColumnarStanzaDocument,  # noqa
+    ColumnarStanzaSentence,  # noqa
+    ColumnarStanzaToken,  # noqa
+    ColumnarStanzaWord,  # noqa
     LinkedAnnotationContainer,  # noqa
     MaterializedAnnotationContainer,  # noqa
     MissedWikilink,  # noqa
@@ -27,23 +31,79 @@ from .annotations import (
     WSDAnnotation,  # noqa
     WSDSpanAnnotation,  # noqa
 )
+from .annotation_writer import AnnotationWriter  # noqa
+from .disk_cache import DiskCache  # noqa
 from .interlanguage_link import InterlanguageLink, Language  # noqa
+from .memory_cache import MemoryCache  # noqa
+from .span_index import Span, SpanIndex  # noqa
+from .storage import (  # noqa
+    CODEC_OPTIONS,
+    MongoBackend,
+    SQLiteBackend,
+    StorageBackend,
+)
+from .text_codec import ChunkedCodec, TextCodec, ZlibCodec, ZstdCodec  # noqa
+from .view import WikiPageView  # noqa
 from .wikipage import ProjectedWikiPageModel_LanguageTitleType, WikiPage  # noqa
 
 
-async def init(mongo_uri, db, write_user: bool = False):
-    # Create Motor client
-    client = _AsyncIOMotorClient(mongo_uri)
-
-    if not write_user:
-        # todo open issue on beanie and fix this write_user nonsense
-        print("careful, beanie issue still open")
-        LinkedAnnotationContainer.Settings.indexes = []
-        InterlanguageLink.Settings.indexes = []
-        WikiPage.Settings.indexes = []
+async def init(
+    mongo_uri: str | None = None,
+    db: str | None = None,
+    write_user: bool = False,
+    cache_dir: str | None = None,
+    cache_size: int = 10 * 1024**3,
+    cache_validate_revisions: bool = False,
+    memory_cache_size: int | None = None,
+    backend: StorageBackend | None = None,
+    text_codec: TextCodec | None = None,
+    annotation_packer: AnnotationPacker | None = None,
+    annotation_executor: Executor | None = None,
+):
+    # Storage defaults to MongoDB (mongo_uri and db); pass backend (e.g., SQLiteBackend) to run on a local store
+    if backend is None:
+        backend = MongoBackend(mongo_uri, db, write_user=write_user)
+    # revisions are only tracked by beanie, i.e. on MongoDB
+    if cache_validate_revisions and not backend.uses_beanie:
+        raise ValueError(
+            f"cache_validate_revisions is not supported by {type(backend).__name__}"
+        )
+    WikiPage.backend = backend
 
-    # Initialize beanie with the Sample document class and a database
-    await _init_beanie(
-        database=client[db],
-        document_models=[LinkedAnnotationContainer, InterlanguageLink, WikiPage],
+    # Set up the optional on-disk read-through cache (cache_size is in bytes). If cache_validate_revisions is set,
+    # every cache hit is checked against the revision_id in the DB (a tiny query), otherwise warm reads are offline.
+    # The cache serves point lookups (WikiPage.get, WikiPage.get_by_title), linked annotations and, when offline,
+    # repeated scans of find_and_prefetch and iter_pages (see WikiPage._scan); WikiPage.find always reads the DB
+    WikiPage.disk_cache = (
+        DiskCache(cache_dir, max_size=cache_size) if cache_dir is not None else None
     )
+    WikiPage.disk_cache_validate_revisions = cache_validate_revisions
+
+    # Set up the optional in-process LRU cache of pages and prepared annotations (memory_cache_size is in bytes).
+    # An existing cache with the same budget is kept, so that calling init again (e.g., on streamlit reruns) does
+    # not drop it
+    if memory_cache_size is None:
+        WikiPage.memory_cache = None
+    elif (
+        WikiPage.memory_cache is None
+        or WikiPage.memory_cache.max_size != memory_cache_size
+    ):
+        WikiPage.memory_cache = MemoryCache(memory_cache_size)
+
+    # Texts of new pages are written with text_codec (e.g., ZstdCodec with per-language dictionaries), which is also
+    # registered to decode them. Without it, legacy zlib is written, readable by any version of the library
+    WikiPage.text_codec = text_codec
+    if text_codec is not None:
+        TextCodec.register(text_codec)
+
+    # If set (e.g., a ProcessPoolExecutor), annotations are validated in annotation_executor rather than in the
+    # event loop, see MaterializedAnnotationContainer.instantiate
+    WikiPage.annotation_executor = annotation_executor
+
+    # Annotations written to MongoDB afterwards are packed by annotation_packer (packed ones are always readable).
+    # Beanie reads encoders at initialization, hence set before backend.init
+    AnnotationPacker.current = annotation_packer
+    WikiPage.Settings.bson_encoders = AnnotationPacker.bson_encoders()
+    LinkedAnnotationContainer.Settings.bson_encoders = AnnotationPacker.bson_encoders()
+
+    await backend.init()
@@ -0,0 +1,270 @@
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Optional
+from uuid import UUID, uuid4
+
+from beanie import PydanticObjectId
+from beanie.odm.utils.dump import get_dict
+from beanie.odm.utils.encoder import Encoder
+from bson import Binary, DBRef
+from pymongo import UpdateOne
+
+from .annotations import Annotation, AnnotationPacker, LinkedAnnotationContainer
+from .wikipage import WikiPage
+
+
+class AnnotationWriter:
+    """
+    Buffers annotations to be added to pages and writes them in batches: one unordered bulk_write of $push updates
+    on the pages (one per page, even with several annotations) plus one unordered insert_many of the linked
+    annotation containers, instead of rewriting the whole page document for every annotation, as
+    WikiPage.add_annotation does. Up to concurrency batches are written at the same time.
+
+        async with AnnotationWriter(batch_size=1_000) as writer:
+            async for page in WikiPage.find(...):
+                await writer.add(page, annotate(page), materialized=False)
+
+    Updates only apply if the page does not have an annotation with the same name already and, when pages are
+    given as WikiPage objects and check_revision is set, if the page is still at the revision it was loaded at.
+    Updates that do not apply are conflicts: they are collected in conflicts (as (page_id, name) pairs), their
+    linked containers are deleted and, if raise_on_conflict is set, flush raises a RuntimeError. Each applied
+    update bumps the revision_id of the page, so that concurrent WikiPage.save calls detect it.
+
+    Pages given as WikiPage objects are not updated in memory. On backends other than MongoDB, annotations are
+    added one by one through WikiPage.add_annotation.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = 1_000,
+        concurrency: int = 4,
+        check_revision: bool = False,
+        raise_on_conflict: bool = False,
+    ):
+        self.batch_size = batch_size
+        self.check_revision = check_revision
+        self.raise_on_conflict = raise_on_conflict
+        self.conflicts: list[tuple[PydanticObjectId, str]] = []
+
+        # (page id, revision id, annotation, materialized)
+        self._buffer: list[
+            tuple[PydanticObjectId, Optional[UUID], Annotation, bool]
+        ] = []
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._tasks: list[asyncio.Task] = []
+
+    async def __aenter__(self) -> "AnnotationWriter":
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        # conflicts must not mask an exception raised in the body
+        await self.flush(raise_on_conflict=self.raise_on_conflict and exc_type is None)
+
+    async def add(
+        self,
+        page: WikiPage | PydanticObjectId | str,
+        annotation: Annotation,
+        materialized: bool = True,
+    ):
+        if isinstance(page, WikiPage):
+            page_id, revision_id = page.id, page.stored_revision_id
+        else:
+            page_id, revision_id = PydanticObjectId(page), None
+        self._buffer.append((page_id, revision_id, annotation, materialized))
+
+        if len(self._buffer) >= self.batch_size:
+            batch, self._buffer = self._buffer, []
+            # blocks once concurrency batches are being written
+            await self._semaphore.acquire()
+            task = asyncio.ensure_future(self._write_batch(batch))
+            task.add_done_callback(lambda _: self._semaphore.release())
+            self._tasks.append(task)
+
+    async def flush(self, raise_on_conflict: Optional[bool] = None):
+        """
+        Writes the buffered annotations and waits for all the pending batches. raise_on_conflict, if given,
+        overrides the one of the writer.
+        """
+        tasks, self._tasks = self._tasks, []
+        try:
+            if len(self._buffer) > 0:
+                batch, self._buffer = self._buffer, []
+                async with self._semaphore:
+                    await self._write_batch(batch)
+        finally:
+            # background batches are awaited even if the last one failed, so that none is left pending and the
+            # conflicts of all of them are collected
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+            errors = [result for result in results if isinstance(result, BaseException)]
+            for error in errors:
+                logging.error(f"failed to write a batch of annotations: {error!r}")
+        # kept until here, so that errors of background batches are raised
+        if len(errors) > 0:
+            raise errors[0]
+
+        if raise_on_conflict is None:
+            raise_on_conflict = self.raise_on_conflict
+        if raise_on_conflict and len(self.conflicts) > 0:
+            raise RuntimeError(
+                f"{len(self.conflicts)} annotations could not be added, first one: {self.conflicts[0]}"
+            )
+
+    async def _write_batch(self, batch: list):
+        if not WikiPage.backend.uses_beanie:
+            await self._write_batch_one_by_one(batch)
+            return
+
+        # same encoders as WikiPage.save, e.g. packing annotations if enabled
+        encoder = Encoder(
+            to_db=True,
+            custom_encoders=AnnotationPacker.bson_encoders(),
+            keep_nulls=False,
+        )
+        linked_annotations_collection = LinkedAnnotationContainer.get_collection_name()
+
+        # group by page, so that each page gets a single update
+        page_id2items = defaultdict(list)
+        for page_id, revision_id, annotation, materialized in batch:
+            page_id2items[page_id, revision_id].append((annotation, materialized))
+
+        linked_containers = []
+        updates = []
+        # per update: page id, names, new revision id, materialized annotations and linked container ids
+        update_infos = []
+        for (page_id, revision_id), items in page_id2items.items():
+            materialized_annotations, linked_names, link_ids = [], [], []
+            names = []
+            for annotation, materialized in items:
+                if annotation.name in names:
+                    # the first one is pushed, if the update applies
+                    self.conflicts.append((page_id, annotation.name))
+                    continue
+                names.append(annotation.name)
+                if materialized:
+                    materialized_annotations.append(
+                        dict(
+                            name=annotation.name, annotation=encoder.encode(annotation)
+                        )
+                    )
+                else:
+                    container = LinkedAnnotationContainer.from_annotation(annotation)
+                    container.id = PydanticObjectId()
+                    container.revision_id = uuid4()
+                    linked_containers.append(
+                        get_dict(container, to_db=True, keep_nulls=False)
+                    )
+                    linked_names.append(annotation.name)
+                    link_ids.append(container.id)
+
+            page_filter = {
+                "_id": page_id,
+                "materialized_annotations.name": {"$nin": names},
+                "linked_annotation_names": {"$nin": names},
+            }
+            if self.check_revision and revision_id is not None:
+                page_filter["revision_id"] = Binary.from_uuid(revision_id)
+
+            push = {}
+            if len(materialized_annotations) > 0:
+                push["materialized_annotations"] = {"$each": materialized_annotations}
+            if len(linked_names) > 0:
+                push["linked_annotation_names"] = {"$each": linked_names}
+                push["linked_annotations"] = {
+                    "$each": [
+                        DBRef(linked_annotations_collection, link_id)
+                        for link_id in link_ids
+                    ]
+                }
+
+            new_revision_id = Binary.from_uuid(uuid4())
+            updates.append(
+                UpdateOne(
+                    page_filter,
+                    {"$push": push, "$set": {"revision_id": new_revision_id}},
+                )
+            )
+            update_infos.append(
+                (page_id, names, new_revision_id, materialized_annotations, link_ids)
+            )
+
+        # containers first, so that pages never link to missing ones
+        if len(linked_containers) > 0:
+            await LinkedAnnotationContainer.get_motor_collection().insert_many(
+                linked_containers, ordered=False
+            )
+
+        result = await WikiPage.get_motor_collection().bulk_write(
+            updates, ordered=False
+        )
+        if result.matched_count < len(updates):
+            await self._collect_conflicts(update_infos)
+
+        for page_id, *_ in update_infos:
+            WikiPage._evict_page_from_caches(page_id)
+
+    async def _collect_conflicts(self, update_infos: list):
+        # bulk_write only reports counts: find out which updates did not apply from the revision id they set or,
+        # if the page was modified again since then, from what they pushed: the linked containers they added or,
+        # without any, their materialized annotations (an equal annotation with the same name counts as applied)
+        page_id2document = {
+            document["_id"]: document
+            async for document in WikiPage.get_motor_collection().find(
+                {"_id": {"$in": [page_id for page_id, *_ in update_infos]}},
+                {
+                    "revision_id": 1,
+                    "materialized_annotations": 1,
+                    "linked_annotations": 1,
+                },
+            )
+        }
+
+        orphan_link_ids = []
+        for (
+            page_id,
+            names,
+            new_revision_id,
+            materialized_annotations,
+            link_ids,
+        ) in update_infos:
+            document = page_id2document.get(page_id, {})
+            if document.get("revision_id") == new_revision_id:
+                continue
+            if len(link_ids) > 0:
+                linked_ids = {
+                    link.id for link in document.get("linked_annotations", [])
+                }
+                applied = link_ids[0] in linked_ids
+            else:
+                applied = all(
+                    materialized_annotation
+                    in document.get("materialized_annotations", [])
+                    for materialized_annotation in materialized_annotations
+                )
+            if not applied:
+                self.conflicts.extend((page_id, name) for name in names)
+                orphan_link_ids.extend(link_ids)
+
+        if len(orphan_link_ids) > 0:
+            logging.warning(
+                f"{len(orphan_link_ids)} linked annotations conflicted, deleting their containers"
+            )
+            await LinkedAnnotationContainer.get_motor_collection().delete_many(
+                {"_id": {"$in": orphan_link_ids}}
+            )
+
+    async def _write_batch_one_by_one(self, batch: list):
+        for page_id, revision_id, annotation, materialized in batch:
+            page = await WikiPage.get(page_id)
+            if (
+                page is None
+                or annotation.name in page._annotations
+                or (
+                    self.check_revision
+                    and revision_id is not None
+                    and revision_id != page.stored_revision_id
+                )
+            ):
+                self.conflicts.append((page_id, annotation.name))
+                continue
+            await page.add_annotation(annotation, materialized=materialized)
@@ -5,6 +5,7 @@ from .base import (
     MaterializedAnnotationContainer,  # noqa
 )
 from .cirrus import CirrusAnnotation  # noqa
+from .packing import AnnotationPacker  # noqa
 from .rel_ex import REAnnotation, RETriple  # noqa
 from .sectioning import Paragraph, Section, SectioningAnnotation  # noqa
 from .srl import PredArgStructure, SRLAnnotation  # noqa
@@ -15,6 +16,12 @@ from .stanza import (
     StanzaAnnotationToken,  # noqa
     StanzaAnnotationWord,  # noqa
 )
+from .stanza_columnar import (
+    ColumnarStanzaDocument,  # noqa
+    ColumnarStanzaSentence,  # noqa
+    ColumnarStanzaToken,  # noqa
+    ColumnarStanzaWord,  # noqa
+)
 from .wikilinks import (  # noqa
     MissedWikilink,
     ProjectedWikilink,
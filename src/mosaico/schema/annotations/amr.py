@@ -12,3 +12,10 @@ class AMRGraph(BaseModel):
 class AMRAnnotation(Annotation):
     name: ClassVar[str] = "amr"
     sentence_graphs: list[AMRGraph | None]
+
+    @property
+    def estimated_size(self) -> int:
+        return sum(
+            128 + len(graph.penman) if graph is not None else 16
+            for graph in self.sentence_graphs
+        )
@@ -1,13 +1,20 @@
-from typing import Any, ClassVar
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, ClassVar, Optional
 
+import bson
 from beanie import Document
 from pydantic import (
     BaseModel,
+    ConfigDict,
+    Field,
     ValidationInfo,
     field_validator,
 )
 from pymongo import IndexModel
 
+from .packing import AnnotationPacker
+
 
 class Annotation(BaseModel):
     name: ClassVar[str]
@@ -29,6 +36,22 @@ class Annotation(BaseModel):
         cls.registry[cls.name] = cls
         return r
 
+    @property
+    def estimated_size(self) -> int:
+        """
+        Rough estimate, in bytes, of the memory taken by this annotation once prepared, used to bound in-process
+        caches. Subclasses override it based on the number of items (tokens, spans, ...) they hold.
+        """
+        return 4 * 1024
+
+    @classmethod
+    def from_raw(cls, raw_annotation: dict) -> "Annotation":
+        """
+        Builds the annotation from its raw dict, as read from the DB. Subclasses may override it to load a different
+        in-memory layout (see StanzaAnnotation.columnar).
+        """
+        return cls.model_validate(raw_annotation)
+
     async def prepare_with_page(self, page: "WikiPage"):
         await self._prepare_with_page(page)
         self.prepared = True
@@ -49,13 +72,80 @@ class AnnotationContainer(BaseModel):
     def identify_and_instantiate_subclass(
         cls, annotation: Any, validation_info: ValidationInfo
     ):
+        if AnnotationPacker.is_packed(annotation):
+            annotation = AnnotationPacker.unpack(annotation)
         if isinstance(annotation, dict):
-            annotation = Annotation.registry[validation_info.data["name"]](**annotation)
+            annotation = Annotation.registry[validation_info.data["name"]].from_raw(
+                annotation
+            )
         return annotation
 
 
-class MaterializedAnnotationContainer(AnnotationContainer):
-    pass
+def instantiate_annotation(name: str, raw_annotation: Any) -> Annotation:
+    """
+    Validates raw_annotation, as read from the DB (possibly packed, see AnnotationPacker, or BSON-encoded), as the
+    Annotation.registry subclass of name. Top-level, so that it can run in a process pool.
+    """
+    if AnnotationPacker.is_packed(raw_annotation):
+        raw_annotation = AnnotationPacker.unpack(raw_annotation)
+    elif isinstance(raw_annotation, bytes):
+        raw_annotation = bson.decode(raw_annotation)
+    return Annotation.registry[name].from_raw(raw_annotation)
+
+
+class MaterializedAnnotationContainer(BaseModel):
+    """
+    Unlike AnnotationContainer, the annotation is kept as the raw dict read from the DB and only instantiated
+    (i.e., validated) as the corresponding Annotation.registry subclass the first time it is accessed. This way,
+    loading a page does not pay for validating annotations that are never used. The raw annotation may also be
+    packed (see AnnotationPacker), in which case it is unpacked right before validation.
+    """
+
+    model_config = ConfigDict(populate_by_name=True)
+
+    name: str
+    raw_annotation: Any = Field(alias="annotation")
+
+    @classmethod
+    def from_annotation(cls, annotation: Annotation):
+        return cls(name=annotation.name, annotation=annotation)
+
+    @property
+    def estimated_size(self) -> int:
+        if self.instantiated:
+            return self.raw_annotation.estimated_size
+        # not validated yet, hence unknown
+        return 4 * 1024
+
+    @property
+    def instantiated(self) -> bool:
+        return isinstance(self.raw_annotation, Annotation)
+
+    @property
+    def annotation(self) -> Annotation:
+        if not self.instantiated:
+            self.raw_annotation = instantiate_annotation(self.name, self.raw_annotation)
+        return self.raw_annotation
+
+    async def instantiate(self, executor: Optional[Executor] = None) -> Annotation:
+        """
+        Same as annotation but, if executor is provided, validation runs in it and is awaited, so that validating
+        large annotations does not block the event loop.
+        """
+        raw_annotation = self.raw_annotation
+        # anything else (e.g., lazy references to local files) is instantiated in place
+        if executor is None or not isinstance(raw_annotation, (dict, bytes)):
+            return self.annotation
+
+        if isinstance(executor, ProcessPoolExecutor) and isinstance(
+            raw_annotation, dict
+        ):
+            # a single bytes object is much cheaper to send to another process than the nested dict
+            raw_annotation = bson.encode(raw_annotation)
+        self.raw_annotation = await asyncio.get_running_loop().run_in_executor(
+            executor, instantiate_annotation, self.name, raw_annotation
+        )
+        return self.raw_annotation
 
 
 class LinkedAnnotationContainer(Document, AnnotationContainer):
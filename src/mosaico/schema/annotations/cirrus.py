@@ -9,6 +9,10 @@ class CirrusAnnotation(Annotation):
     name: ClassVar[str] = "cirrus"
     data: dict[str, Any]
 
+    @property
+    def estimated_size(self) -> int:
+        return 4 * 1024 + 2 * len(self.data.get("source_text", ""))
+
     @property
     def source_text(self):
         return self.data["source_text"]
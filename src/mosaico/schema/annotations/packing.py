@@ -0,0 +1,78 @@
+from typing import Any, ClassVar, Optional
+
+from beanie.odm.utils.encoder import Encoder
+from bson import Binary
+from pydantic import BaseModel
+
+try:
+    import msgpack
+    import zstandard
+except ModuleNotFoundError:
+    msgpack = zstandard = None
+
+# user-defined BSON binary subtype marking packed annotations
+PACKED_SUBTYPE = 0x80
+# first byte of packed payloads, to allow changing the layout in the future
+_FORMAT_MSGPACK_ZSTD = 1
+
+
+def _check_installed():
+    if msgpack is None or zstandard is None:
+        raise ModuleNotFoundError(
+            "Packages msgpack and zstandard not installed. Please install them: 'pdm install -G pack'"
+        )
+
+
+class AnnotationPacker:
+    """
+    Binary encoding of annotations: the BSON-ready dict of the annotation is serialized with msgpack, compressed
+    with zstd and stored as a single BSON Binary (subtype PACKED_SUBTYPE) in place of the annotation subdocument.
+    Large annotations (e.g., stanza, with one subdocument per token) shrink several-fold, both on disk and on the
+    wire, and Mongo no longer parses them field by field. Packed annotations are opaque to the server, though:
+    queries and projections cannot look into them.
+
+    Packing is opt-in (see init) and only applies to annotations written afterwards. Reading is transparent: the
+    annotation containers unpack packed payloads before validating them, whether or not packing is enabled.
+    """
+
+    # set by init, None disables packing
+    current: ClassVar[Optional["AnnotationPacker"]] = None
+
+    def __init__(self, level: int = 3):
+        _check_installed()
+        self.level = level
+
+    def pack(self, annotation: BaseModel | dict) -> Binary | dict:
+        if isinstance(annotation, BaseModel):
+            annotation = Encoder(to_db=True, keep_nulls=False).encode(annotation)
+        try:
+            data = msgpack.packb(annotation, use_bin_type=True)
+        except TypeError:
+            # BSON-only values (e.g., ObjectId, datetime): keep the plain subdocument
+            return annotation
+        # compressor objects are not thread-safe, and cheap to create
+        payload = zstandard.ZstdCompressor(level=self.level).compress(data)
+        return Binary(bytes([_FORMAT_MSGPACK_ZSTD]) + payload, PACKED_SUBTYPE)
+
+    @staticmethod
+    def is_packed(value: Any) -> bool:
+        return isinstance(value, Binary) and value.subtype == PACKED_SUBTYPE
+
+    @staticmethod
+    def unpack(value: Binary) -> dict:
+        _check_installed()
+        if value[0] != _FORMAT_MSGPACK_ZSTD:
+            raise ValueError(f"unsupported packed annotation format {value[0]}")
+        data = zstandard.ZstdDecompressor().decompress(memoryview(value)[1:])
+        return msgpack.unpackb(data, raw=False, strict_map_key=False)
+
+    @classmethod
+    def bson_encoders(cls) -> dict:
+        """
+        Beanie encoders packing every annotation written as part of a document, when packing is enabled.
+        """
+        from .base import Annotation
+
+        if cls.current is None:
+            return {}
+        return {Annotation: cls.current.pack}
@@ -41,7 +41,7 @@ class Argument(BaseModel):
             sentence_tokens[self.token_span[0]],
             sentence_tokens[self.token_span[-1] - 1],
         )
-        self._mention = page.text[start_token.char_start : end_token.char_end]
+        self._mention = page.text_slice(start_token.char_start, end_token.char_end)
 
     @property
     def mention(self) -> str:
@@ -65,6 +65,10 @@ class REAnnotation(Annotation):
     name: ClassVar[str] = "re"
     triples: list[RETriple]
 
+    @property
+    def estimated_size(self) -> int:
+        return 1024 * len(self.triples)
+
     async def _prepare_with_page(self, page: WikiPage):
         for triple in self.triples:
             await triple._prepare_with_page(page)
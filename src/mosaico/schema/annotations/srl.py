@@ -22,3 +22,12 @@ class PredArgStructure(BaseModel):
 class SRLAnnotation(Annotation):
     name: ClassVar[str] = "srl"
     inventory2document_spans: dict[str, list[list[PredArgStructure]]]
+
+    @property
+    def estimated_size(self) -> int:
+        return 256 * sum(
+            1 + len(pred_arg_structure.arguments)
+            for document_spans in self.inventory2document_spans.values()
+            for sentence_spans in document_spans
+            for pred_arg_structure in sentence_spans
+        )
@@ -1,8 +1,9 @@
+from functools import lru_cache
 from typing import ClassVar, Optional
 
 from pydantic import BaseModel, model_validator
 
-from ..wikipage import WikiPage
+from ..wikipage import LazyText, WikiPage
 from .base import Annotation
 
 _pos2score = {
@@ -152,33 +153,58 @@ _morph_compression = {c: i for i, c in enumerate(_morph_classes)}
 _morph_decompression = {i: c for i, c in enumerate(_morph_classes)}
 
 
+@lru_cache(maxsize=1 << 16)
+def _decompress_morph(features: tuple[str | int, ...]) -> str:
+    # the same few feature combinations occur over and over, hence the cache
+    return "|".join(
+        [_morph_classes[feat] if isinstance(feat, int) else feat for feat in features]
+    )
+
+
+def _lazy_field(model: BaseModel, name: str, decode) -> Optional[str]:
+    """
+    Returns the private attribute name of model, decoding it (and memoizing it, if model.memoize is set) on
+    first access. Private attributes are read and written through __pydantic_private__ directly, as going
+    through pydantic __getattr__ / __setattr__ is comparatively expensive.
+    """
+    private = model.__pydantic_private__
+    value = private.get(name)
+    if value is None:
+        value = decode()
+        if model.memoize:
+            private[name] = value
+    return value
+
+
 class StanzaAnnotationWord(BaseModel):
+    """
+    Fields are decoded from d (and l) lazily, on first access.
+    """
+
+    memoize: ClassVar[bool] = True
+
     d: tuple[str, int, list[str | int]]  # text, pos_, morph_
     l: Optional[str] = None
 
-    _text: Optional[str] = None
-
     @property
     def text(self) -> str:
-        return self._text
+        return self.d[0]
 
     _pos: Optional[str] = None
 
     @property
     def pos(self) -> str:
-        return self._pos
+        return _lazy_field(self, "_pos", lambda: _pos_classes[self.d[1]])
 
     _morph: Optional[str] = None
 
     @property
     def morph(self) -> str:
-        return self._morph
-
-    _lemma: Optional[str] = None
+        return _lazy_field(self, "_morph", lambda: _decompress_morph(tuple(self.d[2])))
 
     @property
     def lemma(self) -> str:
-        return self._lemma
+        return self.l
 
     @model_validator(mode="before")
     def handle_compression(cls, data: dict) -> dict:
@@ -196,20 +222,22 @@ class StanzaAnnotationWord(BaseModel):
 
         return data
 
-    async def prepare_with_page(self, page: WikiPage):
-        self._text = self.d[0]
-        self._pos = _idx2pos[self.d[1]]
-        self._morph = "|".join(
-            [
-                _morph_decompression[feat] if isinstance(feat, int) else feat
-                for feat in self.d[2]
-            ]
-        )
+    def prepare_with_text(self, text: str | LazyText):
+        # nothing to do, all fields are decoded lazily
+        pass
 
-        self._lemma = self.l
+    async def prepare_with_page(self, page: WikiPage):
+        self.prepare_with_text(page.lazy_text)
 
 
 class StanzaAnnotationToken(BaseModel):
+    """
+    Fields are decoded from d, e and w lazily, on first access; preparing a token only binds it to the page text.
+    Set memoize to False to decode fields on every access rather than caching them on the token.
+    """
+
+    memoize: ClassVar[bool] = True
+
     d: tuple[tuple[int, int], int, list[list[str | int]]]  # char span, pos_, morph_
     e: Optional[dict] = None  # extras
     w: Optional[list[StanzaAnnotationWord]] = None  # words
@@ -217,6 +245,8 @@ class StanzaAnnotationToken(BaseModel):
         None  # char mapping relative to cleaned source text in cirrus annotation
     )
 
+    _page_text: Optional[str | LazyText] = None
+
     @property
     def char_start(self) -> int:
         return self.d[0][0]
@@ -227,33 +257,44 @@ class StanzaAnnotationToken(BaseModel):
 
     _text: Optional[str] = None
 
+    def _decode_text(self) -> Optional[str]:
+        page_text = self.__pydantic_private__["_page_text"]
+        if page_text is None:
+            return None
+        char_start, char_end = self.d[0]
+        return page_text[char_start:char_end]
+
     @property
     def text(self) -> str:
-        return self._text
+        return _lazy_field(self, "_text", self._decode_text)
 
     _pos: Optional[str] = None
 
     @property
     def pos(self) -> str:
-        return self._pos
+        return _lazy_field(self, "_pos", lambda: _pos_classes[self.d[1]])
 
     _morph: Optional[str] = None
 
+    def _decode_morph(self) -> str:
+        return "___".join(
+            [
+                _decompress_morph(tuple(word_morphological_features))
+                for word_morphological_features in self.d[2]
+            ]
+        )
+
     @property
     def morph(self) -> str:
-        return self._morph
-
-    _lemma: Optional[str] = None
+        return _lazy_field(self, "_morph", self._decode_morph)
 
     @property
     def lemma(self) -> str:
-        return self._lemma
-
-    _ner: Optional[str] = None
+        return self.e.get("l", self.text) if self.e is not None else self.text
 
     @property
     def ner(self) -> str:
-        return self._ner
+        return self.e.get("n", "O") if self.e is not None else "O"
 
     @property
     def words(self) -> Optional[list[StanzaAnnotationWord]]:
@@ -291,48 +332,45 @@ class StanzaAnnotationToken(BaseModel):
 
         return data
 
-    async def prepare_with_page(self, page: WikiPage):
-        self._char_start, self._char_end = self.d[0]
-        self._pos = _idx2pos[self.d[1]]
-        self._morph = "___".join(
-            [
-                "|".join(
-                    [
-                        _morph_decompression[feat] if isinstance(feat, int) else feat
-                        for feat in word_morphological_features
-                    ]
-                )
-                for word_morphological_features in self.d[2]
-            ]
-        )
-
-        self._text = page.text[self.char_start : self.char_end]
-        self._lemma = self.e.get("l", self.text) if self.e is not None else self.text
-        self._ner = self.e.get("n", "O") if self.e is not None else "O"
+    def prepare_with_text(self, text: str | LazyText):
+        self.__pydantic_private__.update(_page_text=text, _text=None)
 
-        if self.w is not None:
-            for word in self.w:
-                await word.prepare_with_page(page)
+    async def prepare_with_page(self, page: WikiPage):
+        self.prepare_with_text(page.lazy_text)
 
 
 class StanzaAnnotationSentence(BaseModel):
+    """
+    Preparing a sentence only stores the page text: it is bound to the tokens the first time they are accessed.
+    """
+
     t: list[StanzaAnnotationToken]
-    _text: Optional[str] = None
+
+    _page_text: Optional[str | LazyText] = None
+    _tokens_prepared: bool = False
 
     @property
     def char_start(self) -> int:
-        return self.tokens[0].char_start
+        return self.t[0].char_start
 
     @property
     def char_end(self) -> int:
-        return self.tokens[-1].char_end
+        return self.t[-1].char_end
 
     @property
     def text(self) -> str:
-        return self._text
+        page_text = self.__pydantic_private__["_page_text"]
+        if page_text is None:
+            return None
+        return page_text[self.char_start : self.char_end]
 
     @property
     def tokens(self) -> list[StanzaAnnotationToken]:
+        private = self.__pydantic_private__
+        if not private["_tokens_prepared"] and private["_page_text"] is not None:
+            for token in self.t:
+                token.prepare_with_text(private["_page_text"])
+            private["_tokens_prepared"] = True
         return self.t
 
     @model_validator(mode="before")
@@ -342,16 +380,17 @@ class StanzaAnnotationSentence(BaseModel):
             data["t"] = data["tokens"]
         return data
 
-    async def prepare_with_page(self, page: WikiPage):
-        for token in self.tokens:
-            await token.prepare_with_page(page)
+    def prepare_with_text(self, text: str | LazyText):
+        self.__pydantic_private__.update(_page_text=text, _tokens_prepared=False)
 
-        self._text = page.text[self.char_start : self.char_end]
+    async def prepare_with_page(self, page: WikiPage):
+        self.prepare_with_text(page.lazy_text)
 
 
 class StanzaAnnotationDocument(BaseModel):
     sentences: list[StanzaAnnotationSentence]
-    _text: Optional[str] = None
+
+    _page_text: Optional[str | LazyText] = None
 
     @property
     def char_start(self) -> int:
@@ -363,13 +402,24 @@ class StanzaAnnotationDocument(BaseModel):
 
     @property
     def text(self) -> str:
-        return self._text
-
-    async def _prepare_with_page(self, page: WikiPage):
+        page_text = self.__pydantic_private__["_page_text"]
+        if page_text is None:
+            return None
+        return page_text[self.char_start : self.char_end]
+
+    def prepare_with_text(self, text: str | LazyText):
+        """
+        Prepares the whole document synchronously: none of this involves I/O, so there is no point in paying for
+        one coroutine per sentence, token and word. Moreover, token fields are decoded lazily, so this only costs
+        one assignment per sentence.
+        """
         for sentence in self.sentences:
-            await sentence.prepare_with_page(page)
+            sentence.prepare_with_text(text)
 
-        self._text = page.text[self.char_start : self.char_end]
+        self.__pydantic_private__["_page_text"] = text
+
+    async def _prepare_with_page(self, page: WikiPage):
+        self.prepare_with_text(page.lazy_text)
 
 
 class StanzaAnnotation(Annotation):
@@ -382,7 +432,30 @@ class StanzaAnnotation(Annotation):
     """
 
     name: ClassVar[str] = "stanza"
-    document: StanzaAnnotationDocument
+    # set to True to load documents as ColumnarStanzaDocument, built straight from the raw dict read from the DB
+    # rather than validated into one pydantic model per token (and word). Columnar annotations are read-only: pages
+    # holding one cannot save it back
+    columnar: ClassVar[bool] = False
+
+    document: StanzaAnnotationDocument  # or a ColumnarStanzaDocument, see columnar
+
+    @classmethod
+    def from_raw(cls, raw_annotation: dict) -> "StanzaAnnotation":
+        if not cls.columnar:
+            return super().from_raw(raw_annotation)
+        # imported here, as stanza_columnar builds on this module
+        from .stanza_columnar import ColumnarStanzaDocument
+
+        return cls.model_construct(
+            document=ColumnarStanzaDocument.from_raw(raw_annotation["document"])
+        )
+
+    @property
+    def estimated_size(self) -> int:
+        if not isinstance(self.document, StanzaAnnotationDocument):
+            return self.document.nbytes
+        # a token model, with its tuples and (once decoded) strings, takes roughly 1KB
+        return 1024 * sum(len(sentence.t) for sentence in self.document.sentences)
 
     async def _prepare_with_page(self, page: WikiPage):
-        await self.document._prepare_with_page(page)
+        self.document.prepare_with_text(page.lazy_text)
@@ -0,0 +1,355 @@
+from typing import Any, Iterator, Optional, Sequence
+
+import numpy as np
+
+from ..wikipage import LazyText
+from .stanza import StanzaAnnotationDocument, _idx2pos, _morph_classes
+
+
+class _ColumnarSequence(Sequence):
+    """
+    Read-only sequence of views over the [start, end) range of rows of a ColumnarStanzaDocument.
+    """
+
+    def __init__(
+        self, document: "ColumnarStanzaDocument", start: int, end: int, view_cls
+    ):
+        self._document = document
+        self._start = start
+        self._end = end
+        self._view_cls = view_cls
+
+    def __len__(self) -> int:
+        return self._end - self._start
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self[i] for i in range(*idx.indices(len(self)))]
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError(idx)
+        return self._view_cls(self._document, self._start + idx)
+
+    def __iter__(self) -> Iterator:
+        for idx in range(self._start, self._end):
+            yield self._view_cls(self._document, idx)
+
+
+class ColumnarStanzaWord:
+    __slots__ = ("_document", "_idx")
+
+    def __init__(self, document: "ColumnarStanzaDocument", idx: int):
+        self._document = document
+        self._idx = idx
+
+    @property
+    def text(self) -> str:
+        return self._document.word_texts[self._idx]
+
+    @property
+    def pos(self) -> str:
+        return _idx2pos[int(self._document.word_pos[self._idx])]
+
+    @property
+    def morph(self) -> str:
+        return self._document._decode_morph(self._idx, self._idx + 1, words=True)
+
+    @property
+    def lemma(self) -> Optional[str]:
+        return self._document.word_lemmas[self._idx]
+
+
+class ColumnarStanzaToken:
+    __slots__ = ("_document", "_idx")
+
+    def __init__(self, document: "ColumnarStanzaDocument", idx: int):
+        self._document = document
+        self._idx = idx
+
+    @property
+    def char_start(self) -> int:
+        return int(self._document.token_char_spans[self._idx, 0])
+
+    @property
+    def char_end(self) -> int:
+        return int(self._document.token_char_spans[self._idx, 1])
+
+    @property
+    def text(self) -> str:
+        return self._document._page_text[self.char_start : self.char_end]
+
+    @property
+    def pos(self) -> str:
+        return _idx2pos[int(self._document.token_pos[self._idx])]
+
+    @property
+    def morph(self) -> str:
+        document = self._document
+        return document._decode_morph(
+            int(document.token_morph_offsets[self._idx]),
+            int(document.token_morph_offsets[self._idx + 1]),
+        )
+
+    @property
+    def lemma(self) -> str:
+        extras = self._document.token_extras.get(self._idx)
+        return extras.get("l", self.text) if extras is not None else self.text
+
+    @property
+    def ner(self) -> str:
+        extras = self._document.token_extras.get(self._idx)
+        return extras.get("n", "O") if extras is not None else "O"
+
+    @property
+    def words(self) -> Optional[Sequence[ColumnarStanzaWord]]:
+        document = self._document
+        if not document.token_has_words[self._idx]:
+            return None
+        return _ColumnarSequence(
+            document,
+            int(document.token_word_offsets[self._idx]),
+            int(document.token_word_offsets[self._idx + 1]),
+            ColumnarStanzaWord,
+        )
+
+    @property
+    def cleaned_source_text_char_offset(self) -> Optional[tuple[int, int]]:
+        start, end = self._document.token_cleaned_source_text_spans[self._idx]
+        return (int(start), int(end)) if start >= 0 else None
+
+
+class ColumnarStanzaSentence:
+    __slots__ = ("_document", "_idx")
+
+    def __init__(self, document: "ColumnarStanzaDocument", idx: int):
+        self._document = document
+        self._idx = idx
+
+    @property
+    def tokens(self) -> Sequence[ColumnarStanzaToken]:
+        return _ColumnarSequence(
+            self._document,
+            int(self._document.sentence_offsets[self._idx]),
+            int(self._document.sentence_offsets[self._idx + 1]),
+            ColumnarStanzaToken,
+        )
+
+    @property
+    def char_start(self) -> int:
+        return self._document._sentence_char_span(self._idx)[0]
+
+    @property
+    def char_end(self) -> int:
+        return self._document._sentence_char_span(self._idx)[1]
+
+    @property
+    def text(self) -> str:
+        return self._document._page_text[self.char_start : self.char_end]
+
+
+class ColumnarStanzaDocument:
+    """
+    Struct-of-arrays alternative to StanzaAnnotationDocument: instead of one pydantic object per token (and word),
+    all fields live in flat numpy arrays, with variable-length lists (tokens per sentence, words per token, morph
+    features) stored in CSR layout, i.e. as a flat values array plus an offsets array.
+
+    Morphological features use the same ids as the _morph_compression table; features missing from it are
+    appended to a per-document vocabulary and get ids starting from len(_morph_classes).
+
+    Accessing document.sentences[i].tokens[j] returns lightweight views that expose the same properties as
+    their pydantic counterparts (text, pos, morph, lemma, ner, words, ...), decoded on access. Texts are read from
+    the page text, bound by prepare_with_text; like StanzaAnnotationDocument.text, text is the document span only.
+    """
+
+    def __init__(
+        self,
+        text: Optional[str | LazyText],
+        sentence_offsets: np.ndarray,
+        token_char_spans: np.ndarray,
+        token_pos: np.ndarray,
+        token_morph_offsets: np.ndarray,
+        morph_feat_offsets: np.ndarray,
+        morph_feats: np.ndarray,
+        token_extras: dict[int, dict],
+        token_cleaned_source_text_spans: np.ndarray,
+        token_has_words: np.ndarray,
+        token_word_offsets: np.ndarray,
+        word_pos: np.ndarray,
+        word_morph_offsets: np.ndarray,
+        word_morph_feats: np.ndarray,
+        word_texts: list[str],
+        word_lemmas: list[Optional[str]],
+        morph_vocab: list[str],
+    ):
+        self._page_text = text
+        self.sentence_offsets = sentence_offsets
+        self.token_char_spans = token_char_spans
+        self.token_pos = token_pos
+        self.token_morph_offsets = token_morph_offsets
+        self.morph_feat_offsets = morph_feat_offsets
+        self.morph_feats = morph_feats
+        self.token_extras = token_extras
+        self.token_cleaned_source_text_spans = token_cleaned_source_text_spans
+        self.token_has_words = token_has_words
+        self.token_word_offsets = token_word_offsets
+        self.word_pos = word_pos
+        self.word_morph_offsets = word_morph_offsets
+        self.word_morph_feats = word_morph_feats
+        self.word_texts = word_texts
+        self.word_lemmas = word_lemmas
+        self.morph_vocab = morph_vocab
+
+    @property
+    def sentences(self) -> Sequence[ColumnarStanzaSentence]:
+        return _ColumnarSequence(
+            self, 0, len(self.sentence_offsets) - 1, ColumnarStanzaSentence
+        )
+
+    @property
+    def char_start(self) -> int:
+        return self._sentence_char_span(0)[0]
+
+    @property
+    def char_end(self) -> int:
+        return self._sentence_char_span(len(self.sentence_offsets) - 2)[1]
+
+    @property
+    def text(self) -> Optional[str]:
+        if self._page_text is None:
+            return None
+        return self._page_text[self.char_start : self.char_end]
+
+    @property
+    def nbytes(self) -> int:
+        return sum(
+            array.nbytes
+            for array in vars(self).values()
+            if isinstance(array, np.ndarray)
+        )
+
+    def prepare_with_text(self, text: str | LazyText):
+        self._page_text = text
+
+    def _sentence_char_span(self, sentence_idx: int) -> tuple[int, int]:
+        first_token = int(self.sentence_offsets[sentence_idx])
+        last_token = int(self.sentence_offsets[sentence_idx + 1]) - 1
+        return (
+            int(self.token_char_spans[first_token, 0]),
+            int(self.token_char_spans[last_token, 1]),
+        )
+
+    def _decode_morph_list(self, feats: np.ndarray) -> str:
+        morph_vocab = self.morph_vocab
+        return "|".join([morph_vocab[feat] for feat in feats.tolist()])
+
+    def _decode_morph(self, start: int, end: int, words: bool = False) -> str:
+        if words:
+            return self._decode_morph_list(
+                self.word_morph_feats[
+                    self.word_morph_offsets[start] : self.word_morph_offsets[end]
+                ]
+            )
+        return "___".join(
+            [
+                self._decode_morph_list(
+                    self.morph_feats[
+                        self.morph_feat_offsets[i] : self.morph_feat_offsets[i + 1]
+                    ]
+                )
+                for i in range(start, end)
+            ]
+        )
+
+    @classmethod
+    def from_document(
+        cls, document: StanzaAnnotationDocument, text: str
+    ) -> "ColumnarStanzaDocument":
+        return cls.from_raw(document.model_dump(), text)
+
+    @classmethod
+    def from_raw(
+        cls, data: dict[str, Any], text: Optional[str | LazyText] = None
+    ) -> "ColumnarStanzaDocument":
+        """
+        Builds the columnar document straight from the stored (compressed) representation of a
+        StanzaAnnotationDocument, i.e. {"sentences": [{"t": [{"d": ..., "e": ..., "w": ..., "c": ...}]}]},
+        without instantiating any pydantic model. This is how stanza annotations are loaded when
+        StanzaAnnotation.columnar is set.
+        """
+        morph_vocab = list(_morph_classes)
+        morph_feat2id = {feat: i for i, feat in enumerate(morph_vocab)}
+
+        def encode_feat(feat: str | int) -> int:
+            if isinstance(feat, int):
+                return feat
+            if feat not in morph_feat2id:
+                morph_feat2id[feat] = len(morph_vocab)
+                morph_vocab.append(feat)
+            return morph_feat2id[feat]
+
+        sentence_offsets = [0]
+        token_char_spans, token_pos, token_cleaned_source_text_spans = [], [], []
+        token_morph_offsets, morph_feat_offsets, morph_feats = [0], [0], []
+        token_extras = {}
+        token_has_words, token_word_offsets = [], [0]
+        word_pos, word_texts, word_lemmas = [], [], []
+        word_morph_offsets, word_morph_feats = [0], []
+
+        for sentence in data["sentences"]:
+            tokens = sentence["t"]
+            for token in tokens:
+                (char_start, char_end), pos, morph = token["d"]
+                token_idx = len(token_pos)
+
+                token_char_spans.append((char_start, char_end))
+                token_pos.append(pos)
+                for word_morph in morph:
+                    morph_feats.extend([encode_feat(feat) for feat in word_morph])
+                    morph_feat_offsets.append(len(morph_feats))
+                token_morph_offsets.append(len(morph_feat_offsets) - 1)
+
+                if token.get("e") is not None:
+                    token_extras[token_idx] = token["e"]
+
+                c = token.get("c")
+                token_cleaned_source_text_spans.append(
+                    (c[0], c[1]) if c is not None else (-1, -1)
+                )
+
+                words = token.get("w")
+                token_has_words.append(words is not None)
+                for word in words or []:
+                    word_text, pos, morph = word["d"]
+                    word_texts.append(word_text)
+                    word_pos.append(pos)
+                    word_lemmas.append(word.get("l"))
+                    word_morph_feats.extend([encode_feat(feat) for feat in morph])
+                    word_morph_offsets.append(len(word_morph_feats))
+                token_word_offsets.append(len(word_texts))
+
+            sentence_offsets.append(len(token_pos))
+
+        return cls(
+            text=text,
+            sentence_offsets=np.asarray(sentence_offsets, dtype=np.int64),
+            token_char_spans=np.asarray(token_char_spans, dtype=np.int64).reshape(
+                -1, 2
+            ),
+            token_pos=np.asarray(token_pos, dtype=np.int8),
+            token_morph_offsets=np.asarray(token_morph_offsets, dtype=np.int64),
+            morph_feat_offsets=np.asarray(morph_feat_offsets, dtype=np.int64),
+            morph_feats=np.asarray(morph_feats, dtype=np.int32),
+            token_extras=token_extras,
+            token_cleaned_source_text_spans=np.asarray(
+                token_cleaned_source_text_spans, dtype=np.int64
+            ).reshape(-1, 2),
+            token_has_words=np.asarray(token_has_words, dtype=bool),
+            token_word_offsets=np.asarray(token_word_offsets, dtype=np.int64),
+            word_pos=np.asarray(word_pos, dtype=np.int8),
+            word_morph_offsets=np.asarray(word_morph_offsets, dtype=np.int64),
+            word_morph_feats=np.asarray(word_morph_feats, dtype=np.int32),
+            word_texts=word_texts,
+            word_lemmas=word_lemmas,
+            morph_vocab=morph_vocab,
+        )
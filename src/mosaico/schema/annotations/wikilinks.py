@@ -42,3 +42,14 @@ class WikilinksAnnotation(Annotation):
     wikilinks: Optional[list[Wikilink]] = None  # TODO remove Optional
     projected_wikilinks: Optional[list[ProjectedWikilink]] = None  # TODO remove
     missed_wikilinks: Optional[list[MissedWikilink]] = None  # TODO remove
+
+    @property
+    def estimated_size(self) -> int:
+        return 512 * sum(
+            len(wikilinks or [])
+            for wikilinks in [
+                self.wikilinks,
+                self.projected_wikilinks,
+                self.missed_wikilinks,
+            ]
+        )
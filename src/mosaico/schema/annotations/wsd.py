@@ -13,3 +13,7 @@ class WSDSpanAnnotation(BaseModel):
 class WSDAnnotation(Annotation):
     name: ClassVar[str] = "wsd"
     document_spans: list[list[WSDSpanAnnotation]]
+
+    @property
+    def estimated_size(self) -> int:
+        return 256 * sum(len(sentence_spans) for sentence_spans in self.document_spans)
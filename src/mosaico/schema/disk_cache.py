@@ -0,0 +1,217 @@
+import sqlite3
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Optional
+
+import bson
+from bson import ObjectId
+
+from .storage import CODEC_OPTIONS
+
+
+class DiskCache:
+    """
+    Persistent read-through cache of pages and linked annotations, stored as a SQLite database in cache_dir (and,
+    thus, shareable across processes). Entries are zlib-compressed BSON documents, tagged with the revision_id of
+    the page they belong to; once their total size exceeds max_size bytes, the least recently used ones are evicted.
+    Access times are only recorded when older than access_time_resolution seconds, so that hits rarely write (and
+    concurrent readers, e.g. DataLoader workers, rarely contend on the database lock).
+
+    Keys are:
+        * page:<page id>, for pages (which also embed their materialized annotations)
+        * annotation:<page id>:<name>, for linked annotations
+        * scan:<query digest>, for the ids of the pages matched by a scan, in the order they were read
+    plus a (language, title) -> page id mapping.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str | Path,
+        max_size: int = 10 * 1024**3,
+        eviction_check_interval: int = 256,
+        access_time_resolution: float = 60.0,
+    ):
+        cache_dir = Path(cache_dir)
+        cache_dir.mkdir(parents=True, exist_ok=True)
+
+        self.max_size = max_size
+        self.eviction_check_interval = eviction_check_interval
+        self.access_time_resolution = access_time_resolution
+        self._puts_since_eviction_check = 0
+
+        self._connection = sqlite3.connect(
+            cache_dir / "mosaico-cache.sqlite", check_same_thread=False
+        )
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                revision_id TEXT,
+                data BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access);
+            CREATE TABLE IF NOT EXISTS titles (
+                language TEXT NOT NULL,
+                title TEXT NOT NULL,
+                page_id TEXT NOT NULL,
+                PRIMARY KEY (language, title)
+            );
+            """
+        )
+        self._connection.commit()
+
+    @staticmethod
+    def _page_key(page_id: Any) -> str:
+        return f"page:{page_id}"
+
+    @staticmethod
+    def _annotation_key(page_id: Any, name: str) -> str:
+        return f"annotation:{page_id}:{name}"
+
+    @staticmethod
+    def _scan_key(query_digest: str) -> str:
+        return f"scan:{query_digest}"
+
+    def _get(self, key: str) -> Optional[tuple[Optional[str], dict]]:
+        row = self._connection.execute(
+            "SELECT revision_id, data, last_access FROM entries WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        revision_id, data, last_access = row
+        now = time.time()
+        if now - last_access >= self.access_time_resolution:
+            self._connection.execute(
+                "UPDATE entries SET last_access = ? WHERE key = ?", (now, key)
+            )
+            self._connection.commit()
+        return revision_id, bson.decode(zlib.decompress(data), CODEC_OPTIONS)
+
+    def _put(self, key: str, revision_id: Optional[Any], document: dict):
+        data = zlib.compress(bson.encode(document, codec_options=CODEC_OPTIONS))
+        self._connection.execute(
+            "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)",
+            (
+                key,
+                str(revision_id) if revision_id is not None else None,
+                data,
+                len(data),
+                time.time(),
+            ),
+        )
+        self._connection.commit()
+
+        self._puts_since_eviction_check += 1
+        if self._puts_since_eviction_check >= self.eviction_check_interval:
+            self.evict()
+
+    def evict(self):
+        """
+        Evicts the least recently used entries until the cache is back below 90% of max_size.
+        """
+        self._puts_since_eviction_check = 0
+        (size,) = self._connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM entries"
+        ).fetchone()
+        if size <= self.max_size:
+            return
+
+        target_size = 0.9 * self.max_size
+        evicted_keys = []
+        for key, entry_size in self._connection.execute(
+            "SELECT key, size FROM entries ORDER BY last_access"
+        ):
+            if size <= target_size:
+                break
+            evicted_keys.append((key,))
+            size -= entry_size
+
+        self._connection.executemany("DELETE FROM entries WHERE key = ?", evicted_keys)
+        self._connection.commit()
+
+    def get_page(self, page_id: Any) -> Optional[tuple[Optional[str], dict]]:
+        """
+        Returns the (revision_id, document) pair cached for page_id, if any.
+        """
+        return self._get(self._page_key(page_id))
+
+    def get_page_id(self, language: str, title: str) -> Optional[str]:
+        row = self._connection.execute(
+            "SELECT page_id FROM titles WHERE language = ? AND title = ?",
+            (language, title),
+        ).fetchone()
+        return row[0] if row is not None else None
+
+    def put_page(
+        self,
+        page_id: Any,
+        language: str,
+        title: str,
+        revision_id: Optional[Any],
+        document: dict,
+    ):
+        """
+        Caches a page, given as its DB representation.
+        """
+        self._connection.execute(
+            "INSERT OR REPLACE INTO titles VALUES (?, ?, ?)",
+            (language, title, str(page_id)),
+        )
+        self._put(self._page_key(page_id), revision_id, document)
+
+    def evict_page(self, page_id: Any):
+        """
+        Removes a page and all its cached annotations.
+        """
+        self._connection.execute(
+            "DELETE FROM entries WHERE key = ? OR key LIKE ?",
+            (self._page_key(page_id), self._annotation_key(page_id, "%")),
+        )
+        self._connection.commit()
+
+    def get_annotation(
+        self, page_id: Any, revision_id: Optional[Any], name: str
+    ) -> Optional[dict]:
+        """
+        Returns the annotation name cached for page_id, provided it was cached when the page was at revision_id.
+        """
+        entry = self._get(self._annotation_key(page_id, name))
+        if entry is None:
+            return None
+        cached_revision_id, document = entry
+        if cached_revision_id != (
+            str(revision_id) if revision_id is not None else None
+        ):
+            return None
+        return document
+
+    def put_annotation(
+        self, page_id: Any, revision_id: Optional[Any], name: str, annotation: dict
+    ):
+        self._put(self._annotation_key(page_id, name), revision_id, annotation)
+
+    def get_scan(self, query_digest: str) -> Optional[list[ObjectId]]:
+        """
+        Returns the ids of the pages matched by the scan of the query with the given digest, if cached.
+        """
+        entry = self._get(self._scan_key(query_digest))
+        if entry is None:
+            return None
+        page_ids = entry[1]["page_ids"]
+        return [ObjectId(page_ids[i : i + 12]) for i in range(0, len(page_ids), 12)]
+
+    def put_scan(self, query_digest: str, page_ids: list[ObjectId]):
+        # packed as 12-byte ids, a million pages take 12MB
+        self._put(
+            self._scan_key(query_digest),
+            None,
+            dict(page_ids=b"".join(page_id.binary for page_id in page_ids)),
+        )
+
+    def close(self):
+        self._connection.close()
@@ -0,0 +1,84 @@
+import asyncio
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+
+class MemoryCache:
+    """
+    In-process LRU cache bounded by a memory budget of max_size bytes. Sizes are estimates provided by the caller
+    when an entry is inserted; once their sum exceeds max_size, the least recently used entries are evicted.
+
+    Concurrent misses on the same key (e.g., many coroutines asking for the same hot page) share a single in-flight
+    load (single-flight), rather than each hitting the DB.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.size = 0
+        self._entries: OrderedDict[Hashable, tuple[Any, int]] = OrderedDict()
+        self._in_flight: dict[Hashable, asyncio.Task] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            return default
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key: Hashable, value: Any, size: int):
+        if key in self._entries:
+            self.size -= self._entries.pop(key)[1]
+        if size > self.max_size:
+            return
+
+        self._entries[key] = (value, size)
+        self.size += size
+        while self.size > self.max_size:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self.size -= evicted_size
+
+    def evict(self, predicate: Callable[[Hashable], bool]):
+        for key in [key for key in self._entries if predicate(key)]:
+            self.size -= self._entries.pop(key)[1]
+
+    async def single_flight(
+        self, key: Hashable, load: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """
+        Awaits load(), unless a load for key is already in flight, in which case its result is awaited instead.
+        Results are not cached.
+        """
+        if key not in self._in_flight:
+            task = asyncio.ensure_future(load())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+
+        # shielded, so that a cancelled caller does not cancel the load other callers are waiting for
+        return await asyncio.shield(self._in_flight[key])
+
+    async def get_or_load(
+        self,
+        key: Hashable,
+        load: Callable[[], Awaitable[Optional[Any]]],
+        size_of: Callable[[Any], int],
+    ) -> Optional[Any]:
+        """
+        Returns the value cached for key or, on a miss, awaits load() (single-flight) and caches its result,
+        unless None.
+        """
+        if key in self._entries:
+            return self.get(key)
+
+        async def load_and_put():
+            value = await load()
+            if value is not None:
+                self.put(key, value, size_of(value))
+            return value
+
+        return await self.single_flight(key, load_and_put)
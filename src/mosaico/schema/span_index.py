@@ -0,0 +1,320 @@
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from typing import Any, Callable, Iterable, Iterator, Literal, Optional
+
+from .annotations import (
+    Annotation,
+    REAnnotation,
+    SRLAnnotation,
+    StanzaAnnotation,
+    WikilinksAnnotation,
+    WSDAnnotation,
+)
+
+
+class Span:
+    """
+    A [start, end) token span of sentence sentence_idx, from an annotation of the given kind ("wsd", "srl:<inventory>",
+    "wikilinks" or "re"). item is the annotation object the span comes from (e.g., a WSDSpanAnnotation or an SRL
+    argument) and parent, if any, the object holding it (e.g., the PredArgStructure of an SRL argument).
+    """
+
+    __slots__ = ("kind", "sentence_idx", "start", "end", "label", "item", "parent")
+
+    def __init__(
+        self,
+        kind: str,
+        sentence_idx: int,
+        start: int,
+        end: int,
+        label: Optional[str] = None,
+        item: Any = None,
+        parent: Any = None,
+    ):
+        self.kind = kind
+        self.sentence_idx = sentence_idx
+        self.start = start
+        self.end = end
+        self.label = label
+        self.item = item
+        self.parent = parent
+
+    @property
+    def stop(self) -> int:
+        # empty spans are indexed as covering their start token
+        return max(self.end, self.start + 1)
+
+    def __repr__(self) -> str:
+        return f"Span({self.kind!r}, {self.sentence_idx}, {self.start}, {self.end}, {self.label!r})"
+
+
+class _IntervalTree:
+    """
+    Centered interval tree: the spans containing center are stored in the node (sorted by start and by stop), the
+    ones entirely before / after it in the left / right subtrees. Overlap queries cost O(log n + k).
+    """
+
+    __slots__ = ("center", "by_start", "by_stop", "left", "right")
+
+    def __init__(self, spans: list[Span]):
+        # the median start is contained by its span, so that every node holds at least one span
+        self.center = sorted(span.start for span in spans)[len(spans) // 2]
+
+        here, before, after = [], [], []
+        for span in spans:
+            if span.stop <= self.center:
+                before.append(span)
+            elif span.start > self.center:
+                after.append(span)
+            else:
+                here.append(span)
+
+        self.by_start = sorted(here, key=lambda span: span.start)
+        self.by_stop = sorted(here, key=lambda span: span.stop, reverse=True)
+        self.left = _IntervalTree(before) if len(before) > 0 else None
+        self.right = _IntervalTree(after) if len(after) > 0 else None
+
+    def query(self, start: int, end: int, result: list[Span]):
+        if end <= self.center:
+            for span in self.by_start:
+                if span.start >= end:
+                    break
+                result.append(span)
+            if self.left is not None:
+                self.left.query(start, end, result)
+        elif start > self.center:
+            for span in self.by_stop:
+                if span.stop <= start:
+                    break
+                result.append(span)
+            if self.right is not None:
+                self.right.query(start, end, result)
+        else:
+            # all the spans in the node contain center, which is in [start, end)
+            result.extend(self.by_start)
+            if self.left is not None:
+                self.left.query(start, end, result)
+            if self.right is not None:
+                self.right.query(start, end, result)
+
+
+def _wsd_spans(annotation: WSDAnnotation) -> Iterator[Span]:
+    for sentence_idx, sentence_spans in enumerate(annotation.document_spans):
+        for span in sentence_spans:
+            yield Span("wsd", sentence_idx, *span.token_span, span.label, span)
+
+
+def _srl_spans(annotation: SRLAnnotation) -> Iterator[Span]:
+    for inventory, document_spans in annotation.inventory2document_spans.items():
+        kind = f"srl:{inventory}"
+        for sentence_idx, pred_arg_structures in enumerate(document_spans):
+            for pred_arg_structure in pred_arg_structures:
+                predicate = pred_arg_structure.predicate
+                yield Span(
+                    kind,
+                    sentence_idx,
+                    predicate.token_idx,
+                    predicate.token_idx + 1,
+                    predicate.label,
+                    predicate,
+                    pred_arg_structure,
+                )
+                for argument in pred_arg_structure.arguments:
+                    yield Span(
+                        kind,
+                        sentence_idx,
+                        argument.start,
+                        argument.end,
+                        argument.role,
+                        argument,
+                        pred_arg_structure,
+                    )
+
+
+def _wikilinks_spans(annotation: WikilinksAnnotation) -> Iterator[Span]:
+    for wikilink in (annotation.wikilinks or []) + (
+        annotation.projected_wikilinks or []
+    ):
+        yield Span(
+            "wikilinks",
+            wikilink.sentence_idx,
+            *wikilink.token_span,
+            wikilink.title,
+            wikilink,
+        )
+
+
+def _re_spans(annotation: REAnnotation) -> Iterator[Span]:
+    for triple in annotation.triples:
+        for argument in (triple.head, triple.tail):
+            yield Span(
+                "re",
+                argument.sentence_idx,
+                *argument.token_span,
+                triple.relation.title,
+                argument,
+                triple,
+            )
+
+
+# annotation name -> function listing its token spans
+span_extractors: dict[str, Callable[[Annotation], Iterable[Span]]] = dict(
+    wsd=_wsd_spans,
+    srl=_srl_spans,
+    wikilinks=_wikilinks_spans,
+    re=_re_spans,
+)
+
+
+class SpanIndex:
+    """
+    Index of the token spans of several annotations of a page (by default, all those having an entry in
+    span_extractors), to relate them without nested loops: one interval tree per sentence answers "everything
+    overlapping (sentence_idx, start, end)" in O(log n + k), and join pairs up the spans of two kinds (e.g., every
+    WSD span inside an SRL argument).
+
+        span_index = await SpanIndex.from_page(page)
+        for wsd_span, srl_span in span_index.join("wsd", "srl:propbank", "inside"):
+            ...
+
+    If built with char_offsets (which needs the stanza annotation), spans can also be queried by char offsets of the
+    page text.
+    """
+
+    def __init__(
+        self, spans: Iterable[Span], stanza: Optional[StanzaAnnotation] = None
+    ):
+        sentence_idx2spans = defaultdict(list)
+        for span in spans:
+            sentence_idx2spans[span.sentence_idx].append(span)
+        self._trees = {
+            sentence_idx: _IntervalTree(sentence_spans)
+            for sentence_idx, sentence_spans in sentence_idx2spans.items()
+        }
+        self._num_spans = sum(len(spans) for spans in sentence_idx2spans.values())
+
+        self._sentence_char_starts: Optional[list[int]] = None
+        if stanza is not None:
+            sentences = stanza.document.sentences
+            self._sentence_char_starts = [sentence.char_start for sentence in sentences]
+            self._token_char_starts = [
+                [token.char_start for token in sentence.tokens]
+                for sentence in sentences
+            ]
+            self._token_char_ends = [
+                [token.char_end for token in sentence.tokens] for sentence in sentences
+            ]
+
+    @classmethod
+    async def from_page(
+        cls,
+        page,
+        annotations: Optional[list[str]] = None,
+        char_offsets: bool = False,
+    ) -> "SpanIndex":
+        """
+        Builds the index over the given annotations of page (a WikiPage or a WikiPageView), skipping the ones the
+        page does not have.
+        """
+        names = annotations if annotations is not None else list(span_extractors)
+        spans = []
+        for name in names:
+            if name in page.annotation_names:
+                spans.extend(span_extractors[name](await page.get_annotation(name)))
+        stanza = await page.get_annotation("stanza") if char_offsets else None
+        return cls(spans, stanza=stanza)
+
+    def __len__(self) -> int:
+        return self._num_spans
+
+    @staticmethod
+    def _matches(span: Span, kinds: Optional[Iterable[str]]) -> bool:
+        # "srl" matches every "srl:<inventory>"
+        return kinds is None or any(
+            span.kind == kind or span.kind.startswith(kind + ":") for kind in kinds
+        )
+
+    def spans(self, kinds: Optional[Iterable[str]] = None) -> Iterator[Span]:
+        for sentence_idx in sorted(self._trees):
+            result = []
+            self._trees[sentence_idx].query(0, float("inf"), result)
+            for span in sorted(result, key=lambda span: (span.start, span.end)):
+                if self._matches(span, kinds):
+                    yield span
+
+    def overlapping(
+        self,
+        sentence_idx: int,
+        start: int,
+        end: int,
+        kinds: Optional[Iterable[str]] = None,
+    ) -> list[Span]:
+        """
+        Returns the spans (restricted to kinds, if provided) overlapping tokens [start, end) of sentence_idx, sorted
+        by start.
+        """
+        tree = self._trees.get(sentence_idx)
+        if tree is None:
+            return []
+        result = []
+        tree.query(start, max(end, start + 1), result)
+        return sorted(
+            (span for span in result if self._matches(span, kinds)),
+            key=lambda span: (span.start, span.end),
+        )
+
+    def overlapping_chars(
+        self, char_start: int, char_end: int, kinds: Optional[Iterable[str]] = None
+    ) -> list[Span]:
+        """
+        Same as overlapping, but for the spans overlapping chars [char_start, char_end) of the page text.
+        """
+        if self._sentence_char_starts is None:
+            raise ValueError("index was built without char_offsets")
+
+        result = []
+        first_sentence_idx = max(
+            bisect_right(self._sentence_char_starts, char_start) - 1, 0
+        )
+        for sentence_idx in range(first_sentence_idx, len(self._sentence_char_starts)):
+            if self._sentence_char_starts[sentence_idx] >= char_end:
+                break
+            # tokens ending after char_start and starting before char_end
+            start = bisect_right(self._token_char_ends[sentence_idx], char_start)
+            end = bisect_left(self._token_char_starts[sentence_idx], char_end)
+            if start < end:
+                result.extend(self.overlapping(sentence_idx, start, end, kinds))
+        return result
+
+    def join(
+        self,
+        kinds: str | Iterable[str],
+        other_kinds: str | Iterable[str],
+        relation: Literal["overlaps", "inside", "contains"] = "overlaps",
+    ) -> list[tuple[Span, Span]]:
+        """
+        Returns all the pairs (span, other_span), with span of kinds and other_span of other_kinds, such that span
+        overlaps / is inside / contains other_span. Costs one overlap query per span of other_kinds.
+        """
+        kinds = [kinds] if isinstance(kinds, str) else list(kinds)
+        other_kinds = (
+            [other_kinds] if isinstance(other_kinds, str) else list(other_kinds)
+        )
+
+        pairs = []
+        for other_span in self.spans(other_kinds):
+            for span in self.overlapping(
+                other_span.sentence_idx, other_span.start, other_span.stop, kinds
+            ):
+                if span is other_span:
+                    continue
+                if relation == "inside" and not (
+                    other_span.start <= span.start and span.end <= other_span.end
+                ):
+                    continue
+                if relation == "contains" and not (
+                    span.start <= other_span.start and other_span.end <= span.end
+                ):
+                    continue
+                pairs.append((span, other_span))
+        return pairs
@@ -0,0 +1,382 @@
+import sqlite3
+import zlib
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import TYPE_CHECKING, AsyncIterator, Iterable, Optional
+from uuid import UUID
+
+import bson
+from beanie import PydanticObjectId
+from bson import CodecOptions, UuidRepresentation
+from pydantic import BaseModel
+
+from .interlanguage_link import Language
+
+if TYPE_CHECKING:
+    from .wikipage import WikiPage
+
+# how pages are encoded to (and decoded from) BSON outside of MongoDB, e.g. in local files and caches
+CODEC_OPTIONS = CodecOptions(uuid_representation=UuidRepresentation.STANDARD)
+
+
+class StorageBackend(ABC):
+    """
+    Storage behind WikiPage. It covers the operations the library itself needs (point lookups, translations,
+    saving annotation changes) plus WikiPage.search, i.e., filtering pages by language, is_mosaico_core and
+    available annotations. Backend-specific queries (e.g., beanie expressions on WikiPage.find) remain available
+    on the backends that support them.
+    """
+
+    # whether pages are beanie documents bound to an initialized collection
+    uses_beanie: bool = False
+
+    async def init(self):
+        pass
+
+    @abstractmethod
+    async def get_page(self, page_id: PydanticObjectId) -> Optional["WikiPage"]:
+        ...
+
+    @abstractmethod
+    async def get_page_by_title(
+        self, language: Language, title: str
+    ) -> Optional["WikiPage"]:
+        ...
+
+    @abstractmethod
+    async def get_pages(
+        self,
+        page_ids: list[PydanticObjectId],
+        projection_model: Optional[type[BaseModel]] = None,
+    ) -> AsyncIterator["WikiPage"]:
+        ...
+
+    @abstractmethod
+    def find_pages(
+        self,
+        language: Optional[Language] = None,
+        is_mosaico_core: Optional[bool] = None,
+        annotations: Optional[list[str]] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator["WikiPage"]:
+        """
+        Iterates on the pages matching all the given filters; annotations are names that must all be available.
+        """
+
+    @abstractmethod
+    async def get_translation_links(
+        self, wikidata_ids: list[str]
+    ) -> dict[str, list[tuple[Language, PydanticObjectId]]]:
+        """
+        Maps each wikidata id to the (language, page id) pairs of its language versions; versions in languages
+        outside Language are left out.
+        """
+
+    async def get_revision_id(self, page_id: PydanticObjectId) -> Optional[UUID]:
+        """
+        Returns the revision_id stored for the page (None if there is no such page), on the backends that track
+        revisions, i.e. those using beanie. WikiPage uses it to validate disk cache hits.
+        """
+        raise ValueError(f"{type(self).__name__} does not track page revisions")
+
+    @abstractmethod
+    async def save_page(self, page: "WikiPage", **kwargs):
+        ...
+
+
+class MongoBackend(StorageBackend):
+    """
+    MongoDB, through Motor and beanie: the original (and default) storage of the library.
+    """
+
+    uses_beanie = True
+
+    def __init__(
+        self,
+        mongo_uri: Optional[str] = None,
+        db: Optional[str] = None,
+        write_user: bool = False,
+    ):
+        self.mongo_uri = mongo_uri
+        self.db = db
+        self.write_user = write_user
+
+    async def init(self):
+        from beanie import init_beanie
+        from motor.motor_asyncio import AsyncIOMotorClient
+
+        from .annotations import LinkedAnnotationContainer
+        from .interlanguage_link import InterlanguageLink
+        from .wikipage import WikiPage
+
+        # Create Motor client
+        client = AsyncIOMotorClient(self.mongo_uri)
+
+        if not self.write_user:
+            # todo open issue on beanie and fix this write_user nonsense
+            print("careful, beanie issue still open")
+            LinkedAnnotationContainer.Settings.indexes = []
+            InterlanguageLink.Settings.indexes = []
+            WikiPage.Settings.indexes = []
+
+        # Initialize beanie with the Sample document class and a database
+        await init_beanie(
+            database=client[self.db],
+            document_models=[LinkedAnnotationContainer, InterlanguageLink, WikiPage],
+        )
+
+    async def get_page(self, page_id: PydanticObjectId) -> Optional["WikiPage"]:
+        from .wikipage import WikiPage
+
+        return await WikiPage.find_one({"_id": page_id})
+
+    async def get_page_by_title(
+        self, language: Language, title: str
+    ) -> Optional["WikiPage"]:
+        from .wikipage import WikiPage
+
+        return await WikiPage.find_one(
+            WikiPage.language == language, WikiPage.title == title
+        )
+
+    async def get_pages(
+        self,
+        page_ids: list[PydanticObjectId],
+        projection_model: Optional[type[BaseModel]] = None,
+    ) -> AsyncIterator["WikiPage"]:
+        from beanie.operators import In
+
+        from .wikipage import WikiPage
+
+        query = WikiPage.find(In(WikiPage.id, page_ids))
+        if projection_model is not None:
+            query = query.project(projection_model)
+        async for page in query:
+            yield page
+
+    async def find_pages(
+        self,
+        language: Optional[Language] = None,
+        is_mosaico_core: Optional[bool] = None,
+        annotations: Optional[list[str]] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator["WikiPage"]:
+        from .wikipage import WikiPage
+
+        filters = []
+        if language is not None:
+            filters.append(WikiPage.language == language)
+        if is_mosaico_core is not None:
+            filters.append({"is_mosaico_core": is_mosaico_core})
+        for name in annotations or []:
+            filters.append(
+                {
+                    "$or": [
+                        {"materialized_annotations.name": name},
+                        {"linked_annotation_names": name},
+                    ]
+                }
+            )
+
+        async for page in WikiPage.find(*filters, limit=limit):
+            yield page
+
+    async def get_translation_links(
+        self, wikidata_ids: list[str]
+    ) -> dict[str, list[tuple[Language, PydanticObjectId]]]:
+        from beanie.operators import In
+
+        from .interlanguage_link import InterlanguageLink
+
+        # links may point to language versions that are stored but not (or no longer) supported, which are skipped
+        languages = {language.value for language in Language}
+        return {
+            interlanguage_link.wikidata_id: [
+                (Language(page_link.language), page_link.page_id)
+                for page_link in interlanguage_link.page_links
+                if page_link.language in languages
+            ]
+            async for interlanguage_link in InterlanguageLink.find(
+                In(InterlanguageLink.wikidata_id, wikidata_ids)
+            )
+        }
+
+    async def get_revision_id(self, page_id: PydanticObjectId) -> Optional[UUID]:
+        from .wikipage import WikiPage, _RevisionProjection
+
+        # only the revision_id travels over the network
+        page = await WikiPage.find_one(
+            {"_id": page_id}, projection_model=_RevisionProjection
+        )
+        return page.revision_id if page is not None else None
+
+    async def save_page(self, page: "WikiPage", **kwargs):
+        await page.save(**kwargs)
+
+
+class SQLiteBackend(StorageBackend):
+    """
+    Embedded, single-file storage, e.g. for CI and laptops: no server to run and local point lookups. Pages are
+    stored as zlib-compressed BSON (see WikiPage.to_local_document, so all annotations are materialized), next to
+    indexed columns for the supported filters; translations are resolved through the wikidata_id column.
+
+    Populate it with add_pages (e.g., from pages read from MongoDB or from a Corpus) or by saving pages.
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS pages (
+                id TEXT PRIMARY KEY,
+                document_id TEXT NOT NULL,
+                language TEXT NOT NULL,
+                title TEXT NOT NULL,
+                wikidata_id TEXT,
+                is_mosaico_core INTEGER NOT NULL,
+                data BLOB NOT NULL,
+                UNIQUE (language, title),
+                UNIQUE (document_id, language)
+            );
+            CREATE INDEX IF NOT EXISTS pages_wikidata_id ON pages (wikidata_id);
+            CREATE INDEX IF NOT EXISTS pages_is_mosaico_core ON pages (is_mosaico_core);
+            CREATE TABLE IF NOT EXISTS page_annotations (
+                name TEXT NOT NULL,
+                page_id TEXT NOT NULL,
+                PRIMARY KEY (name, page_id)
+            );
+            """
+        )
+        self._connection.commit()
+
+    @staticmethod
+    def _decode_page(data: bytes) -> "WikiPage":
+        from .wikipage import WikiPage
+
+        return WikiPage.from_local_document(
+            bson.decode(zlib.decompress(data), CODEC_OPTIONS)
+        )
+
+    def _put_page(self, page: "WikiPage"):
+        if page.id is None:
+            page.id = PydanticObjectId()
+        document = page.to_local_document()
+        self._connection.execute(
+            "DELETE FROM page_annotations WHERE page_id = ?", (str(page.id),)
+        )
+        self._connection.execute(
+            "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                str(page.id),
+                page.document_id,
+                Language(page.language).value,
+                page.title,
+                page.wikidata_id,
+                int(page.is_mosaico_core),
+                zlib.compress(bson.encode(document, codec_options=CODEC_OPTIONS)),
+            ),
+        )
+        self._connection.executemany(
+            "INSERT INTO page_annotations VALUES (?, ?)",
+            [
+                (materialized_annotation["name"], str(page.id))
+                for materialized_annotation in document["materialized_annotations"]
+            ],
+        )
+
+    def add_pages(self, pages: Iterable["WikiPage"]) -> int:
+        """
+        Inserts (or replaces) the given pages in a single transaction, returning how many were added.
+        """
+        num_pages = 0
+        with self._connection:
+            for page in pages:
+                self._put_page(page)
+                num_pages += 1
+        return num_pages
+
+    async def get_page(self, page_id: PydanticObjectId) -> Optional["WikiPage"]:
+        row = self._connection.execute(
+            "SELECT data FROM pages WHERE id = ?", (str(page_id),)
+        ).fetchone()
+        return self._decode_page(row[0]) if row is not None else None
+
+    async def get_page_by_title(
+        self, language: Language, title: str
+    ) -> Optional["WikiPage"]:
+        row = self._connection.execute(
+            "SELECT data FROM pages WHERE language = ? AND title = ?",
+            (Language(language).value, title),
+        ).fetchone()
+        return self._decode_page(row[0]) if row is not None else None
+
+    async def get_pages(
+        self,
+        page_ids: list[PydanticObjectId],
+        projection_model: Optional[type[BaseModel]] = None,
+    ) -> AsyncIterator["WikiPage"]:
+        # projections only save network transfer, which a local store does not have: full pages are returned
+        page_ids = [str(page_id) for page_id in page_ids]
+        # sqlite limits the number of parameters of a statement
+        for i in range(0, len(page_ids), 500):
+            batch = page_ids[i : i + 500]
+            for (data,) in self._connection.execute(
+                f"SELECT data FROM pages WHERE id IN ({', '.join('?' * len(batch))})",
+                batch,
+            ).fetchall():
+                yield self._decode_page(data)
+
+    async def find_pages(
+        self,
+        language: Optional[Language] = None,
+        is_mosaico_core: Optional[bool] = None,
+        annotations: Optional[list[str]] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator["WikiPage"]:
+        conditions, parameters = [], []
+        if language is not None:
+            conditions.append("language = ?")
+            parameters.append(Language(language).value)
+        if is_mosaico_core is not None:
+            conditions.append("is_mosaico_core = ?")
+            parameters.append(int(is_mosaico_core))
+        for name in annotations or []:
+            conditions.append(
+                "id IN (SELECT page_id FROM page_annotations WHERE name = ?)"
+            )
+            parameters.append(name)
+
+        query = "SELECT data FROM pages"
+        if len(conditions) > 0:
+            query += " WHERE " + " AND ".join(conditions)
+        if limit is not None:
+            query += " LIMIT ?"
+            parameters.append(limit)
+
+        for (data,) in self._connection.execute(query, parameters):
+            yield self._decode_page(data)
+
+    async def get_translation_links(
+        self, wikidata_ids: list[str]
+    ) -> dict[str, list[tuple[Language, PydanticObjectId]]]:
+        translation_links = {}
+        for i in range(0, len(wikidata_ids), 500):
+            batch = wikidata_ids[i : i + 500]
+            for wikidata_id, language, page_id in self._connection.execute(
+                f"SELECT wikidata_id, language, id FROM pages WHERE wikidata_id IN ({', '.join('?' * len(batch))})",
+                batch,
+            ):
+                translation_links.setdefault(wikidata_id, []).append(
+                    (Language(language), PydanticObjectId(page_id))
+                )
+        return translation_links
+
+    async def save_page(self, page: "WikiPage", **kwargs):
+        with self._connection:
+            self._put_page(page)
+
+    def close(self):
+        self._connection.close()
@@ -0,0 +1,260 @@
+import struct
+import zlib
+from pathlib import Path
+from typing import ClassVar, Iterable, Optional
+
+import numpy as np
+
+from .interlanguage_link import Language
+
+try:
+    import zstandard
+except ModuleNotFoundError:
+    zstandard = None
+
+
+# every zlib stream written by zlib.compress (32K window) starts with this byte, which no codec tag uses
+_LEGACY_ZLIB_HEADER = 0x78
+
+
+class TextCodec:
+    """
+    Compression of WikiPage.compressed_text. Encoded texts are prefixed by the tag byte of their codec, so that
+    pages written with different codecs can live in the same collection and are decoded by whichever codec wrote
+    them (provided it is registered). Untagged payloads are the legacy raw zlib ones.
+    """
+
+    tag: ClassVar[int]
+    registry: ClassVar[dict[int, "TextCodec"]] = {}
+    # whether _decode_slice decodes only (roughly) the requested part of the text
+    sliceable: ClassVar[bool] = False
+
+    def encode(self, text: str, language: Optional[Language] = None) -> bytes:
+        return bytes([self.tag]) + self._encode(text.encode(), language)
+
+    def _encode(self, data: bytes, language: Optional[Language]) -> bytes:
+        raise NotImplementedError
+
+    def _decode(self, payload: bytes) -> bytes:
+        raise NotImplementedError
+
+    def _decode_slice(
+        self, payload: bytes, start: Optional[int], end: Optional[int]
+    ) -> str:
+        return self._decode(payload).decode()[start:end]
+
+    @classmethod
+    def register(cls, codec: "TextCodec"):
+        """
+        Registers codec as the one decoding its tag (e.g., to make its dictionaries available).
+        """
+        cls.registry[codec.tag] = codec
+
+    @classmethod
+    def codec_of(cls, data: bytes) -> Optional["TextCodec"]:
+        """
+        Returns the codec that wrote data, None for legacy zlib.
+        """
+        if len(data) > 0 and data[0] == _LEGACY_ZLIB_HEADER:
+            return None
+        codec = cls.registry.get(data[0])
+        if codec is None:
+            raise ValueError(f"no text codec registered for tag {data[0]}")
+        return codec
+
+    @classmethod
+    def decode(cls, data: bytes) -> str:
+        codec = cls.codec_of(data)
+        if codec is None:
+            return zlib.decompress(data).decode()
+        return codec._decode(memoryview(data)[1:]).decode()
+
+    @classmethod
+    def decode_slice(cls, data: bytes, start: Optional[int], end: Optional[int]) -> str:
+        """
+        Same as decode(data)[start:end], decoding as little as the codec of data allows.
+        """
+        codec = cls.codec_of(data)
+        if codec is None:
+            return zlib.decompress(data).decode()[start:end]
+        return codec._decode_slice(memoryview(data)[1:], start, end)
+
+
+class ZlibCodec(TextCodec):
+    tag = 1
+
+    def __init__(self, level: int = 6):
+        self.level = level
+
+    def _encode(self, data: bytes, language: Optional[Language]) -> bytes:
+        return zlib.compress(data, self.level)
+
+    def _decode(self, payload: bytes) -> bytes:
+        return zlib.decompress(payload)
+
+
+class ChunkedCodec(TextCodec):
+    """
+    Splits the text into blocks of block_size characters, compressed independently (zlib) and preceded by the
+    byte offset of each block, so that slices of the text (e.g., a sentence, see WikiPage.text_slice) decompress
+    only the blocks they overlap. Smaller blocks make slices cheaper but compress worse.
+    """
+
+    tag = 3
+    sliceable = True
+
+    # block size (in characters), number of blocks, text length (in characters)
+    _HEADER = struct.Struct("<III")
+
+    def __init__(self, block_size: int = 16 * 1024, level: int = 6):
+        self.block_size = block_size
+        self.level = level
+
+    def _encode(self, data: bytes, language: Optional[Language]) -> bytes:
+        # blocks are cut on characters, hence on the decoded text
+        text = data.decode()
+        blocks = [
+            zlib.compress(text[i : i + self.block_size].encode(), self.level)
+            for i in range(0, len(text), self.block_size)
+        ]
+        offsets = np.cumsum([0] + [len(block) for block in blocks], dtype="<u4")
+        return b"".join(
+            [
+                self._HEADER.pack(self.block_size, len(blocks), len(text)),
+                offsets.tobytes(),
+                *blocks,
+            ]
+        )
+
+    def _read_header(self, payload: bytes) -> tuple[int, int, np.ndarray, int]:
+        block_size, num_blocks, num_chars = self._HEADER.unpack_from(payload)
+        offsets = np.frombuffer(
+            payload, dtype="<u4", count=num_blocks + 1, offset=self._HEADER.size
+        )
+        data_offset = self._HEADER.size + offsets.nbytes
+        return block_size, num_chars, offsets, data_offset
+
+    def _decode_blocks(
+        self,
+        payload: bytes,
+        offsets: np.ndarray,
+        data_offset: int,
+        start_block: int,
+        end_block: int,
+    ) -> str:
+        return "".join(
+            zlib.decompress(
+                payload[data_offset + offsets[i] : data_offset + offsets[i + 1]]
+            ).decode()
+            for i in range(start_block, end_block)
+        )
+
+    def _decode(self, payload: bytes) -> bytes:
+        _, _, offsets, data_offset = self._read_header(payload)
+        return self._decode_blocks(
+            payload, offsets, data_offset, 0, len(offsets) - 1
+        ).encode()
+
+    def _decode_slice(
+        self, payload: bytes, start: Optional[int], end: Optional[int]
+    ) -> str:
+        block_size, num_chars, offsets, data_offset = self._read_header(payload)
+        start, end, _ = slice(start, end).indices(num_chars)
+        if start >= end:
+            return ""
+        start_block, end_block = start // block_size, (end - 1) // block_size + 1
+        text = self._decode_blocks(
+            payload, offsets, data_offset, start_block, end_block
+        )
+        first_char = start_block * block_size
+        return text[start - first_char : end - first_char]
+
+
+class ZstdCodec(TextCodec):
+    """
+    zstd, optionally with one dictionary per language (see train_dictionaries): on short texts, such as most
+    Wikipedia articles, dictionaries improve both compression ratio and decompression speed. Frames record the id
+    of their dictionary, so decoding needs the codec to be registered with the same dictionaries.
+    """
+
+    tag = 2
+
+    def __init__(
+        self,
+        level: int = 3,
+        dictionaries: Optional[dict[Language, "zstandard.ZstdCompressionDict"]] = None,
+    ):
+        if zstandard is None:
+            raise ModuleNotFoundError(
+                "Package zstandard not installed. Please install it: 'pdm install -G zstd'"
+            )
+        self.level = level
+        self.dictionaries = dictionaries or {}
+
+        self._compressors = {
+            language: zstandard.ZstdCompressor(level=level, dict_data=dictionary)
+            for language, dictionary in self.dictionaries.items()
+        }
+        self._compressors[None] = zstandard.ZstdCompressor(level=level)
+        self._decompressors = {
+            dictionary.dict_id(): zstandard.ZstdDecompressor(dict_data=dictionary)
+            for dictionary in self.dictionaries.values()
+        }
+        self._decompressors[0] = zstandard.ZstdDecompressor()
+
+    def _encode(self, data: bytes, language: Optional[Language]) -> bytes:
+        compressor = self._compressors.get(
+            Language(language) if language is not None else None,
+            self._compressors[None],
+        )
+        return compressor.compress(data)
+
+    def _decode(self, payload: bytes) -> bytes:
+        dict_id = zstandard.get_frame_parameters(payload).dict_id
+        decompressor = self._decompressors.get(dict_id)
+        if decompressor is None:
+            raise ValueError(f"zstd dictionary {dict_id} not available")
+        return decompressor.decompress(payload)
+
+    @staticmethod
+    def train_dictionaries(
+        language2texts: dict[Language, Iterable[str]], dict_size: int = 112 * 1024
+    ) -> dict[Language, "zstandard.ZstdCompressionDict"]:
+        """
+        Trains one dictionary per language from sample texts (a few thousand pages per language are enough).
+        """
+        return {
+            Language(language): zstandard.train_dictionary(
+                dict_size, [text.encode() for text in texts]
+            )
+            for language, texts in language2texts.items()
+        }
+
+    @staticmethod
+    def save_dictionaries(
+        dictionaries: dict[Language, "zstandard.ZstdCompressionDict"],
+        folder: str | Path,
+    ):
+        folder = Path(folder)
+        folder.mkdir(parents=True, exist_ok=True)
+        for language, dictionary in dictionaries.items():
+            (folder / f"{Language(language).value}.zstd-dict").write_bytes(
+                dictionary.as_bytes()
+            )
+
+    @staticmethod
+    def load_dictionaries(
+        folder: str | Path,
+    ) -> dict[Language, "zstandard.ZstdCompressionDict"]:
+        return {
+            Language(path.name.split(".")[0]): zstandard.ZstdCompressionDict(
+                path.read_bytes()
+            )
+            for path in Path(folder).glob("*.zstd-dict")
+        }
+
+
+TextCodec.register(ZlibCodec())
+TextCodec.register(ChunkedCodec())
+if zstandard is not None:
+    TextCodec.register(ZstdCodec())
@@ -0,0 +1,169 @@
+from typing import Any, AsyncIterator, Optional
+
+from beanie.odm.utils.projection import get_projection
+from bson import CodecOptions, DBRef, UuidRepresentation
+from bson.raw_bson import RawBSONDocument
+
+from .annotations import (
+    Annotation,
+    LinkedAnnotationContainer,
+    MaterializedAnnotationContainer,
+)
+from .interlanguage_link import Language
+from .text_codec import TextCodec
+from .wikipage import LazyText, WikiPage, _AnnotationsProjection
+
+_raw_codec_options = CodecOptions(
+    document_class=RawBSONDocument, uuid_representation=UuidRepresentation.STANDARD
+)
+
+
+class WikiPageView:
+    """
+    Read-only, lightweight page over the raw BSON document returned by Motor (a RawBSONDocument), for bulk
+    analytics. Unlike WikiPage, building a view costs nothing: fields are decoded from the BSON buffer when first
+    accessed and the text when first read, and no pydantic validation, revision tracking or Link objects are
+    involved. Annotations are only decoded (and validated) by get_annotation, from their raw bytes.
+
+        async for view in WikiPageView.find({"is_mosaico_core": True}, annotations=["wsd"]):
+            wsd_annotation = await view.get_annotation("wsd")
+
+    Views cannot be modified nor saved.
+    """
+
+    __slots__ = ("raw", "_text", "_annotations")
+
+    def __init__(self, raw: RawBSONDocument):
+        self.raw = raw
+        self._text: Optional[str] = None
+        self._annotations: dict[str, Annotation] = {}
+
+    @classmethod
+    async def find(
+        cls,
+        *args,
+        annotations: Optional[list[str]] = None,
+        limit: int = 0,
+        batch_size: int = 100,
+    ) -> AsyncIterator["WikiPageView"]:
+        """
+        Iterates on the pages matching the given query (same filters as WikiPage.find, i.e. dicts or beanie
+        expressions). If annotations is provided, only those annotations are sent over by the server.
+        """
+        query = WikiPage.find(*args).get_filter_query()
+        projection = (
+            get_projection(_AnnotationsProjection.build(WikiPage, annotations))
+            if annotations is not None
+            else None
+        )
+        collection = WikiPage.get_motor_collection().with_options(
+            codec_options=_raw_codec_options
+        )
+        async for raw in collection.find(
+            query, projection, limit=limit, batch_size=batch_size
+        ):
+            yield cls(raw)
+
+    @property
+    def id(self) -> Any:
+        return self.raw["_id"]
+
+    @property
+    def document_id(self) -> str:
+        return self.raw["document_id"]
+
+    @property
+    def wikidata_id(self) -> Optional[str]:
+        return self.raw.get("wikidata_id")
+
+    @property
+    def title(self) -> str:
+        return self.raw["title"]
+
+    @property
+    def language(self) -> Language:
+        return Language(self.raw["language"])
+
+    @property
+    def quality(self) -> Optional[str]:
+        return self.raw.get("quality")
+
+    @property
+    def is_mosaico_core(self) -> bool:
+        return self.raw.get("is_mosaico_core", False)
+
+    @property
+    def compressed_text(self) -> bytes:
+        return self.raw["compressed_text"]
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            self._text = TextCodec.decode(self.compressed_text)
+        return self._text
+
+    def text_slice(self, start: Optional[int] = None, end: Optional[int] = None) -> str:
+        if self._text is None:
+            codec = TextCodec.codec_of(self.compressed_text)
+            if codec is not None and codec.sliceable:
+                return TextCodec.decode_slice(self.compressed_text, start, end)
+        return self.text[start:end]
+
+    @property
+    def lazy_text(self) -> str | LazyText:
+        if self._text is None:
+            codec = TextCodec.codec_of(self.compressed_text)
+            if codec is not None and codec.sliceable:
+                return LazyText(self)
+        return self.text
+
+    @property
+    def link(self) -> str:
+        return f"https://{self.language.value}.wikipedia.org/wiki/{self.title.replace(' ', '_')}"
+
+    @property
+    def annotation_names(self) -> list[str]:
+        return [
+            materialized_annotation["name"]
+            for materialized_annotation in self.raw.get("materialized_annotations", [])
+        ] + list(self.raw.get("linked_annotation_names", []))
+
+    async def get_annotation(self, name: str) -> Annotation:
+        annotation = self._annotations.get(name)
+        if annotation is None:
+            container = MaterializedAnnotationContainer(
+                name=name, annotation=await self._get_raw_annotation(name)
+            )
+            annotation = await container.instantiate(WikiPage.annotation_executor)
+            self._annotations[name] = annotation
+        if not annotation.prepared:
+            # annotations only need text, text_slice and get_annotation of the page, which views provide
+            await annotation.prepare_with_page(self)
+        return annotation
+
+    async def _get_raw_annotation(self, name: str) -> Any:
+        for materialized_annotation in self.raw.get("materialized_annotations", []):
+            if materialized_annotation["name"] == name:
+                return self._to_raw_annotation(materialized_annotation["annotation"])
+
+        linked_annotation_names = list(self.raw.get("linked_annotation_names", []))
+        if name not in linked_annotation_names:
+            raise KeyError(f"No annotation {name} present")
+        link = self.raw["linked_annotations"][linked_annotation_names.index(name)]
+        # raw documents do not turn DBRefs into DBRef objects
+        link_id = link.id if isinstance(link, DBRef) else link["$id"]
+        document = (
+            await LinkedAnnotationContainer.get_motor_collection()
+            .with_options(codec_options=_raw_codec_options)
+            .find_one({"_id": link_id}, {"annotation": 1})
+        )
+        if document is None:
+            raise KeyError(f"Linked annotation {name} not found")
+        return self._to_raw_annotation(document["annotation"])
+
+    @staticmethod
+    def _to_raw_annotation(annotation: Any) -> Any:
+        # subdocuments are handed over as their BSON bytes, decoded (possibly in annotation_executor) in one go
+        if isinstance(annotation, RawBSONDocument):
+            return annotation.raw
+        return annotation
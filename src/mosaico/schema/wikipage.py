@@ -1,18 +1,81 @@
+import hashlib
 import logging
 import zlib
-from typing import AsyncIterator, Literal, Optional
+from collections import defaultdict
+from concurrent.futures import Executor
+from typing import Any, AsyncIterator, ClassVar, Iterable, Literal, Optional
+from uuid import UUID
 
+import bson
 from beanie import Document, Link, PydanticObjectId, WriteRules
+from beanie.odm.utils.dump import get_dict
+from beanie.odm.utils.encoder import Encoder
+from beanie.odm.utils.parsing import parse_obj
+from beanie.odm.utils.projection import get_projection
 from bson import Binary
 from pydantic import BaseModel, Field, model_validator
 from pymongo import IndexModel
 
 from .annotations import (
     Annotation,
+    AnnotationPacker,
     LinkedAnnotationContainer,
     MaterializedAnnotationContainer,
 )
-from .interlanguage_link import InterlanguageLink, Language
+from .disk_cache import DiskCache
+from .interlanguage_link import Language
+from .memory_cache import MemoryCache
+from .storage import CODEC_OPTIONS, MongoBackend, StorageBackend
+from .text_codec import TextCodec
+
+
+class _RevisionProjection(BaseModel):
+    revision_id: Optional[UUID] = None
+
+
+class LazyText:
+    """
+    Stand-in for the text of a page (or WikiPageView) that decodes it slice by slice (see WikiPage.text_slice):
+    lazy_text[start:end] equals page.text[start:end]. Slices are served from a window of _WINDOW_SIZE characters
+    around the last one read, so that reading a sentence token by token decodes its blocks once.
+    """
+
+    _WINDOW_SIZE = 16 * 1024
+
+    __slots__ = ("page", "_window_start", "_window")
+
+    def __init__(self, page: "WikiPage"):
+        self.page = page
+        self._window_start = 0
+        self._window = ""
+
+    def __getitem__(self, key: slice) -> str:
+        if self.page._text is not None:
+            return self.page._text[key]
+        if not isinstance(key, slice) or key.step is not None:
+            return self.page.text[key]
+        start, end = key.start or 0, key.stop
+        if start < 0 or end is None or end < 0:
+            return self.page.text_slice(start, end)
+        if start >= end:
+            return ""
+
+        window_end = self._window_start + len(self._window)
+        if not (self._window_start <= start and end <= window_end):
+            if end - start > self._WINDOW_SIZE:
+                return self.page.text_slice(start, end)
+            self._window_start = start - start % self._WINDOW_SIZE
+            self._window = self.page.text_slice(
+                self._window_start,
+                max(end, self._window_start + self._WINDOW_SIZE),
+            )
+        return self._window[start - self._window_start : end - self._window_start]
+
+    def __len__(self) -> int:
+        return len(self.page.text)
+
+    def __str__(self) -> str:
+        return self.page.text
 
 
 class WikiPage(Document):
@@ -28,39 +91,370 @@ class WikiPage(Document):
     linked_annotation_names: list[str] = []
     linked_annotations: list[Link[LinkedAnnotationContainer]] = []
 
-    _annotations: dict[str, Annotation | Link[Annotation]] = {}
+    _annotations: dict[
+        str, Annotation | MaterializedAnnotationContainer | Link[Annotation]
+    ] = {}
+    _annotations_subset: bool = False
+    # read from a local file (see Corpus): annotations are prepared bypassing memory_cache and annotation_executor,
+    # so that preparing them never suspends and can be driven without an event loop (see MosaicoDataset)
+    _file_backed: bool = False
 
     quality: Literal["good", "featured"] | None = None
     is_mosaico_core: bool = False
 
+    # set by init
+    backend: ClassVar[StorageBackend] = MongoBackend()
+    disk_cache: ClassVar[Optional[DiskCache]] = None
+    disk_cache_validate_revisions: ClassVar[bool] = False
+    memory_cache: ClassVar[Optional[MemoryCache]] = None
+    # codec of newly written texts, None writes legacy (untagged) zlib
+    text_codec: ClassVar[Optional[TextCodec]] = None
+    # if set, annotations are validated in it (see MaterializedAnnotationContainer.instantiate)
+    annotation_executor: ClassVar[Optional[Executor]] = None
+
     @model_validator(mode="before")
     def handle_text_compression(cls, data: dict):
         if "compressed_text" not in data:
             assert "text" in data
-            data["compressed_text"] = Binary(zlib.compress(data["text"].encode()))
+            if cls.text_codec is None:
+                data["compressed_text"] = Binary(zlib.compress(data["text"].encode()))
+            else:
+                data["compressed_text"] = Binary(
+                    cls.text_codec.encode(data["text"], data.get("language"))
+                )
 
         return data
 
     def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
+        if self.backend.uses_beanie:
+            super().__init__(*args, **kwargs)
+        else:
+            # skip beanie check that the collection was initialized, as local backends never initialize it
+            super(Document, self).__init__(*args, **kwargs)
+        self._index_annotations()
+
+    def _index_annotations(self):
         for ma in self.materialized_annotations:
-            self._annotations[ma.name] = ma.annotation
+            # instantiated lazily by get_annotation
+            self._annotations[ma.name] = ma
         for lan, la in zip(self.linked_annotation_names, self.linked_annotations):
             self._annotations[lan] = la
 
+    @classmethod
+    def from_local_document(cls, document: dict) -> "WikiPage":
+        """
+        Builds a page from its DB representation (e.g., read from a local file, see to_local_document) without
+        requiring init: beanie only checks that the collection was initialized, which pages that never touch the
+        DB do not need.
+        """
+        page = cls.__new__(cls)
+        cls.__pydantic_validator__.validate_python(document, self_instance=page)
+        page._index_annotations()
+        return page
+
+    def to_local_document(self) -> dict:
+        """
+        Returns the DB representation of this page, but with all its loaded annotations (materialized ones and
+        linked ones already fetched, e.g. by prefetch_annotations) stored as materialized annotations, so that it
+        can be rebuilt with from_local_document without any DB. Linked annotations not fetched yet are dropped.
+        """
+        # unlike beanie get_dict, model_dump does not need init, so that local pages can be dumped again
+        document = self.model_dump(
+            by_alias=True,
+            exclude={
+                "revision_id",
+                "materialized_annotations",
+                "linked_annotation_names",
+                "linked_annotations",
+            },
+            exclude_none=True,
+        )
+
+        encoder = Encoder(to_db=True)
+        document["materialized_annotations"] = []
+        for name, annotation in self._annotations.items():
+            if isinstance(annotation, MaterializedAnnotationContainer):
+                # raw_annotation may also be a lazy reference to local storage
+                annotation = (
+                    annotation.raw_annotation
+                    if isinstance(annotation.raw_annotation, (dict, Annotation))
+                    else annotation.annotation
+                )
+            elif isinstance(annotation, Link):
+                logging.warning(f"annotation {name} was not fetched, dropping it")
+                continue
+            document["materialized_annotations"].append(
+                dict(
+                    name=name,
+                    annotation=encoder.encode(annotation)
+                    if isinstance(annotation, Annotation)
+                    else annotation,
+                )
+            )
+
+        return document
+
     @property
     def text(self) -> str:
         if self._text is None:
-            self._text = zlib.decompress(self.compressed_text).decode()
+            self._text = TextCodec.decode(self.compressed_text)
         return self._text
 
+    def text_slice(self, start: Optional[int] = None, end: Optional[int] = None) -> str:
+        """
+        Same as text[start:end] but, if the text was written with a sliceable codec (e.g., ChunkedCodec) and is not
+        decoded yet, only the part of it covering the slice is decompressed (and the full text is not cached).
+        """
+        if self._text is None:
+            codec = TextCodec.codec_of(self.compressed_text)
+            if codec is not None and codec.sliceable:
+                return TextCodec.decode_slice(self.compressed_text, start, end)
+        return self.text[start:end]
+
+    @property
+    def lazy_text(self) -> str | LazyText:
+        """
+        The text if already decoded or not sliceable, otherwise a LazyText over it: annotations bound to it (e.g.,
+        stanza) decode only the parts of the text they read.
+        """
+        if self._text is None:
+            codec = TextCodec.codec_of(self.compressed_text)
+            if codec is not None and codec.sliceable:
+                return LazyText(self)
+        return self.text
+
+    @classmethod
+    def find_many(
+        cls,
+        *args,
+        annotations: Optional[list[str]] = None,
+        projection_model=None,
+        **kwargs,
+    ):
+        """
+        Same as beanie find_many (and, thus, find), but, if annotations is provided, only the materialized and
+        linked annotations whose name is in annotations are sent over by the server, through a $filter projection.
+        Pages loaded this way cannot save annotation changes, as that would drop the annotations left out.
+        """
+        if annotations is not None:
+            if projection_model is not None:
+                raise ValueError("annotations cannot be used with a projection_model")
+            projection_model = _AnnotationsProjection.build(cls, annotations)
+        return super().find_many(*args, projection_model=projection_model, **kwargs)
+
+    @classmethod
+    def find_one(
+        cls,
+        *args,
+        annotations: Optional[list[str]] = None,
+        projection_model=None,
+        **kwargs,
+    ):
+        """
+        Same as beanie find_one, with the same annotations parameter as find_many.
+        """
+        if annotations is not None:
+            if projection_model is not None:
+                raise ValueError("annotations cannot be used with a projection_model")
+            projection_model = _AnnotationsProjection.build(cls, annotations)
+        return super().find_one(*args, projection_model=projection_model, **kwargs)
+
+    @property
+    def stored_revision_id(self) -> Optional[UUID]:
+        # beanie swaps in a fresh revision_id right after loading (to be used by the next save), so the one
+        # currently stored in the DB is the previous one
+        return self._previous_revision_id
+
+    @property
+    def estimated_size(self) -> int:
+        """
+        Rough estimate, in bytes, of the memory taken by this page: its text (which decompresses to a few times its
+        compressed size) plus its annotations.
+        """
+        size = 1024 + 4 * len(self.compressed_text)
+        for annotation in self._annotations.values():
+            if isinstance(annotation, Annotation):
+                size += annotation.estimated_size
+            elif isinstance(annotation, MaterializedAnnotationContainer):
+                size += annotation.estimated_size
+        return size
+
+    @classmethod
+    async def get(cls, document_id, **kwargs) -> Optional["WikiPage"]:
+        """
+        Same as beanie get, but reads through the in-memory and disk caches, if enabled (see init), and works on
+        any storage backend. Extra beanie options (kwargs) are only supported by MongoBackend.
+        """
+        if len(kwargs) > 0:
+            return await super().get(document_id, **kwargs)
+
+        document_id = PydanticObjectId(document_id)
+        if cls.memory_cache is not None:
+            return await cls.memory_cache.get_or_load(
+                ("page", document_id),
+                lambda: cls._get_from_disk_cache_or_db(document_id),
+                lambda page: page.estimated_size,
+            )
+        return await cls._get_from_disk_cache_or_db(document_id)
+
+    @classmethod
+    async def get_by_title(cls, language: Language, title: str) -> Optional["WikiPage"]:
+        """
+        Equivalent to find_one(WikiPage.language == language, WikiPage.title == title), but reading through the
+        in-memory and disk caches, if enabled (see init).
+        """
+        language = Language(language)
+        if cls.memory_cache is None:
+            return await cls._get_by_title_from_disk_cache_or_db(language, title)
+
+        async def load_page_id() -> Optional[PydanticObjectId]:
+            page = await cls._get_by_title_from_disk_cache_or_db(language, title)
+            if page is None:
+                return None
+            cls.memory_cache.put(("page", page.id), page, page.estimated_size)
+            return page.id
+
+        # the title entry only maps to the page id, the page itself is cached (and sized) under its id
+        page_id = await cls.memory_cache.get_or_load(
+            ("title", language, title), load_page_id, lambda _: 128
+        )
+        return await cls.get(page_id) if page_id is not None else None
+
+    @classmethod
+    async def _get_from_disk_cache_or_db(
+        cls, page_id: PydanticObjectId
+    ) -> Optional["WikiPage"]:
+        page = None
+        if cls.disk_cache is not None:
+            page = await cls._get_from_disk_cache(page_id)
+        if page is None:
+            page = await cls.backend.get_page(page_id)
+            cls._put_in_disk_cache(page)
+        return page
+
+    @classmethod
+    async def _get_by_title_from_disk_cache_or_db(
+        cls, language: Language, title: str
+    ) -> Optional["WikiPage"]:
+        if cls.disk_cache is not None:
+            page_id = cls.disk_cache.get_page_id(language.value, title)
+            if page_id is not None:
+                page = await cls._get_from_disk_cache(PydanticObjectId(page_id))
+                if page is not None:
+                    return page
+
+        page = await cls.backend.get_page_by_title(language, title)
+        cls._put_in_disk_cache(page)
+        return page
+
+    @classmethod
+    def search(
+        cls,
+        language: Optional[Language] = None,
+        is_mosaico_core: Optional[bool] = None,
+        annotations: Optional[list[str]] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator["WikiPage"]:
+        """
+        Iterates on the pages matching all the given filters (annotations are names that must all be available)
+        on any storage backend. On MongoDB, WikiPage.find supports arbitrary queries.
+        """
+        return cls.backend.find_pages(
+            language=language,
+            is_mosaico_core=is_mosaico_core,
+            annotations=annotations,
+            limit=limit,
+        )
+
+    @classmethod
+    async def _get_from_disk_cache(
+        cls, page_id: PydanticObjectId
+    ) -> Optional["WikiPage"]:
+        entry = cls.disk_cache.get_page(page_id)
+        if entry is None:
+            return None
+
+        page = parse_obj(cls, entry[1])
+
+        if cls.disk_cache_validate_revisions:
+            revision_id = await cls.backend.get_revision_id(page_id)
+            if revision_id is None or revision_id != page.stored_revision_id:
+                cls.disk_cache.evict_page(page_id)
+                return None
+
+        return page
+
+    @classmethod
+    def _put_in_disk_cache(cls, page: Optional["WikiPage"]):
+        if cls.disk_cache is None or page is None or page._annotations_subset:
+            return
+        document = get_dict(page, to_db=True, keep_nulls=False)
+        document["revision_id"] = page.stored_revision_id
+        cls.disk_cache.put_page(
+            page.id, page.language.value, page.title, page.stored_revision_id, document
+        )
+
+    def _get_annotation_from_disk_cache(
+        self, name: str
+    ) -> Optional[MaterializedAnnotationContainer]:
+        if self.disk_cache is None:
+            return None
+        annotation = self.disk_cache.get_annotation(
+            self.id, self.stored_revision_id, name
+        )
+        if annotation is None:
+            return None
+        # validated on first access, as materialized annotations
+        return MaterializedAnnotationContainer(name=name, annotation=annotation)
+
+    def _put_annotation_in_disk_cache(self, name: str, annotation: Annotation | Any):
+        """
+        annotation is either an Annotation or its raw DB representation.
+        """
+        if self.disk_cache is None:
+            return
+        if isinstance(annotation, Annotation):
+            annotation = Encoder(to_db=True).encode(annotation)
+        elif AnnotationPacker.is_packed(annotation):
+            annotation = AnnotationPacker.unpack(annotation)
+        self.disk_cache.put_annotation(
+            self.id, self.stored_revision_id, name, annotation
+        )
+
+    def _evict_from_caches(self):
+        if self.id is not None:
+            self._evict_page_from_caches(self.id)
+
+    @classmethod
+    def _evict_page_from_caches(cls, page_id: PydanticObjectId):
+        if cls.disk_cache is not None:
+            cls.disk_cache.evict_page(page_id)
+        if cls.memory_cache is not None:
+            cls.memory_cache.evict(lambda key: key == ("page", page_id))
+
+    @property
+    def annotation_names(self) -> list[str]:
+        return list(self._annotations)
+
     @property
     def link(self) -> str:
         return f"https://{self.language.value}.wikipedia.org/wiki/{self.title.replace(' ', '_')}"
 
+    def _check_can_save_annotations(self):
+        if self._annotations_subset:
+            raise ValueError(
+                "page was loaded with a subset of its annotations, saving it would drop the others"
+            )
+
     async def add_annotation(
         self, annotation: Annotation, materialized: bool = True, save: bool = True
     ):
+        if save:
+            self._check_can_save_annotations()
+        if not self.backend.uses_beanie:
+            # linked annotations are beanie documents, local backends store everything in the page
+            materialized = True
+
         if materialized:
             self.materialized_annotations.append(
                 MaterializedAnnotationContainer.from_annotation(annotation)
@@ -74,31 +468,210 @@ class WikiPage(Document):
         self._annotations[annotation.name] = annotation
         if save:
             if materialized:
-                await self.save()
+                await self.backend.save_page(self)
             else:
-                await self.save(link_rule=WriteRules.WRITE)
+                await self.backend.save_page(self, link_rule=WriteRules.WRITE)
+            self._evict_from_caches()
 
     async def get_annotation(self, name: str) -> Annotation:
         if name not in self._annotations:
             raise KeyError(f"No annotation {name} present")
-        elif isinstance(self._annotations[name], Link):
-            logging.info(f"Following href in DB to retrieve annotation {name}")
-            linked_annotation = await self._annotations[name].fetch()
-            self._annotations[name] = linked_annotation.annotation
 
-        if not self._annotations[name].prepared:
-            await self._annotations[name].prepare_with_page(self)
+        annotation = self._annotations[name]
+        if isinstance(annotation, Annotation) and annotation.prepared:
+            return annotation
+        if self.memory_cache is None or self.id is None or self._file_backed:
+            return await self._load_annotation(name)
 
-        return self._annotations[name]
+        # concurrent requests for the same annotation of the same page share a single load
+        annotation = await self.memory_cache.single_flight(
+            ("annotation", self.id, name), lambda: self._load_annotation(name)
+        )
+        self._annotations[name] = annotation
+
+        # the page entry accounts for the annotations it holds
+        if self.memory_cache.get(("page", self.id)) is self:
+            self.memory_cache.put(("page", self.id), self, self.estimated_size)
+
+        return annotation
+
+    async def _load_annotation(self, name: str) -> Annotation:
+        annotation = self._annotations[name]
+        if isinstance(annotation, Link):
+            cached_annotation = self._get_annotation_from_disk_cache(name)
+            if cached_annotation is None:
+                logging.info(f"Following href in DB to retrieve annotation {name}")
+                raw_annotation = (
+                    await self._fetch_raw_linked_annotations([annotation.ref.id])
+                )[annotation.ref.id]
+                self._put_annotation_in_disk_cache(name, raw_annotation)
+                cached_annotation = MaterializedAnnotationContainer(
+                    name=name, annotation=raw_annotation
+                )
+            annotation = cached_annotation
+        if isinstance(annotation, MaterializedAnnotationContainer):
+            annotation = await annotation.instantiate(
+                None if self._file_backed else self.annotation_executor
+            )
+        self._annotations[name] = annotation
+
+        if not annotation.prepared:
+            await annotation.prepare_with_page(self)
+
+        return annotation
+
+    @staticmethod
+    async def _fetch_raw_linked_annotations(
+        link_ids: list[PydanticObjectId],
+    ) -> dict[PydanticObjectId, Any]:
+        # raw, rather than through beanie, so that validation is deferred to the first access (and, possibly, to
+        # annotation_executor) as for materialized annotations
+        return {
+            document["_id"]: document["annotation"]
+            async for document in LinkedAnnotationContainer.get_motor_collection().find(
+                {"_id": {"$in": link_ids}}, {"annotation": 1}
+            )
+        }
 
     async def list_annotations(self) -> AsyncIterator[Annotation]:
+        # resolve all linked annotations with a single query rather than one fetch each
+        await WikiPage.prefetch_annotations([self])
         for name in self._annotations:
             annotation = await self.get_annotation(name)
             yield annotation
 
+    @classmethod
+    async def prefetch_annotations(
+        cls,
+        pages: Iterable["WikiPage"],
+        names: Optional[list[str]] = None,
+        batch_size: int = 1_000,
+    ) -> list["WikiPage"]:
+        """
+        Resolves the linked annotations of all the given pages issuing one $in query per batch of links,
+        instead of one fetch per page per annotation. If names is provided, only those annotations are fetched.
+        As for materialized annotations, fetched annotations are validated on first access.
+        """
+        pages = list(pages)
+
+        link_id2targets = defaultdict(list)
+        for page in pages:
+            for name, annotation in page._annotations.items():
+                if isinstance(annotation, Link) and (names is None or name in names):
+                    cached_annotation = page._get_annotation_from_disk_cache(name)
+                    if cached_annotation is not None:
+                        page._annotations[name] = cached_annotation
+                    else:
+                        link_id2targets[annotation.ref.id].append((page, name))
+
+        link_ids = list(link_id2targets)
+        for i in range(0, len(link_ids), batch_size):
+            raw_annotations = await cls._fetch_raw_linked_annotations(
+                link_ids[i : i + batch_size]
+            )
+            for link_id, raw_annotation in raw_annotations.items():
+                for page, name in link_id2targets[link_id]:
+                    page._annotations[name] = MaterializedAnnotationContainer(
+                        name=name, annotation=raw_annotation
+                    )
+                    page._put_annotation_in_disk_cache(name, raw_annotation)
+
+        return pages
+
+    @classmethod
+    async def _scan(
+        cls,
+        *args,
+        annotations: Optional[list[str]] = None,
+        batch_size: Optional[int] = None,
+        **kwargs,
+    ) -> AsyncIterator["WikiPage"]:
+        """
+        Same as WikiPage.find, but reading through the disk cache when it serves pages offline (i.e., without
+        cache_validate_revisions) and no other find option is given: the first scan of a query reads whole pages
+        (annotations only restricts what is prefetched later on) and caches them, along with the ids it matched;
+        later scans of the same query read those pages from the cache, in the same order, only querying the DB for
+        the ones evicted since. As for point lookups, pages added to the DB afterwards are not seen by them.
+        """
+        if (
+            cls.disk_cache is None
+            or cls.disk_cache_validate_revisions
+            or not cls.backend.uses_beanie
+            or len(kwargs) > 0
+        ):
+            async for page in cls.find(
+                *args, annotations=annotations, batch_size=batch_size, **kwargs
+            ):
+                yield page
+            return
+
+        query_digest = hashlib.sha1(
+            bson.encode(
+                dict(query=cls.find(*args).get_filter_query()),
+                codec_options=CODEC_OPTIONS,
+            )
+        ).hexdigest()
+        page_ids = cls.disk_cache.get_scan(query_digest)
+
+        if page_ids is None:
+            page_ids = []
+            async for page in cls.find(*args, batch_size=batch_size):
+                cls._put_in_disk_cache(page)
+                page_ids.append(page.id)
+                yield page
+            # only reached if the scan was read to the end
+            cls.disk_cache.put_scan(query_digest, page_ids)
+            return
+
+        batch_size = batch_size or 100
+        for i in range(0, len(page_ids), batch_size):
+            batch = {
+                page_id: await cls._get_from_disk_cache(page_id)
+                for page_id in page_ids[i : i + batch_size]
+            }
+            missing_page_ids = [
+                page_id for page_id, page in batch.items() if page is None
+            ]
+            if len(missing_page_ids) > 0:
+                async for page in cls.backend.get_pages(missing_page_ids):
+                    cls._put_in_disk_cache(page)
+                    batch[page.id] = page
+            for page in batch.values():
+                # None if deleted from the DB
+                if page is not None:
+                    yield page
+
+    @classmethod
+    async def find_and_prefetch(
+        cls,
+        *args,
+        annotations: Optional[list[str]] = None,
+        batch_size: int = 100,
+        **kwargs,
+    ) -> AsyncIterator["WikiPage"]:
+        """
+        Same as WikiPage.find, but pages are accumulated in batches of batch_size and their linked annotations
+        (restricted to annotations, if provided) are prefetched with prefetch_annotations before being yielded.
+        Pages are read through the disk cache, if enabled (see init).
+        """
+        batch = []
+        async for page in cls._scan(*args, annotations=annotations, **kwargs):
+            batch.append(page)
+            if len(batch) == batch_size:
+                for prefetched_page in await cls.prefetch_annotations(
+                    batch, names=annotations
+                ):
+                    yield prefetched_page
+                batch = []
+
+        for prefetched_page in await cls.prefetch_annotations(batch, names=annotations):
+            yield prefetched_page
+
     async def delete_annotation(self, name: str, save: bool = True):
         if name not in self._annotations:
             raise KeyError(f"No annotation {name} present")
+        if save:
+            self._check_can_save_annotations()
 
         materialized = name not in self.linked_annotation_names
 
@@ -119,35 +692,95 @@ class WikiPage(Document):
             await linked_annotation.delete()
 
         old_annotation = self._annotations.pop(name)
+        if isinstance(old_annotation, MaterializedAnnotationContainer):
+            old_annotation = old_annotation.annotation
         if save:
-            await self.save()
+            await self.backend.save_page(self)
+            self._evict_from_caches()
 
         return old_annotation
 
     async def change_to_translation(self, language: Language) -> "WikiPage":
-        interlanguage_link = InterlanguageLink.find(
-            InterlanguageLink.wikidata_id == self.wikidata_id
-        )
+        translation_links = await self.backend.get_translation_links([self.wikidata_id])
 
-        for page_link in interlanguage_link.page_links:
-            if page_link.language == language:
-                return await WikiPage.get(page_link.page_id)
+        for page_language, page_id in translation_links.get(self.wikidata_id, []):
+            if page_language == language:
+                return await WikiPage.get(page_id)
 
         raise KeyError(language)
 
     async def list_translations(self) -> AsyncIterator["WikiPage"]:
-        interlanguage_link = await InterlanguageLink.find_one(
-            InterlanguageLink.wikidata_id == self.wikidata_id
-        )
+        translation_links = await self.backend.get_translation_links([self.wikidata_id])
 
-        for page_link in interlanguage_link.page_links:
-            if page_link.language != self.language:
-                translated_page = await WikiPage.get(page_link.page_id)
-                if translated_page is None:
-                    logging.warning(
-                        f"following interlanguage link gave a null page (None) for language {page_link.language}. This is unexpected, may result in exceptions later on and is likely an issue in the DB"
-                    )
-                yield translated_page
+        page_links = [
+            (language, page_id)
+            for language, page_id in translation_links.get(self.wikidata_id, [])
+            if language != self.language
+        ]
+        # fetch all translations with a single query, then yield them following the interlanguage link order
+        page_id2page = {
+            page.id: page
+            async for page in self.backend.get_pages(
+                [page_id for _, page_id in page_links]
+            )
+        }
+
+        for language, page_id in page_links:
+            translated_page = page_id2page.get(page_id)
+            if translated_page is None:
+                logging.warning(
+                    f"following interlanguage link gave a null page (None) for language {language}. This is unexpected, may result in exceptions later on and is likely an issue in the DB"
+                )
+            yield translated_page
+
+    @classmethod
+    async def resolve_translations(
+        cls,
+        pages_or_wikidata_ids: Iterable["WikiPage | str"],
+        languages: Optional[list[Language]] = None,
+        projection_model: Optional[type[BaseModel]] = None,
+        batch_size: int = 1_000,
+    ) -> dict[str, dict[Language, "WikiPage"]]:
+        """
+        Bulk version of list_translations: maps each wikidata id (taken directly or from the given pages) to all its
+        language versions, optionally restricted to languages. Each batch of wikidata ids costs one query on the
+        interlanguage links and one $in query on the pages. If a projection_model is provided, it must include
+        both the id and the language of the page.
+        """
+        wikidata_ids = []
+        for page_or_wikidata_id in pages_or_wikidata_ids:
+            wikidata_id = (
+                page_or_wikidata_id.wikidata_id
+                if isinstance(page_or_wikidata_id, WikiPage)
+                else page_or_wikidata_id
+            )
+            if wikidata_id is not None:
+                wikidata_ids.append(wikidata_id)
+        wikidata_ids = list(dict.fromkeys(wikidata_ids))
+
+        wikidata_id2translations = {wikidata_id: {} for wikidata_id in wikidata_ids}
+
+        for i in range(0, len(wikidata_ids), batch_size):
+            page_id2wikidata_id = {}
+            translation_links = await cls.backend.get_translation_links(
+                wikidata_ids[i : i + batch_size]
+            )
+            for wikidata_id, page_links in translation_links.items():
+                for language, page_id in page_links:
+                    if languages is None or language in languages:
+                        page_id2wikidata_id[page_id] = wikidata_id
+
+            if len(page_id2wikidata_id) == 0:
+                continue
+
+            async for page in cls.backend.get_pages(
+                list(page_id2wikidata_id), projection_model=projection_model
+            ):
+                wikidata_id2translations[page_id2wikidata_id[page.id]][
+                    page.language
+                ] = page
+
+        return wikidata_id2translations
 
     class Config:
         arbitrary_types_allowed = True
@@ -164,6 +797,72 @@ class WikiPage(Document):
         keep_nulls = False
 
 
+class _AnnotationsProjection:
+    """
+    Projection "model" handed over to beanie by WikiPage.find_many / find_one when annotations are selected. Its
+    Settings.projection keeps every WikiPage field, but $filter-s materialized_annotations by name and, as
+    linked_annotation_names and linked_annotations are parallel arrays, filters both of them by index. Parsed
+    documents are regular WikiPage objects, flagged as holding a subset of their annotations.
+    """
+
+    document_model: type[WikiPage]
+    annotations: list[str]
+
+    @classmethod
+    def build(
+        cls, document_model: type[WikiPage], annotations: list[str]
+    ) -> type["_AnnotationsProjection"]:
+        projection = dict(get_projection(document_model))
+
+        projection["materialized_annotations"] = {
+            "$filter": {
+                "input": {"$ifNull": ["$materialized_annotations", []]},
+                "cond": {"$in": ["$$this.name", annotations]},
+            }
+        }
+
+        linked_annotation_idxs = {
+            "$filter": {
+                "input": {
+                    "$range": [
+                        0,
+                        {"$size": {"$ifNull": ["$linked_annotation_names", []]}},
+                    ]
+                },
+                "cond": {
+                    "$in": [
+                        {"$arrayElemAt": ["$linked_annotation_names", "$$this"]},
+                        annotations,
+                    ]
+                },
+            }
+        }
+        for field in ["linked_annotation_names", "linked_annotations"]:
+            projection[field] = {
+                "$map": {
+                    "input": linked_annotation_idxs,
+                    "in": {"$arrayElemAt": [f"${field}", "$$this"]},
+                }
+            }
+
+        settings = type("Settings", (), dict(projection=projection))
+        return type(
+            cls.__name__,
+            (cls,),
+            dict(
+                document_model=document_model,
+                annotations=annotations,
+                Settings=settings,
+            ),
+        )
+
+    @classmethod
+    def model_validate(cls, data: dict) -> WikiPage:
+        page = cls.document_model.model_validate(data)
+        page._annotations_subset = True
+        return page
+
+
 class ProjectedWikiPageModel_LanguageTitleType(BaseModel):
     id: PydanticObjectId = Field(alias="_id")
     language: Language
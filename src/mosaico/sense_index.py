@@ -0,0 +1,125 @@
+from pathlib import Path
+from typing import Iterable, Optional
+
+from beanie import PydanticObjectId
+from tqdm import tqdm
+
+from .postings import PostingsIndex, PostingsWriter
+from .schema import Language, WikiPage, WSDAnnotation
+
+_KIND = "senses"
+# page idx, sentence idx, token start, token span length
+_NUM_COLUMNS = 4
+
+
+class SenseIndexWriter:
+    """
+    Adds pages to a sense index (see SenseIndex), writing them as a new segment on flush. Adding a page supersedes
+    the postings it had in older segments, so that pages can be re-added after their wsd annotation changes (or
+    removed, see remove).
+    """
+
+    def __init__(self, folder: str | Path, buffer_size: int = 10_000_000):
+        self._writer = PostingsWriter(
+            folder, _KIND, _NUM_COLUMNS, buffer_size=buffer_size
+        )
+
+    def __enter__(self) -> "SenseIndexWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.flush()
+
+    def add_annotation(
+        self, page_id: PydanticObjectId, language: Language, annotation: WSDAnnotation
+    ):
+        page_idx = self._writer.add_page(page_id)
+        for sentence_idx, sentence_spans in enumerate(annotation.document_spans):
+            for span in sentence_spans:
+                start, end = span.token_span
+                self._writer.add(
+                    span.label, language, page_idx, sentence_idx, start, end - start
+                )
+
+    async def add(self, page: WikiPage):
+        """
+        Adds page (or removes it from the index, if it has no wsd annotation).
+        """
+        if "wsd" not in page.annotation_names:
+            self.remove(page.id)
+            return
+        self.add_annotation(page.id, page.language, await page.get_annotation("wsd"))
+
+    def remove(self, page_id: PydanticObjectId):
+        self._writer.add_page(page_id)
+
+    def flush(self):
+        self._writer.flush()
+
+
+class SenseIndex:
+    """
+    Inverted index from WSD sense labels (WSDSpanAnnotation.label) to their occurrences, i.e., (page id, language,
+    sentence_idx, token_span) tuples, built offline with build_sense_index and kept up to date with a
+    SenseIndexWriter as pages are annotated. See PostingsIndex for the format.
+    """
+
+    def __init__(self, folder: str | Path):
+        self._index = PostingsIndex(folder, _KIND, _NUM_COLUMNS)
+
+    def count(self, label: str, languages: Optional[Iterable[Language]] = None) -> int:
+        return self._index.count(label, languages)
+
+    def find(
+        self,
+        label: str,
+        languages: Optional[Iterable[Language]] = None,
+        limit: Optional[int] = None,
+    ) -> list[tuple[PydanticObjectId, Language, int, tuple[int, int]]]:
+        """
+        Returns the occurrences of label, restricted to the given languages if provided, as (page id, language,
+        sentence_idx, token_span) tuples.
+        """
+        return [
+            (page_id, language, sentence_idx, (start, start + length))
+            for page_id, language, (sentence_idx, start, length) in self._index.find(
+                label, languages, limit
+            )
+        ]
+
+    def compact(self):
+        """
+        Rewrites all the segments as a single one, dropping superseded postings.
+        """
+        self._index.compact()
+
+
+async def build_sense_index(
+    folder: str | Path, *args, batch_size: int = 100, **kwargs
+) -> int:
+    """
+    Indexes the wsd annotation of the pages matching the given query (same arguments as WikiPage.find) into a new
+    segment of the sense index in folder. Returns the number of pages indexed.
+    """
+    num_pages = 0
+    with (
+        SenseIndexWriter(folder) as writer,
+        tqdm(desc="indexing senses", unit="pages") as progress_bar,
+    ):
+        async for page in WikiPage.find_and_prefetch(
+            {
+                "$or": [
+                    {"materialized_annotations.name": "wsd"},
+                    {"linked_annotation_names": "wsd"},
+                ]
+            },
+            *args,
+            annotations=["wsd"],
+            batch_size=batch_size,
+            **kwargs,
+        ):
+            await writer.add(page)
+            num_pages += 1
+            progress_bar.update()
+    return num_pages
@@ -0,0 +1,390 @@
+import asyncio
+import hashlib
+import os
+from collections import Counter
+from pathlib import Path
+from typing import Any, Optional
+from uuid import UUID
+
+import bson
+
+from .schema import CODEC_OPTIONS, LinkedAnnotationContainer, WikiPage
+
+
+class Report:
+    """
+    A count report, compiled into aggregation pipelines over the pages collection. Page-level reports (names is
+    None) group the pages themselves. Otherwise, pages are first turned into one {language, name, annotation}
+    document per annotation named in names (materialized or linked, the latter joined with $lookup; with an empty
+    names, every annotation, without its content), to which stages apply. Documents are then counted by keys.
+    """
+
+    def __init__(
+        self,
+        keys: list[str],
+        stages: Optional[list[dict]] = None,
+        names: Optional[list[str]] = None,
+    ):
+        self.keys = keys
+        self.stages = stages or []
+        self.names = names
+
+    def pipelines(self, match: dict) -> list[list[dict]]:
+        group = {
+            "$group": {
+                "_id": {key: f"${key}" for key in self.keys},
+                "count": {"$sum": 1},
+            }
+        }
+        if self.names is None:
+            return [[{"$match": match}, *self.stages, group]]
+
+        fetch_annotation = len(self.names) > 0
+        materialized = [
+            {"$match": match},
+            {"$project": {"language": 1, "materialized_annotations": 1}},
+            {"$unwind": "$materialized_annotations"},
+            {
+                "$project": {
+                    "language": 1,
+                    "name": "$materialized_annotations.name",
+                    **(
+                        {"annotation": "$materialized_annotations.annotation"}
+                        if fetch_annotation
+                        else {}
+                    ),
+                }
+            },
+        ]
+        linked = [
+            {"$match": match},
+            {
+                "$project": {
+                    "language": 1,
+                    "linked_annotation_names": 1,
+                    "linked_annotations": 1,
+                }
+            },
+            {
+                "$unwind": {
+                    "path": "$linked_annotation_names",
+                    "includeArrayIndex": "link_idx",
+                }
+            },
+            {"$project": {"language": 1, "name": "$linked_annotation_names"}},
+        ]
+        if fetch_annotation:
+            materialized.append({"$match": {"name": {"$in": self.names}}})
+            linked[-1] = {
+                "$project": {
+                    "language": 1,
+                    "name": "$linked_annotation_names",
+                    # links are DBRefs, i.e. {$ref, $id} documents, and field paths cannot address $id
+                    "link_id": {
+                        "$arrayElemAt": [
+                            {
+                                "$objectToArray": {
+                                    "$arrayElemAt": ["$linked_annotations", "$link_idx"]
+                                }
+                            },
+                            1,
+                        ]
+                    },
+                }
+            }
+            linked += [
+                {"$match": {"name": {"$in": self.names}}},
+                {
+                    "$lookup": {
+                        "from": LinkedAnnotationContainer.get_motor_collection().name,
+                        "localField": "link_id.v",
+                        "foreignField": "_id",
+                        "as": "linked",
+                    }
+                },
+                {"$unwind": "$linked"},
+                {
+                    "$project": {
+                        "language": 1,
+                        "name": 1,
+                        "annotation": "$linked.annotation",
+                    }
+                },
+            ]
+        return [
+            [*materialized, *self.stages, group],
+            [*linked, *self.stages, group],
+        ]
+
+
+# report name -> Report
+REPORTS: dict[str, Report] = dict(
+    languages=Report(keys=["language"]),
+    annotations=Report(keys=["language", "name"], names=[]),
+    wsd_labels=Report(
+        keys=["language", "label"],
+        stages=[
+            # sentences, then spans
+            {"$unwind": "$annotation.document_spans"},
+            {"$unwind": "$annotation.document_spans"},
+            {"$project": {"language": 1, "label": "$annotation.document_spans.label"}},
+        ],
+        names=["wsd"],
+    ),
+    srl_roles=Report(
+        keys=["language", "inventory", "role"],
+        stages=[
+            {
+                "$project": {
+                    "language": 1,
+                    "spans": {"$objectToArray": "$annotation.inventory2document_spans"},
+                }
+            },
+            # inventories, then sentences, then predicate-argument structures, then arguments
+            {"$unwind": "$spans"},
+            {"$unwind": "$spans.v"},
+            {"$unwind": "$spans.v"},
+            {"$unwind": "$spans.v.arguments"},
+            {
+                "$project": {
+                    "language": 1,
+                    "inventory": "$spans.k",
+                    "role": "$spans.v.arguments.role",
+                }
+            },
+        ],
+        names=["srl"],
+    ),
+    re_relations=Report(
+        keys=["language", "relation"],
+        stages=[
+            {"$unwind": "$annotation.triples"},
+            {
+                "$project": {
+                    "language": 1,
+                    "relation": "$annotation.triples.relation.title",
+                }
+            },
+        ],
+        names=["re"],
+    ),
+)
+
+
+def _revision_bytes(revision_id: Any) -> bytes:
+    if revision_id is None:
+        return b""
+    if isinstance(revision_id, UUID):
+        return revision_id.bytes
+    return bytes(revision_id)
+
+
+class CorpusStats:
+    """
+    Corpus statistics (counts per language, annotation, WSD label, SRL role or RE relation, see REPORTS), computed
+    server-side by aggregation pipelines and cached in cache_dir, so that repeated (e.g. dashboard) queries do not
+    touch the DB:
+
+        stats = CorpusStats("stats-cache")
+        wsd_labels = await stats.get("wsd_labels")  # {(language, label): count}
+        ...
+        await stats.refresh("wsd_labels")  # after pages have changed
+
+    Pages are split into ranges of _id of about bucket_size pages, aggregated independently (concurrency at a
+    time). Each range has a watermark, a digest of the (id, revision_id) pairs of its pages: refresh reads only
+    these pairs and re-aggregates just the ranges whose watermark changed, i.e. those with pages added, removed or
+    modified (which bumps their revision_id) since the last refresh. Annotations packed with AnnotationPacker are
+    opaque to the server, and thus not counted.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str | Path,
+        bucket_size: int = 50_000,
+        concurrency: int = 4,
+        reports: Optional[dict[str, Report]] = None,
+    ):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.bucket_size = bucket_size
+        self.concurrency = concurrency
+        self.reports = reports if reports is not None else REPORTS
+        # report name -> totals
+        self._totals: dict[str, dict[tuple, int]] = {}
+
+    def _cache_path(self, report_name: str) -> Path:
+        return self.cache_dir / f"{report_name}.bson"
+
+    def _load_buckets(self, report_name: str) -> Optional[list[dict]]:
+        path = self._cache_path(report_name)
+        if not path.exists():
+            return None
+        return bson.decode(path.read_bytes(), codec_options=CODEC_OPTIONS)["buckets"]
+
+    def _save_buckets(self, report_name: str, buckets: list[dict]):
+        path = self._cache_path(report_name)
+        part_path = path.with_name(path.name + ".part")
+        part_path.write_bytes(bson.encode(dict(report=report_name, buckets=buckets)))
+        os.replace(part_path, path)
+
+    @staticmethod
+    def _sum_buckets(buckets: list[dict]) -> dict[tuple, int]:
+        totals = Counter()
+        for bucket in buckets:
+            for *key, count in bucket["counts"]:
+                totals[tuple(key)] += count
+        return dict(totals)
+
+    async def get(self, report_name: str, refresh: bool = False) -> dict[tuple, int]:
+        """
+        Returns the counts of report_name, keyed by tuples of the report keys, from the cache if present (computing
+        them otherwise). If refresh is set, the cache is brought up to date first.
+        """
+        if refresh:
+            await self.refresh(report_name)
+        if report_name not in self._totals:
+            buckets = self._load_buckets(report_name)
+            if buckets is None:
+                await self.refresh(report_name)
+            else:
+                self._totals[report_name] = self._sum_buckets(buckets)
+        return self._totals[report_name]
+
+    async def _watermarks(self, lower_bounds: list[Any]) -> list[dict]:
+        """
+        Streams the (id, revision_id) pairs of all the pages, returning the buckets given by lower_bounds (sorted,
+        the first one being None) with their watermark, num_pages and, for the ones larger than twice
+        bucket_size, their split into buckets of bucket_size pages.
+        """
+        buckets = [
+            dict(lower_bound=lower_bound, num_pages=0, chunks=[])
+            for lower_bound in lower_bounds
+        ]
+        bucket_idx = 0
+        async for page in WikiPage.get_motor_collection().find(
+            {}, {"revision_id": 1}, sort=[("_id", 1)], batch_size=10_000
+        ):
+            while (
+                bucket_idx + 1 < len(buckets)
+                and page["_id"] >= buckets[bucket_idx + 1]["lower_bound"]
+            ):
+                bucket_idx += 1
+            bucket = buckets[bucket_idx]
+            if bucket["num_pages"] % self.bucket_size == 0:
+                # chunks of bucket_size pages, each with its own digest
+                bucket["chunks"].append(
+                    dict(
+                        first_id=page["_id"],
+                        digest=hashlib.blake2b(digest_size=16),
+                        num_pages=0,
+                    )
+                )
+            chunk = bucket["chunks"][-1]
+            chunk["digest"].update(
+                page["_id"].binary + _revision_bytes(page.get("revision_id"))
+            )
+            chunk["num_pages"] += 1
+            bucket["num_pages"] += 1
+
+        result = []
+        for bucket in buckets:
+            chunks = bucket["chunks"]
+            if len(chunks) <= 2:
+                watermark = hashlib.blake2b(digest_size=16)
+                for chunk in chunks:
+                    watermark.update(chunk["digest"].digest())
+                result.append(
+                    dict(
+                        lower_bound=bucket["lower_bound"],
+                        watermark=watermark.digest(),
+                        num_pages=bucket["num_pages"],
+                    )
+                )
+                continue
+            # too large (e.g. the last one, after many insertions): split, keeping the lower bound of the first
+            # chunk as the one of the bucket, so that ranges still cover all the ids
+            for chunk_idx, chunk in enumerate(chunks):
+                result.append(
+                    dict(
+                        lower_bound=(
+                            bucket["lower_bound"]
+                            if chunk_idx == 0
+                            else chunk["first_id"]
+                        ),
+                        watermark=hashlib.blake2b(
+                            chunk["digest"].digest(), digest_size=16
+                        ).digest(),
+                        num_pages=chunk["num_pages"],
+                    )
+                )
+        return result
+
+    async def _aggregate_bucket(
+        self, report: Report, lower_bound: Any, upper_bound: Any
+    ) -> list[list]:
+        match = {}
+        if lower_bound is not None:
+            match["$gte"] = lower_bound
+        if upper_bound is not None:
+            match["$lt"] = upper_bound
+        counts = Counter()
+        for pipeline in report.pipelines({"_id": match} if len(match) > 0 else {}):
+            async for document in WikiPage.get_motor_collection().aggregate(
+                pipeline, allowDiskUse=True
+            ):
+                counts[
+                    tuple(document["_id"].get(key) for key in report.keys)
+                ] += document["count"]
+        return [[*key, count] for key, count in counts.items()]
+
+    async def refresh(self, *report_names: str) -> dict[str, dict[tuple, int]]:
+        """
+        Brings the given reports (by default, all the cached ones) up to date, re-aggregating only the ranges of
+        pages changed since their last refresh. Returns the refreshed counts, by report.
+        """
+        if len(report_names) == 0:
+            report_names = tuple(
+                report_name
+                for report_name in self.reports
+                if self._cache_path(report_name).exists()
+            )
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        for report_name in report_names:
+            report = self.reports[report_name]
+            cached_buckets = self._load_buckets(report_name) or []
+            lower_bound2bucket = {
+                bucket["lower_bound"]: bucket for bucket in cached_buckets
+            }
+            buckets = await self._watermarks(
+                [None] + [bucket["lower_bound"] for bucket in cached_buckets[1:]]
+            )
+
+            async def aggregate(bucket_idx: int):
+                async with semaphore:
+                    upper_bound = (
+                        buckets[bucket_idx + 1]["lower_bound"]
+                        if bucket_idx + 1 < len(buckets)
+                        else None
+                    )
+                    buckets[bucket_idx]["counts"] = await self._aggregate_bucket(
+                        report, buckets[bucket_idx]["lower_bound"], upper_bound
+                    )
+
+            tasks = []
+            for bucket_idx, bucket in enumerate(buckets):
+                cached_bucket = lower_bound2bucket.get(bucket["lower_bound"])
+                # a split bucket keeps its lower bound, but not its watermark
+                if (
+                    cached_bucket is not None
+                    and cached_bucket["watermark"] == bucket["watermark"]
+                ):
+                    bucket["counts"] = cached_bucket["counts"]
+                else:
+                    tasks.append(aggregate(bucket_idx))
+            await asyncio.gather(*tasks)
+
+            self._save_buckets(report_name, buckets)
+            self._totals[report_name] = self._sum_buckets(buckets)
+
+        return {report_name: self._totals[report_name] for report_name in report_names}
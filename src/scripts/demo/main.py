@@ -45,9 +45,7 @@ def render_sidebar(titles):
 
 async def load_language2page(language: Language, title: str):
     if (language, title) not in st.session_state:
-        selected_page = await WikiPage.find_one(
-            WikiPage.language == language, WikiPage.title == title
-        )
+        selected_page = await WikiPage.get_by_title(language, title)
         language2page = {selected_page.language: selected_page}
         async for translated_page in selected_page.list_translations():
             language2page[translated_page.language] = translated_page
@@ -63,7 +61,8 @@ async def main():
     if mongo_uri is None:
         raise ValueError("no MONGO_URI env variable found, did you forget to set it?")
 
-    await init(mongo_uri, "mosaico")
+    # the in-memory cache survives reruns, so that hot pages (and their annotations) are not reloaded at every click
+    await init(mongo_uri, "mosaico", memory_cache_size=512 * 1024**2)
 
     # set streamlit wide layout
     st.set_page_config(layout="wide")
@@ -0,0 +1,142 @@
+import asyncio
+from uuid import uuid4
+
+import pytest
+from beanie import PydanticObjectId, init_beanie
+from bson import Binary, DBRef
+
+from mosaico.schema import (
+    AnnotationWriter,
+    InterlanguageLink,
+    LinkedAnnotationContainer,
+    WikiPage,
+    WSDAnnotation,
+)
+
+
+def _annotation() -> WSDAnnotation:
+    return WSDAnnotation(document_spans=[])
+
+
+def test_flush_awaits_pending_batches_when_the_last_one_fails(monkeypatch):
+    async def write_batch(self, batch):
+        if len(batch) == 2:
+            # background batch
+            await asyncio.sleep(0.01)
+            self.conflicts.append((batch[0][0], "wsd"))
+        else:
+            raise ValueError("last batch")
+
+    monkeypatch.setattr(AnnotationWriter, "_write_batch", write_batch)
+
+    async def main():
+        writer = AnnotationWriter(batch_size=2)
+        for _ in range(3):
+            await writer.add(PydanticObjectId(), _annotation())
+        (task,) = writer._tasks
+        with pytest.raises(ValueError, match="last batch"):
+            await writer.flush()
+        assert task.done()
+        assert len(writer.conflicts) == 1
+
+    asyncio.run(main())
+
+
+def test_flush_raises_errors_of_background_batches(monkeypatch):
+    async def write_batch(self, batch):
+        raise ValueError("background batch")
+
+    monkeypatch.setattr(AnnotationWriter, "_write_batch", write_batch)
+
+    async def main():
+        writer = AnnotationWriter(batch_size=1)
+        await writer.add(PydanticObjectId(), _annotation())
+        with pytest.raises(ValueError, match="background batch"):
+            await writer.flush()
+        assert writer._tasks == []
+
+    asyncio.run(main())
+
+
+def test_conflicts_do_not_mask_exceptions_of_the_body(monkeypatch):
+    async def write_batch(self, batch):
+        self.conflicts.extend(
+            (page_id, annotation.name) for page_id, _, annotation, _ in batch
+        )
+
+    monkeypatch.setattr(AnnotationWriter, "_write_batch", write_batch)
+
+    async def main():
+        with pytest.raises(KeyError):
+            async with AnnotationWriter(raise_on_conflict=True) as writer:
+                await writer.add(PydanticObjectId(), _annotation())
+                raise KeyError("body")
+        assert len(writer.conflicts) == 1
+
+        with pytest.raises(RuntimeError):
+            async with AnnotationWriter(raise_on_conflict=True) as writer:
+                await writer.add(PydanticObjectId(), _annotation())
+
+    asyncio.run(main())
+
+
+def test_collect_conflicts():
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+
+    async def main():
+        await init_beanie(
+            database=mongomock_motor.AsyncMongoMockClient()["mosaico"],
+            document_models=[LinkedAnnotationContainer, InterlanguageLink, WikiPage],
+        )
+        pages = WikiPage.get_motor_collection()
+        containers = LinkedAnnotationContainer.get_motor_collection()
+
+        materialized_annotation = dict(name="wsd", annotation=dict(document_spans=[]))
+        link_ids = [PydanticObjectId() for _ in range(2)]
+        await containers.insert_many([{"_id": link_id} for link_id in link_ids])
+
+        applied_revision_id = Binary.from_uuid(uuid4())
+        documents = [
+            # applied, as the page is still at the revision the update set
+            dict(revision_id=applied_revision_id),
+            # applied, then modified again: the linked container or the materialized annotation are there
+            dict(linked_annotations=[DBRef("linked_annotations", link_ids[0])]),
+            dict(materialized_annotations=[materialized_annotation]),
+            # not applied, the page has another annotation with the same name
+            dict(
+                materialized_annotations=[
+                    dict(name="wsd", annotation=dict(document_spans=[[]]))
+                ]
+            ),
+            # page 5, not applied either, does not exist
+        ]
+        await pages.insert_many(
+            [
+                {
+                    "_id": i,
+                    "document_id": str(i),
+                    "title": str(i),
+                    "language": "en",
+                    "revision_id": Binary.from_uuid(uuid4()),
+                    **document,
+                }
+                for i, document in enumerate(documents, start=1)
+            ]
+        )
+
+        writer = AnnotationWriter()
+        await writer._collect_conflicts(
+            [
+                (1, ["srl"], applied_revision_id, [], []),
+                (2, ["srl"], Binary.from_uuid(uuid4()), [], link_ids[:1]),
+                (3, ["wsd"], Binary.from_uuid(uuid4()), [materialized_annotation], []),
+                (4, ["wsd"], Binary.from_uuid(uuid4()), [materialized_annotation], []),
+                (5, ["srl"], Binary.from_uuid(uuid4()), [], link_ids[1:]),
+            ]
+        )
+
+        assert writer.conflicts == [(4, "wsd"), (5, "srl")]
+        # the container of the update that did not apply is deleted
+        assert [document["_id"] async for document in containers.find()] == link_ids[:1]
+
+    asyncio.run(main())
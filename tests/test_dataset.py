@@ -0,0 +1,96 @@
+import pickle
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from beanie import PydanticObjectId
+
+from mosaico.corpus import CorpusWriter
+from mosaico.dataset import MosaicoDataset
+from mosaico.schema import Language, MemoryCache, WikiPage
+
+TEXT = "Rome is a city. It is old"
+
+
+def _stanza(text: str) -> dict:
+    sentences, position = [], 0
+    for sentence in text.split(". "):
+        tokens = []
+        for word in sentence.split(" "):
+            start = text.index(word, position)
+            position = start + len(word)
+            tokens.append(
+                dict(
+                    char_start=start,
+                    char_end=position,
+                    text=word,
+                    lemma=word.lower(),
+                    pos="NOUN",
+                    morph="Number=Sing",
+                    ner="O",
+                )
+            )
+        sentences.append(dict(tokens=tokens))
+    return dict(document=dict(sentences=sentences))
+
+
+@pytest.fixture
+def dataset_path(tmp_path):
+    path = tmp_path / "pages.corpus"
+    with CorpusWriter(path) as writer:
+        for i in range(3):
+            writer.add_document(
+                dict(
+                    _id=PydanticObjectId(),
+                    document_id=str(i),
+                    title=f"Page {i}",
+                    language="en",
+                    compressed_text=zlib.compress(TEXT.encode()),
+                    materialized_annotations=[
+                        dict(name="stanza", annotation=_stanza(TEXT)),
+                        dict(
+                            name="wsd",
+                            annotation=dict(
+                                document_spans=[
+                                    [dict(token_span=[0, 1], label="bn:00019319n")],
+                                    [],
+                                ]
+                            ),
+                        ),
+                    ],
+                )
+            )
+    return path
+
+
+@pytest.mark.parametrize("memory_cache_size", [None, 1024**2])
+@pytest.mark.parametrize("annotation_executor", [None, ThreadPoolExecutor(1)])
+def test_getitem_prepares_annotations(
+    monkeypatch, dataset_path, memory_cache_size, annotation_executor
+):
+    # items are prepared synchronously, whatever the caches and executors set by init
+    monkeypatch.setattr(
+        WikiPage,
+        "memory_cache",
+        MemoryCache(memory_cache_size) if memory_cache_size is not None else None,
+    )
+    monkeypatch.setattr(WikiPage, "annotation_executor", annotation_executor)
+
+    dataset = MosaicoDataset(dataset_path, annotations=["stanza", "wsd"])
+    assert len(dataset) == 3
+
+    page = dataset[-1]
+    assert page.title == "Page 2"
+    assert page._annotations["stanza"].prepared
+    assert [
+        sentence.text for sentence in page._annotations["stanza"].document.sentences
+    ] == ["Rome is a city", "It is old"]
+    assert page._annotations["wsd"].document_spans[0][0].label == "bn:00019319n"
+
+
+def test_pickle(dataset_path):
+    dataset = pickle.loads(
+        pickle.dumps(MosaicoDataset(dataset_path, annotations=["wsd"]))
+    )
+    assert dataset.annotations == ["wsd"]
+    assert dataset.get_by_title(Language.EN, "Page 1").document_id == "1"
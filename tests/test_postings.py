@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+from beanie import PydanticObjectId
+
+from mosaico import postings
+from mosaico.postings import (
+    PostingsIndex,
+    PostingsWriter,
+    _decode_varints,
+    _encode_varints,
+    _segment_paths,
+)
+from mosaico.schema import Language
+
+
+def test_varints_round_trip():
+    values = np.array(
+        [0, 1, 127, 128, 16383, 16384, 2**35, 2**62, 5], dtype=np.int64
+    )
+    encoded = _encode_varints(values)
+    assert len(encoded) == 1 + 1 + 1 + 2 + 2 + 3 + 6 + 9 + 1
+    assert _decode_varints(np.frombuffer(encoded, dtype=np.uint8)).tolist() == (
+        values.tolist()
+    )
+    assert _decode_varints(np.zeros(0, dtype=np.uint8)).tolist() == []
+
+
+def _write(folder, pages: dict[PydanticObjectId, list[tuple]]):
+    with PostingsWriter(folder, "test", num_columns=3) as writer:
+        for page_id, page_postings in pages.items():
+            page_idx = writer.add_page(page_id)
+            for label, language, *values in page_postings:
+                writer.add(label, language, page_idx, *values)
+
+
+def _find(index: PostingsIndex, label: str, **kwargs) -> list[tuple]:
+    return sorted(index.find(label, **kwargs))
+
+
+def test_postings_supersede_remove_compact(tmp_path):
+    # the last byte of an id is stripped by numpy if null
+    page_a, page_b, page_c = (
+        PydanticObjectId(bytes(11) + bytes([i])) for i in [0, 1, 2]
+    )
+    _write(
+        tmp_path,
+        {
+            page_a: [("x", Language.EN, 0, 1), ("y", Language.EN, 2, 3)],
+            page_b: [("x", Language.EN, 4, 5), ("x", Language.IT, 6, 7)],
+            page_c: [("y", Language.EN, 8, 9)],
+        },
+    )
+    # b is re-added with other postings, c is removed
+    _write(tmp_path, {page_b: [("x", Language.EN, 10, 300)], page_c: []})
+
+    def check(index: PostingsIndex):
+        assert _find(index, "x") == [
+            (page_a, Language.EN, (0, 1)),
+            (page_b, Language.EN, (10, 300)),
+        ]
+        assert _find(index, "x", languages=[Language.IT]) == []
+        assert _find(index, "y") == [(page_a, Language.EN, (2, 3))]
+        assert index.count("x") == 2
+        assert index.count("z") == 0
+
+    index = PostingsIndex(tmp_path, "test", num_columns=3)
+    assert len(_segment_paths(tmp_path)) == 2
+    check(index)
+
+    index.compact()
+    assert len(_segment_paths(tmp_path)) == 1
+    check(index)
+    check(PostingsIndex(tmp_path, "test", num_columns=3))
+
+
+def test_postings_colliding_hashes(tmp_path, monkeypatch):
+    # all keys land on the same slot, lookups probe until the actual key
+    monkeypatch.setattr(postings, "_key_hash", lambda *parts: 7)
+    page_id = PydanticObjectId()
+    labels = [f"label-{i}" for i in range(20)]
+    _write(
+        tmp_path,
+        {page_id: [(label, Language.EN, i, 0) for i, label in enumerate(labels)]},
+    )
+
+    index = PostingsIndex(tmp_path, "test", num_columns=3)
+    for i, label in enumerate(labels):
+        assert index.find(label) == [(page_id, Language.EN, (i, 0))]
+    assert index.find("label-20") == []
+    assert index.find("label-0", languages=[Language.IT]) == []
+
+
+def test_postings_kind_mismatch(tmp_path):
+    _write(tmp_path, {PydanticObjectId(): [("x", Language.EN, 0, 0)]})
+    with pytest.raises(ValueError):
+        PostingsIndex(tmp_path, "other", num_columns=3)
@@ -0,0 +1,48 @@
+import zlib
+
+import pytest
+
+from mosaico.schema import ChunkedCodec, TextCodec
+
+# 1 to 4 UTF-8 bytes per character
+TEXT = "Roma è una città. Ελληνικά, 日本語 e 🏛️ emoji. " * 20
+
+
+@pytest.fixture
+def codec():
+    codec = ChunkedCodec(block_size=7)
+    TextCodec.register(codec)
+    return codec
+
+
+def test_decode(codec):
+    data = codec.encode(TEXT)
+    assert TextCodec.codec_of(data) is codec
+    assert TextCodec.decode(data) == TEXT
+    assert TextCodec.decode(codec.encode("")) == ""
+
+
+@pytest.mark.parametrize(
+    "start, end",
+    [
+        (0, 7),
+        (6, 8),
+        (7, 14),
+        (5, 30),
+        (13, 14),
+        (0, len(TEXT)),
+        (len(TEXT) - 3, len(TEXT) + 10),
+        (None, 12),
+        (40, None),
+        (-20, -3),
+        (20, 10),
+        (len(TEXT) + 1, None),
+    ],
+)
+def test_decode_slice_across_blocks(codec, start, end):
+    assert TextCodec.decode_slice(codec.encode(TEXT), start, end) == TEXT[start:end]
+
+
+def test_decode_slice_legacy_zlib():
+    data = zlib.compress(TEXT.encode())
+    assert TextCodec.decode_slice(data, 3, 40) == TEXT[3:40]